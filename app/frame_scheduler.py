@@ -0,0 +1,285 @@
+# -*- coding: utf-8 -*-
+"""One app-wide frame loop for the mode widgets.
+
+Mode widgets used to own a 120 Hz QTimer each and repaint forever, even as
+hidden pages of `MainWindow.game_host`. Now they `register()` here and
+implement `_tick(dt)`. A single timer drives only the registered widgets
+that are visible, running and not paused. When none qualifies, or a modal
+dialog is up, the timer stops: zero wakeups until `wake()` (called by the
+widgets from start / toggle_pause) or a show event brings it back.
+
+Each widget gets a tick budget (default: one timer interval) and the time
+spent in its `_tick` is accumulated in `TickStats`, see `report()`.
+
+Pacing (`set_pacing`):
+  "precise"  a single-shot `Qt.PreciseTimer` re-armed against an absolute
+             deadline (`deadline += interval`), so timer slack does not
+             accumulate into drift; missed deadlines count as dropped
+             frames and the schedule re-syncs instead of bursting.
+  "vsync"    frames are driven by the window's own update requests
+             (`QWindow.requestUpdate`), which the platform throttles to the
+             display refresh where it can (Cocoa, Wayland).
+Frame time is no longer clamped silently: a gap longer than `MAX_DT` (a
+window drag, a debugger) is counted as a hitch and the excess is dropped;
+catch-up inside a widget is capped by its `FixedStepClock.max_steps`, and
+each capped frame is counted as a spiral-of-death event.
+"""
+import time, weakref
+from dataclasses import dataclass
+
+from PySide6 import QtCore, QtWidgets
+
+TICK_MS = 1000 // 120
+MAX_DT = 0.25  # بیشتر از این یعنی گیر (hitch)؛ باقی‌اش دور ریخته می‌شود
+PACING_MODES = ("precise", "vsync")
+
+
+@dataclass
+class TickStats:
+    budget_ms: float
+    ticks: int = 0
+    total_ms: float = 0.0
+    worst_ms: float = 0.0
+    over: int = 0  # ticks over budget
+    spirals: int = 0  # frames whose catch-up hit the clock's max_steps
+
+    @property
+    def mean_ms(self) -> float:
+        return self.total_ms / self.ticks if self.ticks else 0.0
+
+    def add(self, ms: float):
+        self.ticks += 1
+        self.total_ms += ms
+        if ms > self.worst_ms:
+            self.worst_ms = ms
+        if ms > self.budget_ms:
+            self.over += 1
+
+
+@dataclass
+class PacingStats:
+    frames: int = 0
+    dropped: int = 0  # frame slots missed (late deadline / long vsync gap)
+    hitches: int = 0  # gaps over MAX_DT
+    lost_ms: float = 0.0  # wall time dropped by hitches
+    spirals: int = 0
+
+    def reset(self):
+        self.frames = self.dropped = self.hitches = self.spirals = 0
+        self.lost_ms = 0.0
+
+
+class FrameScheduler(QtCore.QObject):
+    _instance = None
+
+    @classmethod
+    def instance(cls) -> "FrameScheduler":
+        if cls._instance is None:
+            cls._instance = cls(QtCore.QCoreApplication.instance())
+        return cls._instance
+
+    def __init__(self, parent=None, interval_ms: int = TICK_MS, pacing: str = "precise"):
+        super().__init__(parent)
+        self.interval_ms = interval_ms
+        # widget -> TickStats؛ همین ثبت‌نام است. ارجاع ضعیف: ویجت بی‌والد با آخرین
+        # ارجاع پایتونی‌اش آزاد می‌شود و ورودی‌اش خودبه‌خود حذف
+        self.stats = weakref.WeakKeyDictionary()
+        self.pacing = PacingStats()
+        self._modal = None
+        self._running = False
+        self._last = 0.0
+        self._deadline = 0.0
+        self._timer = QtCore.QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setTimerType(QtCore.Qt.PreciseTimer)
+        self._timer.timeout.connect(self._frame)
+        self._vsync_win = None  # QWindow whose update requests drive us
+        self._period = interval_ms / 1000.0  # display refresh period (vsync)
+        self.mode = "precise"
+        self.set_pacing(pacing)
+
+    def set_pacing(self, mode: str):
+        if mode not in PACING_MODES:
+            mode = "precise"
+        if mode == self.mode:
+            return
+        running = self._running
+        self._stop()
+        self.mode = mode
+        if running:
+            self.wake()
+
+    # ---- registration
+    def register(self, widget: QtWidgets.QWidget, budget_ms: float = None):
+        if widget in self.stats:
+            return
+        self.stats[widget] = TickStats(
+            float(self.interval_ms if budget_ms is None else budget_ms)
+        )
+        widget.installEventFilter(self)
+        # شیء ++C با حذف والد می‌رود ولی پوستهٔ پایتونی ممکن است بماند
+        ref = weakref.ref(widget)
+        widget.destroyed.connect(lambda *_: self._forget(ref()))
+
+    def unregister(self, widget: QtWidgets.QWidget):
+        if widget in self.stats:
+            widget.removeEventFilter(self)
+            self._forget(widget)
+
+    def _forget(self, widget):
+        if widget is not None:
+            self.stats.pop(widget, None)
+
+    # ---- state
+    @property
+    def active(self) -> bool:
+        return self._running
+
+    @staticmethod
+    def wants_frames(widget) -> bool:
+        return (
+            widget.isVisible()
+            and getattr(widget, "running", False)
+            and not getattr(widget, "paused", False)
+        )
+
+    def _blocking_modal(self):
+        m = QtWidgets.QApplication.activeModalWidget()
+        return m if m is not None and m.isVisible() else None
+
+    def wake(self, widget: QtWidgets.QWidget = None):
+        """Re-evaluate after a state change; repaints `widget` once either way."""
+        if widget is not None:
+            widget.update()
+        if self._running:
+            return
+        if self._blocking_modal() is None and any(
+            self.wants_frames(w) for w in list(self.stats)
+        ):
+            self._start()
+
+    def resync(self):
+        """Drop the time since the last frame, e.g. after a blocking load in a slot."""
+        if self._running:
+            self._last = self._deadline = time.perf_counter()
+
+    # ---- pacing
+    def _start(self):
+        self._running = True
+        self._last = self._deadline = time.perf_counter()
+        self._arm()
+
+    def _stop(self):
+        self._running = False
+        self._timer.stop()
+        if self._vsync_win is not None:
+            self._vsync_win.removeEventFilter(self)
+            self._vsync_win = None
+
+    def _arm(self):
+        """Schedule the next frame."""
+        if self.mode == "vsync":
+            win = self._frame_window()
+            if win is not None:
+                win.requestUpdate()
+                return
+            # هنوز پنجره‌ای نیست؛ تا آن موقع با تایمر
+        now = time.perf_counter()
+        step = self.interval_ms / 1000.0
+        self._deadline += step
+        late = now - self._deadline
+        if late > step:
+            # چند فریم جا ماند: بشمار و از الان دوباره هم‌گام شو
+            self.pacing.dropped += int(late / step)
+            self._deadline = now + step
+        self._timer.start(max(0, round((self._deadline - now) * 1000.0)))
+
+    def _frame_window(self):
+        for w in list(self.stats):
+            if self.wants_frames(w):
+                win = w.window().windowHandle()
+                if win is not None and win is not self._vsync_win:
+                    if self._vsync_win is not None:
+                        self._vsync_win.removeEventFilter(self)
+                    win.installEventFilter(self)
+                    self._vsync_win = win
+                    hz = win.screen().refreshRate() if win.screen() else 0
+                    self._period = 1.0 / hz if hz > 1 else self.interval_ms / 1000.0
+                return win
+        return None
+
+    def _suspend(self):
+        self._stop()
+        m = self._blocking_modal()
+        if m is not None and m is not self._modal:
+            # wake again when the dialog goes away
+            self._modal = m
+            m.installEventFilter(self)
+
+    def _frame(self):
+        if not self._running:
+            return
+        if self._blocking_modal() is not None:
+            self._suspend()
+            return
+        now = time.perf_counter()
+        dt = now - self._last
+        self._last = now
+        pc = self.pacing
+        pc.frames += 1
+        if dt > MAX_DT:
+            pc.hitches += 1
+            pc.lost_ms += (dt - MAX_DT) * 1000.0
+            dt = MAX_DT
+        elif self.mode == "vsync" and dt > 1.5 * self._period:
+            pc.dropped += int(dt / self._period - 0.5)
+        driven = False
+        for w in list(self.stats):
+            if not self.wants_frames(w):
+                continue
+            driven = True
+            st = self.stats[w]
+            clock = getattr(w, "clock", None)
+            sp = clock.spirals if clock is not None else 0
+            t0 = time.perf_counter()
+            w._tick(dt)
+            st.add((time.perf_counter() - t0) * 1000.0)
+            if clock is not None and clock.spirals != sp:
+                st.spirals += clock.spirals - sp
+                pc.spirals += clock.spirals - sp
+            w.update()
+        if not driven:
+            self._suspend()
+        elif self._running:
+            self._arm()
+
+    def eventFilter(self, obj, ev):
+        et = ev.type()
+        if obj is self._vsync_win:
+            if et == QtCore.QEvent.UpdateRequest and self._running:
+                # بعد از تحویل همین درخواست به پنجره
+                QtCore.QTimer.singleShot(0, self._frame)
+            return False
+        if obj is self._modal:
+            if et in (QtCore.QEvent.Hide, QtCore.QEvent.Close):
+                obj.removeEventFilter(self)
+                self._modal = None
+                QtCore.QTimer.singleShot(0, self.wake)
+        elif et == QtCore.QEvent.Show:
+            self.wake()
+        return False
+
+    # ---- budgets
+    def report(self) -> list[str]:
+        pc = self.pacing
+        lines = [
+            f"pacing {self.mode}: {pc.frames} frames, {pc.dropped} dropped, "
+            f"{pc.hitches} hitches ({pc.lost_ms:.0f} ms lost), {pc.spirals} spirals"
+        ]
+        for w, s in list(self.stats.items()):
+            lines.append(
+                f"{type(w).__name__}: {s.ticks} ticks, mean {s.mean_ms:.2f} ms, "
+                f"worst {s.worst_ms:.2f} ms, {s.over} over {s.budget_ms:.1f} ms budget, "
+                f"{s.spirals} spirals"
+            )
+        return lines
@@ -1,19 +1,27 @@
 from PySide6 import QtWidgets, QtGui, QtCore
-import math, random, time, os
+import math, time, os
+from functools import partial
 from .settings import (
     THEMES,
-    MAX_PHASE,
-    RAMP_DURATION,
     INITIAL_TIME_ENDLESS,
     STORY_LEVELS,
-    RAMP_RATE,
     user_data_path,
 )
+from .modes.classic_world import (
+    ClassicWorld,
+    ClassicInputs,
+    PLAYER_R,
+    POWER_TYPES,
+)
+from .widgets.sparks import SparkPainter
+from .widgets.background import BackgroundCompositor
+from .widgets.glow_atlas import GlowAtlas
+from .widgets.palette import Palette
+from .widgets.paint_probe import NULL_PROBE
+from .frame_scheduler import FrameScheduler
+from .fixed_step import FixedStepClock, lerp_wrap
 
-
-NODE_GRAB_R2 = 28 * 28
-GLITCH_HIT_R2 = 24 * 24
-PLAYER_R = 10
+BG_HUE_STEP = 4  # درجه؛ رنگ گرادیان پایه پله‌ای عوض شود تا لایه‌اش کمتر از نو رسم شود
 
 
 class GameWidget(QtWidgets.QWidget):
@@ -30,7 +38,7 @@ class GameWidget(QtWidgets.QWidget):
         super().__init__()
         self.setMouseTracking(True)
         self.setFocusPolicy(QtCore.Qt.StrongFocus)
-        self._theme = THEMES["Aurora"]
+        self._pal = Palette.for_theme(THEMES["Aurora"])  # رنگ/قلم‌های آماده‌ی تم
         self._mode = "endless"  # or "story"
         self._control_mode = "mouse"  # "mouse" | "keys"
 
@@ -39,70 +47,30 @@ class GameWidget(QtWidgets.QWidget):
         self._bg_nodes = []
         self._bg_edges = []
         self._seed_bg()
-
-        # game state
+        self._bg = BackgroundCompositor()  # گرادیان، شبکه و وینیت کش‌شده
+        self.paint_probe = NULL_PROBE  # زمان‌سنج بخش‌های رسم (بنچ)
+
+        # game state (simulation lives in ClassicWorld; the widget only
+        # captures input and draws)
+        self.world = ClassicWorld(max(1, self.width()), max(1, self.height()))
+        self.inputs = ClassicInputs()
+        self.run_seed = None  # None: هر ران seed تازه؛ عدد ثابت برای ری‌پلی/بنچ
+        self.recorder = None  # ReplayRecorder هنگام ضبط ران
+        self.ghost = None  # Ghost: بهترین ران قبلی کنار ران زنده
         self.running = False
         self.paused = False
-        self.score = 0
         self.best = 0
-        self.combo = 0
-        self.time_left = 0.0  # Story only
-        self.phase_val = 0.0
         self.story_idx = 0
         self.story_levels = STORY_LEVELS
-        self.nohit_failed = False
-        self._endless_elapsed = 0.0
 
-        # keyboard control state
-        self.heading = 0.0  # radians
-        self.turn_speed = math.radians(180)  # rad/s (قابل تغییر)
         self._mouse_sens = 1.0
         self._difficulty = 'Normal'
-        self.forward_speed = 240.0  # px/s ثابت در حالت keys
-        self.key_left = False
-        self.key_right = False
-
-        # level modifiers (story)
-        self.level_mods = {
-            "spawnMul": 1.0,
-            "glitchSpeedMul": 1.0,
-            "powerFreq": 9.5,
-            "theme": "Aurora",
-        }
-
-        # entities
-        self.nodes = []
-        self.glitches = []
-        self.sparks = []
-        self.powers = []
-
-        # timers / powers
-        self.base_node = 1.1
-        self.base_glitch = 2.4
-        self.base_power = 9.5
-        self.timers = {
-            "node": self.base_node,
-            "glitch": self.base_glitch,
-            "power": self.base_power,
-        }
-        self.power_state = {"slowmo": 0.0, "shield": 0.0, "burst": 0.0}
-
-        # player physics (mouse mode)
-        self.px = 0.0
-        self.py = 0.0
-        self.vx = 0.0
-        self.vy = 0.0
-        self.mx = 0.0
-        self.my = 0.0
 
         # Fixed timestep loop
-        self._last = time.perf_counter()
-        self._acc = 0.0
-        self._step = 1 / 60.0
+        self.clock = FixedStepClock()  # sim rate; alpha for interpolation
         self._ui_acc = 0.0
-        self._timer = QtCore.QTimer(self)
-        self._timer.timeout.connect(self._tick)
-        self._timer.start(1000 // 120)
+        self._frames = FrameScheduler.instance()
+        self._frames.register(self)
 
         self._run_started_ts = None
         self._hints = []  # (t_start, t_end, text)
@@ -111,19 +79,43 @@ class GameWidget(QtWidgets.QWidget):
         # برای Photo Mode فلگ کوچک
         self._photo_flash_ts = 0.0
 
+    # ---- world state shortcuts (read by MainWindow/HUD)
+    @property
+    def score(self) -> int:
+        return self.world.score
+
+    @property
+    def time_left(self) -> float:
+        return self.world.time_left
+
+    @property
+    def phase_val(self) -> float:
+        return self.world.phase_val
+
+    @property
+    def level_mods(self) -> dict:
+        return self.world.level_mods
+
+    @property
+    def run(self):
+        return self.world.run
+
     def set_lang(self, lang: str):
         self._lang = lang
 
     # ---- Public API
     def set_theme(self, name: str):
-        self._theme = THEMES.get(name, self._theme)
+        self._pal = Palette.for_theme(THEMES.get(name, self._pal.theme))
+        self._bg.invalidate()
         self.update()
 
     def set_mode(self, mode: str):
         self._mode = mode
+        self.world.mode = mode
 
     def set_control_mode(self, mode: str):
         self._control_mode = "keys" if mode.lower().startswith("k") else "mouse"
+        self.world.control_mode = self._control_mode
 
     def set_music(self, on: bool):
         pass
@@ -131,11 +123,12 @@ class GameWidget(QtWidgets.QWidget):
     def set_sfx(self, on: bool):
         self._sfx = on
 
+    def set_sim_rate(self, hz: float):
+        self.clock.set_rate(hz)
+
     def prepare_endless(self, _seconds_ignored: int = 0):
         """Endless: بدون تایمر؛ تا اولین برخورد ادامه دارد."""
         self._reset_world()
-        self._endless_elapsed = 0.0
-        self.time_left = 0.0  # not used in endless
         self.running = False
         self.update()
         self.scoreChanged.emit(self.score)
@@ -146,7 +139,8 @@ class GameWidget(QtWidgets.QWidget):
         self.story_idx = idx
         lvl = self._current_level()
         self._reset_world()
-        self.time_left = float(lvl.get("time", 60.0))
+        self.world.level_time = float(lvl.get("time", 60))
+        self.world.time_left = float(lvl.get("time", 60.0))
         self._apply_level_mods(lvl.get("mods", {}))
         self.running = False
         self.update()
@@ -159,7 +153,7 @@ class GameWidget(QtWidgets.QWidget):
             return
         self.running = True
         self.paused = False
-        self._last = time.perf_counter()
+        self._frames.wake(self)
         self._run_started_ts = time.perf_counter()
         self._prepare_hints()
         self.started.emit()
@@ -169,6 +163,7 @@ class GameWidget(QtWidgets.QWidget):
         if not self.running:
             return
         self.paused = not self.paused
+        self._frames.wake(self)
 
     def reset(self):
         if self._mode == "endless":
@@ -178,33 +173,14 @@ class GameWidget(QtWidgets.QWidget):
 
     # ---- Internal helpers
     def _reset_world(self):
-        self.score = 0
-        self.combo = 0
-        self.phase_val = 0.0
-        self.nohit_failed = False
-
-        self.nodes.clear()
-        self.glitches.clear()
-        self.sparks.clear()
-        self.powers.clear()
-
-        self.base_node = 1.1
-        self.base_glitch = 2.4
-        self.base_power = 9.5
-        self.timers = {"node": 0.6, "glitch": 1.5, "power": 3.5}
-        self.power_state = {"slowmo": 0.0, "shield": 0.0, "burst": 0.0}
-
-        w = max(1, self.width())
-        h = max(1, self.height())
-        self.px = w / 2.0
-        self.py = h / 2.0
-        self.vx = self.vy = 0.0
-        self.mx = self.px
-        self.my = self.py
-
-        # reset keyboard heading to the right
-        self.heading = 0.0
-        self.key_left = self.key_right = False
+        wd = self.world
+        wd.resize(max(1, self.width()), max(1, self.height()))
+        wd.mode = self._mode
+        wd.control_mode = self._control_mode
+        wd.reset(self.run_seed)
+        self.inputs.mx = wd.px
+        self.inputs.my = wd.py
+        self.inputs.key_left = self.inputs.key_right = False
 
     def _current_level(self):
         if self.story_levels and 0 <= self.story_idx < len(self.story_levels):
@@ -218,195 +194,42 @@ class GameWidget(QtWidgets.QWidget):
         }
 
     def _apply_level_mods(self, mods: dict):
-        self.level_mods.update(
-            {
-                "spawnMul": 1.0,
-                "glitchSpeedMul": 1.0,
-                "powerFreq": 9.5,
-                "theme": "Aurora",
-            }
-        )
-        self.level_mods.update(mods or {})
-        self.base_node = 1.1 / max(0.3, self.level_mods["spawnMul"])
-        self.base_glitch = 2.4 / max(0.3, self.level_mods["spawnMul"])
-        self.base_power = float(self.level_mods["powerFreq"])
+        self.world.apply_level_mods(mods)
         th = self.level_mods.get("theme")
         if th in THEMES:
-            self._theme = THEMES[th]
+            self._pal = Palette.for_theme(THEMES[th])
+            self._bg.invalidate()
 
     def _initial_span(self):
         return float(INITIAL_TIME_ENDLESS)
 
     # ---- Loop
-    def _tick(self):
-        now = time.perf_counter()
-        dt = min(0.05, now - self._last)
-        self._last = now
+    def _tick(self, dt: float):
         if self.running and not self.paused:
-            self._acc += dt
-            while self._acc >= self._step:
-                self._update(self._step)
-                self._acc -= self._step
-                self._ui_acc += self._step
+            rec, ghost = self.recorder, self.ghost
+            for step in self.clock.steps(dt):
+                if rec is not None:
+                    rec.capture(self)
+                self._update(step)
+                if not self.running:  # ران تمام شد: قدم‌های باقی فریم پایان را تکرار نکنند
+                    break
+                if ghost is not None:
+                    ghost.follow(self.world.run.t)
+                self._ui_acc += step
                 if self._mode == "story" and self._ui_acc >= 0.1:
                     self.timeChanged.emit(max(0, int(math.ceil(self.time_left))))
                     self._ui_acc = 0.0
-        self.update()
 
     # ---- Update
     def _update(self, dt: float):
-        w = self.width()
-        h = self.height()
-
-        # phase ramp
-        if self._mode == "endless":
-            self._endless_elapsed += dt
-            tnorm = max(0.0, min(1.0, (self._endless_elapsed / RAMP_DURATION)))
-            smooth = tnorm * tnorm * (3 - 2 * tnorm)
-            target = smooth * MAX_PHASE
-            self.phase_val += (target - self.phase_val) * RAMP_RATE
-        else:
-            lvl_time = self._current_level().get("time", 60)
-            elapsed = max(0.0, lvl_time - self.time_left)
-            tnorm = max(0.0, min(1.0, elapsed / max(30.0, float(lvl_time))))
-            smooth = tnorm * tnorm * (3 - 2 * tnorm)
-            target = smooth * (MAX_PHASE * 0.5)
-            self.phase_val += (target - self.phase_val) * RAMP_RATE
-
-        # timers with slowmo
-        slowmul = 0.5 if self.power_state["slowmo"] > 0 else 1.0
-        self.timers["node"] -= dt * (1 + self.phase_val * 0.04) * slowmul
-        self.timers["glitch"] -= dt * (1 + self.phase_val * 0.08) * slowmul
-        self.timers["power"] -= dt * slowmul
-
-        if self.timers["node"] <= 0:
-            self._spawn_node(w, h)
-            self.timers["node"] = max(0.5, self.base_node - self.phase_val * 0.04)
-        if self.timers["glitch"] <= 0:
-            self._spawn_glitch(w, h)
-            self.timers["glitch"] = max(0.8, self.base_glitch - self.phase_val * 0.08)
-        if self.timers["power"] <= 0:
-            self._spawn_power(w, h)
-            self.timers["power"] = max(2.5, self.base_power + random.uniform(-2, 2))
-
-        # movement
-        if self._control_mode == "mouse":
-            accel = 700
-            damping = 0.88
-            maxs = 300
-            dx = self.mx - self.px
-            dy = self.my - self.py
-            self.vx += (1 if dx > 0 else -1 if dx < 0 else 0) * accel * dt
-            self.vy += (1 if dy > 0 else -1 if dy < 0 else 0) * accel * dt
-            sp = math.hypot(self.vx, self.vy)
-            if sp > maxs:
-                self.vx = self.vx / sp * maxs
-                self.vy = self.vy / sp * maxs
-            self.vx *= damping
-            self.vy *= damping
-            self.px += self.vx * dt
-            self.py += self.vy * dt
-            if self.px < 0:
-                self.px += w
-            elif self.px > w:
-                self.px -= w
-            if self.py < 0:
-                self.py += h
-            elif self.py > h:
-                self.py -= h
-
-        else:
-            # keys mode: constant forward + left/right turn
-            if self.key_left:
-                self.heading -= self.turn_speed * dt
-            if self.key_right:
-                self.heading += self.turn_speed * dt
-
-            self.px += math.cos(self.heading) * self.forward_speed * dt
-            self.py += math.sin(self.heading) * self.forward_speed * dt
-            if self.px < 0:
-                self.px += w
-            elif self.px > w:
-                self.px -= w
-            if self.py < 0:
-                self.py += h
-            elif self.py > h:
-                self.py -= h
-
-        # entities
-        for n in self.nodes:
-            n["t"] += dt
-        for g in self.glitches:
-            sm = 0.6 if self.power_state["slowmo"] > 0 else 1.0
-            speedmul = self.level_mods.get("glitchSpeedMul", 1.0)
-            g["x"] += g["vx"] * dt * sm * speedmul
-            g["y"] += g["vy"] * dt * sm * speedmul
-            g["life"] -= dt
-            if g["x"] < 0 or g["x"] > w:
-                g["vx"] *= -1
-            if g["y"] < 0 or g["y"] > h:
-                g["vy"] *= -1
-        self.glitches = [g for g in self.glitches if g["life"] > 0]
-
-        for p in self.sparks:
-            p["x"] += p["vx"] * dt
-            p["y"] += p["vy"] * dt
-            p["life"] -= dt
-        self.sparks = [p for p in self.sparks if p["life"] > 0]
-        for p in self.powers:
-            p["pulse"] += dt
-
-        # power timers
-        for k in ("slowmo", "shield", "burst"):
-            if self.power_state[k] > 0:
-                self.power_state[k] -= dt
-
-        # collisions
-        i = len(self.nodes) - 1
-        while i >= 0:
-            n = self.nodes[i]
-            if (self.px - n["x"]) ** 2 + (self.py - n["y"]) ** 2 < NODE_GRAB_R2:
-                self.nodes.pop(i)
-                self._emit_sparks(n["x"], n["y"], n["hue"], 16, 120)
-                self.combo = min(99, self.combo + 1)
-                gain = 8 + self.combo * 3
-                self.score += gain
-                self.scoreChanged.emit(self.score)
-            i -= 1
-
-        i = len(self.powers) - 1
-        while i >= 0:
-            p = self.powers[i]
-            if (self.px - p["x"]) ** 2 + (self.py - p["y"]) ** 2 < NODE_GRAB_R2:
-                self.powers.pop(i)
-                if p["type"] == "slowmo":
-                    self.power_state["slowmo"] = 4
-                if p["type"] == "shield":
-                    self.power_state["shield"] = 5
-                if p["type"] == "burst":
-                    self.power_state["burst"] = 1.2
-                self._emit_sparks(p["x"], p["y"], 50, 28, 140)
-            i -= 1
-
-        i = len(self.glitches) - 1
-        while i >= 0:
-            g = self.glitches[i]
-            if (self.px - g["x"]) ** 2 + (self.py - g["y"]) ** 2 < GLITCH_HIT_R2:
-                if self.power_state["shield"] > 0 or self.power_state["burst"] > 0:
-                    self.glitches.pop(i)
-                    self._emit_sparks(g["x"], g["y"], g["hue"], 18, 160)
-                    self.score += 12
-                    self.scoreChanged.emit(self.score)
-                else:
-                    # ENDLESS & STORY: پایان با برخورد
-                    self._game_over("hit")
-                    return
-            i -= 1
-
-        # time only for Story
-        if self._mode == "story":
-            self.time_left = max(0.0, self.time_left - dt)
-            if self.time_left == 0.0:
+        for ev in self.world.step(dt, self.inputs):
+            kind = ev[0]
+            if kind == ClassicWorld.EV_SCORE:
+                self.scoreChanged.emit(ev[1])
+            elif kind == ClassicWorld.EV_HIT:
+                self._game_over("hit")
+                return
+            elif kind == ClassicWorld.EV_TIMEOUT:
                 self._finish_story_on_timeout()
                 return
 
@@ -420,7 +243,7 @@ class GameWidget(QtWidgets.QWidget):
             (self.score >= (obj.get("collect", 0) * 8)) if "collect" in obj else True
         )
         ok_score = (self.score >= obj.get("score", 0)) if "score" in obj else True
-        ok_nohit = not (obj.get("nohit") and self.nohit_failed)
+        ok_nohit = not (obj.get("nohit") and self.world.nohit_failed)
         if ok_collect and ok_score and ok_nohit:
             self.runEnded.emit(self.score, f"story-{lvl['id']}", "success")
         else:
@@ -440,69 +263,15 @@ class GameWidget(QtWidgets.QWidget):
                 "fail" if reason != "success" else "success",
             )
 
-    # ---- Spawners
-    def _spawn_node(self, w, h):
-        self.nodes.append(
-            {
-                "x": random.uniform(40, w - 40),
-                "y": random.uniform(40, h - 40),
-                "r": random.uniform(6, 10),
-                "t": 0.0,
-                "hue": random.uniform(180, 320),
-            }
-        )
-
-    def _spawn_glitch(self, w, h):
-        speed = random.uniform(28, 60) * (1 + self.phase_val * 0.06)
-        ang = random.uniform(0, math.tau)
-        self.glitches.append(
-            {
-                "x": random.uniform(0, w),
-                "y": random.uniform(0, h),
-                "vx": math.cos(ang) * speed,
-                "vy": math.sin(ang) * speed,
-                "r": random.uniform(9, 12),
-                "hue": random.uniform(0, 20),
-                "life": random.uniform(6, 12),
-            }
-        )
-
-    def _spawn_power(self, w, h):
-        t = random.choice(["slowmo", "shield", "burst"])
-        self.powers.append(
-            {
-                "x": random.uniform(40, w - 40),
-                "y": random.uniform(40, h - 40),
-                "r": 10,
-                "type": t,
-                "pulse": 0.0,
-            }
-        )
-
-    def _emit_sparks(self, x, y, hue, n=12, speed=90):
-        for i in range(n):
-            ang = (i / n) * math.tau + random.uniform(-0.1, 0.1)
-            self.sparks.append(
-                {
-                    "x": x,
-                    "y": y,
-                    "vx": math.cos(ang) * (speed + random.uniform(-20, 20)),
-                    "vy": math.sin(ang) * (speed + random.uniform(-20, 20)),
-                    "life": random.uniform(0.4, 0.8),
-                    "hue": hue,
-                }
-            )
-
     # ---- Events
     def mouseMoveEvent(self, e):
         if self._control_mode == "mouse":
-            self.mx = e.position().x()
-            self.my = e.position().y()
+            self.inputs.mx = e.position().x()
+            self.inputs.my = e.position().y()
 
     def resizeEvent(self, e):
-        if self.px == 0 and self.py == 0:
-            self.px = self.width() / 2
-            self.py = self.height() / 2
+        self.world.resize(max(1, self.width()), max(1, self.height()))
+        self._bg.invalidate()
 
     def keyPressEvent(self, e: QtGui.QKeyEvent):
         # Photo Mode
@@ -520,25 +289,31 @@ class GameWidget(QtWidgets.QWidget):
         # کنترل Keys: چپ/راست
         if self._control_mode == "keys":
             if e.key() in (QtCore.Qt.Key_Left, QtCore.Qt.Key_A):
-                self.key_left = True
+                self.inputs.key_left = True
                 return
             if e.key() in (QtCore.Qt.Key_Right, QtCore.Qt.Key_D):
-                self.key_right = True
+                self.inputs.key_right = True
                 return
 
         super().keyPressEvent(e)
 
     def keyReleaseEvent(self, e: QtGui.QKeyEvent):
         if e.key() in (QtCore.Qt.Key_Left, QtCore.Qt.Key_A):
-            self.key_left = False
+            self.inputs.key_left = False
             return
         if e.key() in (QtCore.Qt.Key_Right, QtCore.Qt.Key_D):
-            self.key_right = False
+            self.inputs.key_right = False
             return
         super().keyReleaseEvent(e)
 
     # ---- Draw helpers (new)
-    def _draw_vignette_and_bands(self, p: QtGui.QPainter, w: int, h: int, t: float):
+    def _paint_bg_base(self, p: QtGui.QPainter, w: int, h: int, ha: int, hb: int):
+        grad = QtGui.QLinearGradient(0, 0, w, h)
+        grad.setColorAt(0, QtGui.QColor.fromHsl(ha, 180, 15))
+        grad.setColorAt(1, QtGui.QColor.fromHsl(hb, 180, 18))
+        p.fillRect(0, 0, w, h, grad)
+
+    def _draw_vignette_and_bands(self, p: QtGui.QPainter, w: int, h: int):
         # Vignette
         vg = QtGui.QRadialGradient(QtCore.QPointF(w * 0.5, h * 0.55), max(w, h) * 0.65)
         vg.setColorAt(0.0, QtGui.QColor(0, 0, 0, 0))
@@ -553,7 +328,7 @@ class GameWidget(QtWidgets.QWidget):
         stripe.setColorAt(0.0, QtGui.QColor(255, 255, 255, 20))
         stripe.setColorAt(0.5, QtGui.QColor(255, 255, 255, 0))
         stripe.setColorAt(1.0, QtGui.QColor(255, 255, 255, 20))
-        p.fillRect(self.rect().adjusted(-w, 0, w, 0), stripe)
+        p.fillRect(-w, 0, 3 * w, h, stripe)
         p.restore()
 
     def _chip(self, p: QtGui.QPainter, x: int, y: int, text: str):
@@ -576,14 +351,15 @@ class GameWidget(QtWidgets.QWidget):
 
     def _seed_bg(self):
         # چند گره‌ی کم‌نور برای پس‌زمینه؛ به‌صورت ثابت در طول اجرای برنامه
+        # (مولد محلی؛ random سراسری و بازی دست نمی‌خورند)
         import random
 
-        random.seed(42)
+        rnd = random.Random(42)
         w = max(800, self.width() or 1200)
         h = max(500, self.height() or 800)
         n = 28
         self._bg_nodes = [
-            (random.uniform(0, w), random.uniform(0, h)) for _ in range(n)
+            (rnd.uniform(0, w), rnd.uniform(0, h)) for _ in range(n)
         ]
         # اتصالات کم برای سبکی
         self._bg_edges.clear()
@@ -593,17 +369,13 @@ class GameWidget(QtWidgets.QWidget):
                 dx = self._bg_nodes[i][0] - self._bg_nodes[j][0]
                 dy = self._bg_nodes[i][1] - self._bg_nodes[j][1]
                 d2 = dx * dx + dy * dy
-                if d2 < (260 * 260) and random.random() < 0.12:
+                if d2 < (260 * 260) and rnd.random() < 0.12:
                     self._bg_edges.append((i, j))
 
     # --- draw helpers (new)
-    def _draw_bg_network(self, p: QtGui.QPainter, w: int, h: int, t: float):
+    def _draw_bg_network(self, p: QtGui.QPainter, w: int, h: int, ox: int, oy: int):
         p.save()
         p.setRenderHint(QtGui.QPainter.Antialiasing, True)
-        # پارالاکس کوچیک: با زمان کمی جابه‌جا می‌شوند
-        ox = math.sin(t * 0.05) * 20
-        oy = math.cos(t * 0.06) * 16
-
         # خطوط
         pen = QtGui.QPen(QtGui.QColor(180, 210, 255, 40), 1.0)
         p.setPen(pen)
@@ -634,7 +406,7 @@ class GameWidget(QtWidgets.QWidget):
             alpha = max(0, min(90, alpha))
             col = QtGui.QColor(200, 220, 255, alpha)
             p.setPen(QtGui.QPen(col, 1.2))
-            p.drawEllipse(QtCore.QPointF(self.px, self.py), r, r)
+            p.drawEllipse(QtCore.QPointF(self.world.px, self.world.py), r, r)
         p.restore()
 
     def _prepare_hints(self):
@@ -667,115 +439,93 @@ class GameWidget(QtWidgets.QWidget):
         p.setRenderHint(QtGui.QPainter.Antialiasing)
         w, h = self.width(), self.height()
         t = time.perf_counter()
-
-        # پس‌زمینه: گرادیان
-        grad = QtGui.QLinearGradient(0, 0, w, h)
-        a = self._theme.bgA + math.sin(t) * 20
-        b = self._theme.bgB + math.cos(t * 0.7) * 20
-        grad.setColorAt(0, QtGui.QColor.fromHsl(int(a) % 360, 180, 15))
-        grad.setColorAt(1, QtGui.QColor.fromHsl(int(b) % 360, 180, 18))
-        p.fillRect(self.rect(), grad)
-
-        # شبکه و ریپل‌ها
-        self._draw_bg_network(p, w, h, t)
+        wd = self.world
+        a = self.clock.alpha  # بین تیک قبلی و فعلی
+        pal = self._pal
+        probe = self.paint_probe
+        probe.begin()
+
+        # پس‌زمینه: لایه‌های کش‌شده؛ فقط وقتی کلیدشان عوض شود دوباره رسم می‌شوند
+        bg = self._bg
+        # ~۲۰°/ثانیه رانش؛ با پله‌های BG_HUE_STEP حداکثر چند بار در ثانیه
+        ha = round((pal.theme.bgA + math.sin(t) * 20) / BG_HUE_STEP) * BG_HUE_STEP % 360
+        hb = round((pal.theme.bgB + math.cos(t * 0.7) * 20) / BG_HUE_STEP) * BG_HUE_STEP % 360
+        bg.blit(
+            p, "base", (ha, hb), w, h, partial(self._paint_bg_base, ha=ha, hb=hb)
+        )
+        # پارالاکس کوچیک شبکه؛ با جابه‌جایی یک پیکسل کامل
+        ox = round(math.sin(t * 0.05) * 20)
+        oy = round(math.cos(t * 0.06) * 16)
+        bg.blit(
+            p, "network", (ox, oy), w, h, partial(self._draw_bg_network, ox=ox, oy=oy)
+        )
         self._draw_bg_ripples(p, w, h, t)
-
-        # Nodes
-        for n in self.nodes:
-            s = 1 + math.sin(n["t"] * 3) * 0.15
-            core = QtGui.QColor(self._theme.node)
-            core.setAlpha(230)
-            glow = QtGui.QColor(self._theme.node)
-            glow.setAlpha(80)
-            p.setPen(QtCore.Qt.NoPen)
-            p.setBrush(glow)
-            p.drawEllipse(
-                QtCore.QPointF(n["x"], n["y"]), n["r"] * s + 6, n["r"] * s + 6
-            )
-            p.setBrush(core)
-            p.drawEllipse(
-                QtCore.QPointF(n["x"], n["y"]), n["r"] * s + 2, n["r"] * s + 2
-            )
+        probe.lap("background")
+
+        # Nodes (دیسک‌های درخشان از اطلس)
+        atlas = GlowAtlas.shared(self.devicePixelRatioF())
+        nd = wd.nodes
+        idx = nd.indices()
+        core, glow = pal.node_core, pal.node_glow
+        for x, y, r, nt in zip(
+            nd.x[idx].tolist(), nd.y[idx].tolist(), nd.r[idx].tolist(), nd.t[idx].tolist()
+        ):
+            s = 1 + math.sin(nt * 3) * 0.15
+            atlas.draw(p, x, y, core, r * s + 2, glow, r * s + 6)
 
         # Glitches
-        for g in self.glitches:
-            halo = QtGui.QColor.fromHsl(int(g["hue"]) % 360, 240, 130, 100)
-            p.setBrush(halo)
-            p.setPen(QtCore.Qt.NoPen)
-            p.drawEllipse(QtCore.QPointF(g["x"], g["y"]), g["r"] + 5, g["r"] + 5)
-            c = QtGui.QColor.fromHsl(int(g["hue"]) % 360, 240, 180, 220)
-            p.setBrush(c)
-            p.drawEllipse(QtCore.QPointF(g["x"], g["y"]), g["r"] + 1.5, g["r"] + 1.5)
+        gs = wd.glitches
+        idx = gs.indices()
+        gx0, gy0 = gs.x0[idx], gs.y0[idx]
+        gx = gx0 + (gs.x[idx] - gx0) * a
+        gy = gy0 + (gs.y[idx] - gy0) * a
+        g_core, g_halo = pal.hsl(240, 180, 220), pal.hsl(240, 130, 100)
+        g_cross = pal.hsl(240, 200, 220)
+        for x, y, r, hue in zip(
+            gx.tolist(), gy.tolist(), gs.r[idx].tolist(), gs.hue[idx].tolist()
+        ):
+            atlas.draw(p, x, y, g_core.rgba(hue), r + 1.5, g_halo.rgba(hue), r + 5)
             p.save()
-            p.translate(g["x"], g["y"])
-            p.rotate(math.sin(t * 3 + g["x"] * 0.01) * 34)
-            p.setPen(
-                QtGui.QPen(QtGui.QColor.fromHsl(int(g["hue"]) % 360, 240, 200, 220), 2)
-            )
-            p.drawLine(-g["r"], 0, g["r"], 0)
-            p.drawLine(0, -g["r"], 0, g["r"])
+            p.translate(x, y)
+            p.rotate(math.sin(t * 3 + x * 0.01) * 34)
+            p.setPen(pal.hsl_pen(g_cross, hue, 2))
+            p.drawLine(QtCore.QPointF(-r, 0), QtCore.QPointF(r, 0))
+            p.drawLine(QtCore.QPointF(0, -r), QtCore.QPointF(0, r))
             p.restore()
 
         # Powerups
-        for pw in self.powers:
-            pul = 1 + math.sin(pw["pulse"] * 6) * 0.25
-            col = (
-                self._theme.powerSlow
-                if pw["type"] == "slowmo"
-                else (
-                    self._theme.powerShield
-                    if pw["type"] == "shield"
-                    else self._theme.powerBurst
-                )
-            )
-            glow = QtGui.QColor(col)
-            glow.setAlpha(90)
-            p.setPen(QtCore.Qt.NoPen)
-            p.setBrush(glow)
-            p.drawEllipse(
-                QtCore.QPointF(pw["x"], pw["y"]), pw["r"] * pul + 4, pw["r"] * pul + 4
-            )
-            p.setBrush(QtGui.QColor(col))
-            p.drawEllipse(
-                QtCore.QPointF(pw["x"], pw["y"]), pw["r"] * pul, pw["r"] * pul
-            )
+        pws = wd.powers
+        idx = pws.indices()
+        for x, y, r, pulse, kind in zip(
+            pws.x[idx].tolist(),
+            pws.y[idx].tolist(),
+            pws.r[idx].tolist(),
+            pws.pulse[idx].tolist(),
+            pws.kind[idx].tolist(),
+        ):
+            pul = 1 + math.sin(pulse * 6) * 0.25
+            core, glow = pal.power[POWER_TYPES[int(kind)]]
+            atlas.draw(p, x, y, core, r * pul, glow, r * pul + 4)
+        probe.lap("entities")
 
         # Sparks
-        pen = QtGui.QPen(QtGui.QColor(255, 255, 255, 180), 1.4)
-        p.setPen(pen)
-        for s in self.sparks:
-            alpha = max(0, min(255, int(s["life"] * 255)))
-            pen.setColor(QtGui.QColor.fromHsl(int(s["hue"]) % 360, 220, 180, alpha))
-            p.setPen(pen)
-            p.drawLine(s["x"], s["y"], s["x"] - s["vx"] * 0.03, s["y"] - s["vy"] * 0.03)
-
-        # Player
-        sp = (
-            math.hypot(self.vx, self.vy)
-            if self._control_mode == "mouse"
-            else self.forward_speed
+        SparkPainter.draw_tinted(
+            p, wd.sparks, pal.spark_pen, lag=(1.0 - a) * self.clock.step
         )
-        direction = (
-            math.atan2(self.vy, self.vx)
-            if self._control_mode == "mouse"
-            else self.heading
-        )
-        trail = min(sp * 0.04, 12)
+        probe.lap("sparks")
+
+        # Ghost (زیر بازیکن)
+        if self.ghost is not None:
+            self.ghost.draw(p, atlas, pal, w, h, a)
 
+        # Player
+        ppx, ppy, direction, trail = self.player_pose(a)
+        atlas.draw(p, ppx, ppy, pal.player_glow, PLAYER_R + trail * 0.6)
         p.save()
-        p.translate(self.px, self.py)
-        p.rotate(math.degrees(direction))
-        glowA = QtGui.QColor(self._theme.playerA)
-        glowA.setAlpha(100)
-        p.setBrush(glowA)
+        p.translate(ppx, ppy)
+        p.rotate(direction)
         p.setPen(QtCore.Qt.NoPen)
-        p.drawEllipse(
-            QtCore.QPointF(0, 0), PLAYER_R + trail * 0.6, PLAYER_R + trail * 0.6
-        )
-        grad2 = QtGui.QLinearGradient(-trail, -PLAYER_R, PLAYER_R, PLAYER_R)
-        grad2.setColorAt(0, QtGui.QColor(self._theme.playerA))
-        grad2.setColorAt(1, QtGui.QColor(self._theme.playerB))
-        p.setBrush(QtGui.QBrush(grad2))
+        p.setBrush(pal.player_gradient(-trail, -PLAYER_R, PLAYER_R, PLAYER_R))
         path = QtGui.QPainterPath()
         path.moveTo(PLAYER_R + 2, 0)
         path.lineTo(-PLAYER_R - trail, -PLAYER_R * 0.75)
@@ -783,9 +533,10 @@ class GameWidget(QtWidgets.QWidget):
         path.closeSubpath()
         p.drawPath(path)
         p.restore()
+        probe.lap("player")
 
         # Overlay زیبایی
-        self._draw_vignette_and_bands(p, w, h, t)
+        bg.blit(p, "overlay", None, w, h, self._draw_vignette_and_bands)
 
         # HUD پایین چپ
         p.setFont(QtGui.QFont("Inter", 10, QtGui.QFont.Bold))
@@ -826,6 +577,18 @@ class GameWidget(QtWidgets.QWidget):
         if self._photo_flash_ts and t - self._photo_flash_ts < 0.25:
             a = int(255 * (1.0 - (t - self._photo_flash_ts) / 0.25))
             p.fillRect(self.rect(), QtGui.QColor(255, 255, 255, a))
+        probe.lap("hud")
+
+    def player_pose(self, a: float):
+        """Interpolated player x, y, heading (degrees) and speed trail."""
+        wd = self.world
+        if self._control_mode == "mouse":
+            sp, direction = math.hypot(wd.vx, wd.vy), math.atan2(wd.vy, wd.vx)
+        else:
+            sp, direction = wd.forward_speed, wd.heading
+        x = lerp_wrap(wd.prev_px, wd.px, a, self.width())
+        y = lerp_wrap(wd.prev_py, wd.py, a, self.height())
+        return x, y, math.degrees(direction), min(sp * 0.04, 12)
 
     def set_submode(self, name: str):
         # classic, weave, flow, arch, mirror, collapse
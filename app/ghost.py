@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+"""Ghost racing: the best recorded run of a mode, replayed beside the live one.
+
+A ghost's run is fixed by its replay, so it is simulated once, when the
+ghost loads (before the live run starts): the input log is streamed through
+a player-only sim of its mode (`app.modes.ghost_sim`, no widget and no world
+beyond what moves the player) into a flat track of, per tick, the sim time
+and the player's interpolation segment. The live widget's `_tick` calls
+`follow(run.t)` after each step and the ghost advances through the track
+until its sim clock catches up -- one tick per live step, and still in time
+when the ghost was recorded at another sim rate -- so a live step pays an
+index bump, not a second simulation. The ghost ends at the replay's last tick.
+
+Only the ghost's player is drawn, with the live painter's glow sprite and
+palette at GHOST_OPACITY; the arrow path is built once and the body brush
+once per palette.
+
+The best replay per (mode, endless | story level) is kept next to the
+other replays in `best/` (`keep_if_best`, `load_ghost`).
+"""
+from array import array
+from pathlib import Path
+
+from PySide6 import QtCore, QtGui
+
+from app.fixed_step import lerp_wrap
+from app.modes.ghost_sim import GHOST_SIMS
+from app.replay import KEY_ABILITY, KEY_LEFT, KEY_RIGHT, MOUSE_Q, SUFFIX, Replay
+
+GHOST_KINDS = tuple(GHOST_SIMS)
+GHOST_OPACITY = 0.35
+GHOST_R = 10
+TRACK_STRIDE = 8  # t, x0, y0, x1, y1, degrees, w, h
+
+
+def ghost_key(header: dict) -> str:
+    key = f"{header['kind']}-{header['run_mode']}"
+    if header["run_mode"] == "story":
+        key += f"-{header['story_idx']}"
+    return key
+
+
+def best_path(root, header: dict) -> Path:
+    return Path(root) / "best" / (ghost_key(header) + SUFFIX)
+
+
+def keep_if_best(replay: Replay, root) -> bool:
+    """Store `replay` as its mode's ghost if it beats the current one."""
+    if replay.header["kind"] not in GHOST_KINDS:
+        return False
+    path = best_path(root, replay.header)
+    try:
+        old = Replay.load(path).header.get("score", -1)
+    except (OSError, ValueError):
+        old = -1
+    if replay.header["score"] <= old:
+        return False
+    path.parent.mkdir(parents=True, exist_ok=True)
+    replay.save(path)
+    return True
+
+
+def load_ghost(root, header: dict):
+    """Ghost for a run about to be recorded with `header`, or None."""
+    if header["kind"] not in GHOST_KINDS:
+        return None
+    try:
+        return Ghost(Replay.load(best_path(root, header)))
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def ghost_track(replay: Replay) -> array:
+    """The replay's player, simulated once: TRACK_STRIDE doubles per tick
+    (after 0, 1, ... ticks), the sim time followed by `segment()`."""
+    sim = GHOST_SIMS[replay.header["kind"]](replay.header)
+    out = array("d", (sim.t, *sim.segment()))
+    step, segment = sim.step, sim.segment
+    rate = dt = None
+    for qx, qy, keys, w, h, r in replay.frames():  # مثل _apply روی ویجت
+        if r != rate:
+            rate, dt = r, 1.0 / max(1.0, float(r))  # FixedStepClock.set_rate
+        step(qx / MOUSE_Q, qy / MOUSE_Q, bool(keys & KEY_LEFT), bool(keys & KEY_RIGHT),
+             bool(keys & KEY_ABILITY), w, h, dt)
+        out.append(sim.t)
+        out.extend(segment())
+    return out
+
+
+class Ghost:
+    def __init__(self, replay: Replay):
+        self.replay = replay
+        self.track = ghost_track(replay)
+        self._pad = GHOST_SIMS[replay.header["kind"]].wrap_pad
+        self.ticks = len(self.track) // TRACK_STRIDE - 1
+        self.tick = 0
+        self._path = QtGui.QPainterPath()
+        self._path.moveTo(GHOST_R + 2, 0)
+        self._path.lineTo(-GHOST_R, -GHOST_R * 0.75)
+        self._path.lineTo(-GHOST_R, GHOST_R * 0.75)
+        self._path.closeSubpath()
+        self._brush = (None, None)  # (palette, brush)
+
+    @property
+    def done(self) -> bool:
+        return self.tick >= self.ticks
+
+    def follow(self, t: float):
+        """Advance until the ghost's sim clock reaches the live run's `t`."""
+        track, i, end = self.track, self.tick, self.ticks
+        while i < end and track[i * TRACK_STRIDE] < t:
+            i += 1
+        self.tick = i
+
+    def pose(self, alpha: float):
+        """Interpolated x, y, heading (degrees) and the size it was recorded at."""
+        k = self.tick * TRACK_STRIDE
+        x0, y0, x1, y1, deg, w, h = self.track[k + 1 : k + TRACK_STRIDE]
+        return lerp_wrap(x0, x1, alpha, w + self._pad), lerp_wrap(y0, y1, alpha, h), deg, w, h
+
+    def draw(self, p: QtGui.QPainter, atlas, pal, w: float, h: float, alpha: float):
+        """Translucent ghost arrow on the live painter (live size w x h)."""
+        if self.done:
+            return
+        x, y, deg, gw, gh = self.pose(alpha)
+        x *= w / max(1, gw)
+        y *= h / max(1, gh)
+        if self._brush[0] is not pal:
+            grad = pal.player_gradient(-GHOST_R, -GHOST_R, GHOST_R, GHOST_R)
+            self._brush = (pal, QtGui.QBrush(grad))
+        p.save()
+        p.setOpacity(GHOST_OPACITY)
+        atlas.draw(p, x, y, pal.player_glow, GHOST_R + 2)
+        p.translate(x, y)
+        p.rotate(deg)
+        p.setPen(QtCore.Qt.NoPen)
+        p.setBrush(self._brush[1])
+        p.drawPath(self._path)
+        p.restore()
@@ -1,29 +1,121 @@
-import json, os, threading, requests
-from .settings import LOCAL_LB_PATH, API_URL
+import json, os, sqlite3, threading, time, requests
+from .settings import LOCAL_LB_DB, LOCAL_LB_PATH, API_URL
+from .types import ScoreEntry
+
+# هر ران یک سطر؛ ایندکس (mode, score DESC) همان top-k جدا برای هر مود است
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS scores (
+    id    INTEGER PRIMARY KEY,
+    mode  TEXT    NOT NULL,
+    name  TEXT    NOT NULL,
+    score INTEGER NOT NULL,
+    ts    REAL    NOT NULL
+);
+CREATE INDEX IF NOT EXISTS scores_by_mode ON scores (mode, score DESC, id);
+CREATE INDEX IF NOT EXISTS scores_by_player ON scores (mode, name, score DESC);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+"""
 
 
 class LocalLeaderboard:
-    def __init__(self, path: str = LOCAL_LB_PATH):
+    """Local scores in SQLite (WAL), one table of every run.
+
+    Each mode (`endless`, `story-N`, `flow-endless`, ...) is ranked on its
+    own through the `(mode, score DESC)` index: an insert is one B-tree
+    insert per index (O(log n)), `top()` walks the first N index entries
+    of its mode and `rank()` / `percentile()` count a range of that index
+    -- no query reads another mode or sorts the history. `top()` lists
+    ties oldest first; `rank()` gives equal scores the same place.
+
+    The old JSON file (`LOCAL_LB_PATH`, a global top 10) is imported once,
+    the first time the database is opened.
+    """
+
+    def __init__(self, path: str = LOCAL_LB_DB, legacy_path: str = LOCAL_LB_PATH):
         self.path = path
-        if not os.path.exists(self.path):
-            self._save([])
-
-    def _load(self):
-        try:
-            with open(self.path, "r", encoding="utf-8") as f:
-                return json.load(f)
-        except Exception:
-            return []
-
-    def _save(self, items):
-        with open(self.path, "w", encoding="utf-8") as f:
-            json.dump(items[:10], f, ensure_ascii=False, indent=2)
-
-    def add(self, name: str, score: int, mode: str):
-        items = self._load()
-        items.append({"name": name, "score": score, "mode": mode})
-        items.sort(key=lambda x: x["score"], reverse=True)
-        self._save(items)
+        self._db = sqlite3.connect(path)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")  # در WAL کافی و امن است
+        with self._db:
+            self._db.executescript(_SCHEMA)
+        self._migrate_json(legacy_path)
+
+    def close(self):
+        self._db.close()
+
+    def _migrate_json(self, legacy_path):
+        db = self._db
+        if db.execute("SELECT 1 FROM meta WHERE key = 'json_migrated'").fetchone():
+            return
+        items = []
+        if legacy_path and os.path.exists(legacy_path):
+            try:
+                with open(legacy_path, "r", encoding="utf-8") as f:
+                    items = json.load(f)
+            except Exception:
+                items = []
+        now = time.time()
+        rows = []
+        for it in items if isinstance(items, list) else ():
+            if not isinstance(it, dict):
+                continue
+            try:
+                rows.append((str(it.get("mode", "endless")), str(it.get("name", "Player")),
+                             int(it.get("score", 0)), float(it.get("ts", now))))
+            except (TypeError, ValueError, OverflowError):
+                continue  # سطر خراب قدیمی؛ بقیه وارد شوند، برنامه بالا بیاید
+        with db:
+            db.executemany("INSERT INTO scores (mode, name, score, ts) VALUES (?, ?, ?, ?)", rows)
+            db.execute("INSERT INTO meta (key, value) VALUES ('json_migrated', ?)", (str(len(rows)),))
+
+    # ---- write
+    def add(self, name: str, score: int, mode: str, ts: float = None) -> int:
+        with self._db:
+            cur = self._db.execute(
+                "INSERT INTO scores (mode, name, score, ts) VALUES (?, ?, ?, ?)",
+                (mode, name, int(score), time.time() if ts is None else ts),
+            )
+        return cur.lastrowid
+
+    # ---- queries
+    def top(self, mode: str, n: int = 10) -> list[ScoreEntry]:
+        rows = self._db.execute(
+            "SELECT name, score, ts FROM scores WHERE mode = ? ORDER BY score DESC, id LIMIT ?",
+            (mode, n),
+        )
+        return [ScoreEntry(name=r[0], score=r[1], mode=mode, ts=r[2]) for r in rows]
+
+    def count(self, mode: str) -> int:
+        return self._db.execute("SELECT COUNT(*) FROM scores WHERE mode = ?", (mode,)).fetchone()[0]
+
+    def modes(self) -> list[str]:
+        return [r[0] for r in self._db.execute("SELECT DISTINCT mode FROM scores ORDER BY mode")]
+
+    def rank(self, mode: str, score: int) -> int:
+        """Place `score` holds (or would hold) in `mode`; 1 is the top."""
+        above = self._db.execute(
+            "SELECT COUNT(*) FROM scores WHERE mode = ? AND score > ?", (mode, int(score))
+        ).fetchone()[0]
+        return above + 1
+
+    def best(self, name: str, mode: str):
+        """A player's best score in `mode`, or None."""
+        row = self._db.execute(
+            "SELECT MAX(score) FROM scores WHERE mode = ? AND name = ?", (mode, name)
+        ).fetchone()
+        return row[0]
+
+    def player_rank(self, name: str, mode: str):
+        """Rank of a player's best run in `mode`, or None if they have none."""
+        score = self.best(name, mode)
+        return None if score is None else self.rank(mode, score)
+
+    def percentile(self, mode: str, score: int) -> float:
+        """Share of `mode`'s runs (0..100) that `score` matches or beats."""
+        n = self.count(mode)
+        if not n:
+            return 100.0
+        return 100.0 * (n - self.rank(mode, score) + 1) / n
 
 
 class OnlineLeaderboard:
@@ -1,6 +1,9 @@
 from PySide6 import QtWidgets, QtGui, QtCore
 from .game_widget import GameWidget
+from .frame_scheduler import FrameScheduler
 from .leaderboard import LocalLeaderboard, OnlineLeaderboard
+from .replay import SUFFIX as REPLAY_SUFFIX, ReplayRecorder
+from .ghost import keep_if_best, load_ghost
 
 # ایمپورت‌ها
 from .views.hub_menu import HubMenu
@@ -21,7 +24,8 @@ from app.modes.signal_rush_widget import SignalRushWidget
 from app.views.games.rush_menu import RushMenu
 
 
-import json, os
+import json, os, time
+from pathlib import Path
 
 from app.i18n import tr
 from .settings import (
@@ -30,6 +34,9 @@ from .settings import (
     TAGLINE,
     STORY_LEVELS,
     PROGRESS_PATH,
+    REPLAY_DIR,
+    REPLAY_KEEP,
+    GHOST_ENABLED,
     SETTINGS_PATH,
     LANG_DEFAULT,
 )
@@ -64,6 +71,7 @@ class MainWindow(QtWidgets.QMainWindow):
         # ---- load persisted settings (lang/control/music/sfx/theme)
         self.settings = self._load_settings()
         self._lang = self.settings.get("lang", LANG_DEFAULT)
+        FrameScheduler.instance().set_pacing(self.settings.get("pacing", "precise"))
 
         # window basic
         self.setWindowTitle(tr("app.title", self._lang))
@@ -205,6 +213,7 @@ class MainWindow(QtWidgets.QMainWindow):
         self.game.set_music(self.settings.get("music", False))
         self.game.set_sfx(self.settings.get("sfx", True))
         self.game.set_theme(self.settings.get("theme", "Aurora"))
+        self.game.set_sim_rate(self.settings.get("sim_rate", 60))
 
         self.game.started.connect(lambda: self.quick_retry.hide())
         self.game.screenshotSaved.connect(
@@ -480,6 +489,43 @@ class MainWindow(QtWidgets.QMainWindow):
         else:
             self.stack.setCurrentIndex(0)
 
+    # ------------------------------------------------------------------
+    # Replays
+    def _start_replay(self):
+        G = self.active_game
+        if G.run.ticks == 0:  # ران تازه؛ ادامه بعد از Pause ضبط جدید نمی‌خواهد
+            G.recorder = ReplayRecorder(G)
+            if hasattr(G, "ghost"):
+                self._drop_ghost(G)
+                if GHOST_ENABLED:
+                    G.ghost = load_ghost(REPLAY_DIR, G.recorder.header)
+                    # ساخت مسیر روح بعد از wake بود؛ این فاصله dt فریم اول نشود
+                    G._frames.resync()
+
+    @staticmethod
+    def _drop_ghost(G):
+        if hasattr(G, "ghost"):
+            G.ghost = None
+
+    def _save_replay(self, score: int, mode: str, reason: str):
+        G = self.active_game
+        rec = getattr(G, "recorder", None)
+        if rec is None:
+            return
+        G.recorder = None
+        self._drop_ghost(G)
+        replay = rec.finish(score, mode, reason)
+        d = Path(REPLAY_DIR)
+        name = f"{time.strftime('%Y%m%d-%H%M%S')}-{replay.header['kind']}-{score}{REPLAY_SUFFIX}"
+        try:
+            d.mkdir(parents=True, exist_ok=True)
+            replay.save(d / name)
+            keep_if_best(replay, d)  # روح ران‌های بعدی
+            for old in sorted(d.glob("*" + REPLAY_SUFFIX))[:-REPLAY_KEEP]:
+                old.unlink()
+        except (OSError, ValueError):
+            pass
+
     # ------------------------------------------------------------------
     # End-of-run dialog
     def _on_run_end(self, score: int, mode: str, reason: str):
@@ -488,6 +534,7 @@ class MainWindow(QtWidgets.QMainWindow):
         name = self.name_edit.text().strip() or "Player"
         self.lb_local.add(name, score, mode)
         self.lb_online.submit(name, score, mode)
+        self._save_replay(score, mode, reason)  # بعد از امتیاز: خطای فایل ری‌پلی جلوی ثبت را نگیرد
 
         # تشخیص اینکه کدام ویجت فعال است (classic یا weave و ...)
         G = self.active_game
@@ -702,12 +749,14 @@ class MainWindow(QtWidgets.QMainWindow):
             lambda v: self.lbl_best.setText(f"Best: {v}")
         )
         self.active_game.runEnded.connect(self._on_run_end)
+        self.active_game.started.connect(self._start_replay)
 
         # اعمال تنظیمات فعلی روی بازی
         self.active_game.set_control_mode(self.settings.get("control", "Mouse"))
         self.active_game.set_music(self.settings.get("music", False))
         self.active_game.set_sfx(self.settings.get("sfx", True))
         self.active_game.set_theme(self.settings.get("theme", "Aurora"))
+        self.active_game.set_sim_rate(self.settings.get("sim_rate", 60))
 
         # فوکوس روی خود بازی
         QtCore.QTimer.singleShot(
@@ -726,5 +775,6 @@ class MainWindow(QtWidgets.QMainWindow):
                 self.active_game.bestChanged.disconnect()
             if self.active_game.runEnded.receivers() > 0:
                 self.active_game.runEnded.disconnect()
+            self.active_game.started.disconnect(self._start_replay)
         except Exception:
             pass
@@ -0,0 +1,325 @@
+# -*- coding: utf-8 -*-
+"""Qt-free simulation core for the Classic mode.
+
+`ClassicWorld` owns everything `GameWidget` used to keep next to its QWidget
+state: entities, spawn timers, `phase_val`, power timers and the player body.
+`step(dt, inputs)` advances one fixed tick and returns the events the widget
+should turn into signals, so a run can be stepped without a QApplication
+(benchmarks, bots, balancing). All randomness comes from `run.rng` (see
+`SimRun`), so `reset(seed)` plus the same inputs replays a run exactly.
+"""
+import math
+from dataclasses import dataclass
+
+import numpy as np
+
+from app.settings import MAX_PHASE, RAMP_DURATION, RAMP_RATE
+from app.fixed_step import damp, ease
+from app.sim_run import SimRun
+from app.modes.entity_store import EntityStore
+from app.modes.particles import ParticlePool
+from app.modes.spatial_hash import SpatialHash
+
+NODE_GRAB_R = 28
+NODE_GRAB_R2 = NODE_GRAB_R * NODE_GRAB_R
+GLITCH_HIT_R2 = 24 * 24
+PLAYER_R = 10
+POWER_TYPES = ("slowmo", "shield", "burst")  # powers.kind indexes this
+
+DEFAULT_LEVEL_MODS = {
+    "spawnMul": 1.0,
+    "glitchSpeedMul": 1.0,
+    "powerFreq": 9.5,
+    "theme": "Aurora",
+}
+
+
+@dataclass
+class ClassicInputs:
+    """Per-tick control state; the widget mutates one instance from events."""
+
+    mx: float = 0.0
+    my: float = 0.0
+    key_left: bool = False
+    key_right: bool = False
+
+
+class ClassicWorld:
+    # event kinds returned by step()
+    EV_SCORE = "score"  # (EV_SCORE, score)
+    EV_HIT = "hit"  # (EV_HIT,) run ended by a glitch
+    EV_TIMEOUT = "timeout"  # (EV_TIMEOUT,) story clock reached zero
+
+    # simulation state captured by replay snapshots (app.snapshot)
+    SNAPSHOT_ATTRS = (
+        "px", "py", "prev_px", "prev_py", "vx", "vy", "heading", "score", "combo",
+        "phase_val", "endless_elapsed", "time_left", "level_time", "nohit_failed",
+        "timers", "power_state", "nodes", "glitches", "powers", "_node_grid",
+        "_power_grid", "sparks", "run",
+    )
+
+    def __init__(self, width: float = 1200, height: float = 800):
+        self.width = float(width)
+        self.height = float(height)
+        self.mode = "endless"  # or "story"
+        self.control_mode = "mouse"  # "mouse" | "keys"
+        self.level_time = 60.0  # story only: duration of the current level
+
+        # keyboard control tuning
+        self.turn_speed = math.radians(180)
+        self.forward_speed = 240.0
+
+        self.level_mods = dict(DEFAULT_LEVEL_MODS)
+        self.base_node = 1.1
+        self.base_glitch = 2.4
+        self.base_power = 9.5
+
+        # nodes/glitches/powers are struct-of-arrays stores (see EntityStore)
+        self.nodes = EntityStore(64, extra=("t",))
+        self.glitches = EntityStore(64, extra=("x0", "y0"))  # x0/y0: previous tick
+        self.powers = EntityStore(16, extra=("pulse", "kind"))
+        # nodes and powers never move, so they are also bucketed by slot for
+        # pickup queries; moving glitches use the vectorized distance check
+        self._node_grid = SpatialHash(64)
+        self._power_grid = SpatialHash(64)
+        self.sparks = ParticlePool(512)
+        self.run = SimRun()  # seeded rng + sim clock of the current run
+        self._events = []
+        self.reset()
+
+    # ---- setup
+    def resize(self, width: float, height: float):
+        self.width = float(width)
+        self.height = float(height)
+
+    def reset(self, seed: int = None):
+        """Start a new run; `seed=None` picks a fresh one."""
+        self.run.reset(seed)
+        self.sparks.reseed(self.run.spark_seed)
+        self.score = 0
+        self.combo = 0
+        self.phase_val = 0.0
+        self.time_left = 0.0
+        self.nohit_failed = False
+        self.endless_elapsed = 0.0
+
+        self.nodes.clear()
+        self.glitches.clear()
+        self.sparks.clear()
+        self.powers.clear()
+        self._node_grid.clear()
+        self._power_grid.clear()
+
+        self.base_node = 1.1
+        self.base_glitch = 2.4
+        self.base_power = 9.5
+        self.timers = {"node": 0.6, "glitch": 1.5, "power": 3.5}
+        self.power_state = {"slowmo": 0.0, "shield": 0.0, "burst": 0.0}
+
+        w = max(1.0, self.width)
+        h = max(1.0, self.height)
+        self.px = self.prev_px = w / 2.0
+        self.py = self.prev_py = h / 2.0
+        self.vx = self.vy = 0.0
+        self.heading = 0.0
+
+    def apply_level_mods(self, mods: dict):
+        self.level_mods.update(DEFAULT_LEVEL_MODS)
+        self.level_mods.update(mods or {})
+        self.base_node = 1.1 / max(0.3, self.level_mods["spawnMul"])
+        self.base_glitch = 2.4 / max(0.3, self.level_mods["spawnMul"])
+        self.base_power = float(self.level_mods["powerFreq"])
+
+    # ---- simulation
+    def step(self, dt: float, inputs: ClassicInputs) -> list:
+        """Advance one tick. Returns a (reused) list of event tuples."""
+        events = self._events
+        events.clear()
+        self.run.advance(dt)
+        w = self.width
+        h = self.height
+        ps = self.power_state
+
+        # phase ramp
+        if self.mode == "endless":
+            self.endless_elapsed += dt
+            tnorm = max(0.0, min(1.0, (self.endless_elapsed / RAMP_DURATION)))
+            smooth = tnorm * tnorm * (3 - 2 * tnorm)
+            target = smooth * MAX_PHASE
+        else:
+            lvl_time = self.level_time
+            elapsed = max(0.0, lvl_time - self.time_left)
+            tnorm = max(0.0, min(1.0, elapsed / max(30.0, float(lvl_time))))
+            smooth = tnorm * tnorm * (3 - 2 * tnorm)
+            target = smooth * (MAX_PHASE * 0.5)
+        self.phase_val += (target - self.phase_val) * ease(RAMP_RATE, dt)
+        phase = self.phase_val
+
+        # timers with slowmo
+        slowmo = ps["slowmo"] > 0
+        slowmul = 0.5 if slowmo else 1.0
+        timers = self.timers
+        timers["node"] -= dt * (1 + phase * 0.04) * slowmul
+        timers["glitch"] -= dt * (1 + phase * 0.08) * slowmul
+        timers["power"] -= dt * slowmul
+
+        if timers["node"] <= 0:
+            self._spawn_node(w, h)
+            timers["node"] = max(0.5, self.base_node - phase * 0.04)
+        if timers["glitch"] <= 0:
+            self._spawn_glitch(w, h)
+            timers["glitch"] = max(0.8, self.base_glitch - phase * 0.08)
+        if timers["power"] <= 0:
+            self._spawn_power(w, h)
+            timers["power"] = max(2.5, self.base_power + self.run.rng.uniform(-2, 2))
+
+        # previous positions, for render interpolation
+        self.prev_px, self.prev_py = self.px, self.py
+        self._move_player(dt, inputs, w, h)
+        px, py = self.px, self.py
+
+        # entities: whole-column updates; dead slots are masked by `alive`
+        nodes, glitches, powers = self.nodes, self.glitches, self.powers
+        if nodes.count:
+            nodes.t += dt
+        if glitches.count:
+            k = dt * (0.6 if slowmo else 1.0) * self.level_mods.get(
+                "glitchSpeedMul", 1.0
+            )
+            gx, gy, gvx, gvy = glitches.x, glitches.y, glitches.vx, glitches.vy
+            np.copyto(glitches.x0, gx)
+            np.copyto(glitches.y0, gy)
+            tmp = glitches._tmp
+            gx += np.multiply(gvx, k, out=tmp)
+            gy += np.multiply(gvy, k, out=tmp)
+            glitches.life -= dt
+            # wall bounce: outside [0, w] <=> |x - w/2| > w/2
+            np.subtract(gx, w * 0.5, out=tmp)
+            np.negative(gvx, out=gvx, where=np.abs(tmp, out=tmp) > w * 0.5)
+            np.subtract(gy, h * 0.5, out=tmp)
+            np.negative(gvy, out=gvy, where=np.abs(tmp, out=tmp) > h * 0.5)
+            glitches.kill_many(
+                glitches.where(np.less_equal(glitches.life, 0.0, out=glitches._mask))
+            )
+
+        self.sparks.step(dt)
+        if powers.count:
+            powers.pulse += dt
+
+        # power timers
+        for k in ("slowmo", "shield", "burst"):
+            if ps[k] > 0:
+                ps[k] -= dt
+
+        # collisions
+        for i in self._node_grid.query(px, py, NODE_GRAB_R):
+            self._node_grid.remove(i)
+            nodes.kill(i)
+            self._emit_sparks(nodes.x[i], nodes.y[i], nodes.hue[i], 16, 120)
+            self.combo = min(99, self.combo + 1)
+            self.score += 8 + self.combo * 3
+            events.append((self.EV_SCORE, self.score))
+
+        for i in self._power_grid.query(px, py, NODE_GRAB_R):
+            self._power_grid.remove(i)
+            powers.kill(i)
+            kind = POWER_TYPES[int(powers.kind[i])]
+            if kind == "slowmo":
+                ps["slowmo"] = 4
+            if kind == "shield":
+                ps["shield"] = 5
+            if kind == "burst":
+                ps["burst"] = 1.2
+            self._emit_sparks(powers.x[i], powers.y[i], 50, 28, 140)
+
+        hits = glitches.within(px, py, GLITCH_HIT_R2)
+        if len(hits):
+            if ps["shield"] > 0 or ps["burst"] > 0:
+                glitches.kill_many(hits)
+                for i in hits.tolist():
+                    self._emit_sparks(
+                        glitches.x[i], glitches.y[i], glitches.hue[i], 18, 160
+                    )
+                    self.score += 12
+                    events.append((self.EV_SCORE, self.score))
+            else:
+                # ENDLESS & STORY: پایان با برخورد
+                events.append((self.EV_HIT,))
+                return events
+
+        # time only for Story
+        if self.mode == "story":
+            self.time_left = max(0.0, self.time_left - dt)
+            if self.time_left == 0.0:
+                events.append((self.EV_TIMEOUT,))
+        return events
+
+    def _move_player(self, dt: float, inputs: ClassicInputs, w: float, h: float):
+        if self.control_mode == "mouse":
+            accel = 700
+            damping = damp(0.88, dt)
+            maxs = 300
+            dx = inputs.mx - self.px
+            dy = inputs.my - self.py
+            vx = self.vx + (1 if dx > 0 else -1 if dx < 0 else 0) * accel * dt
+            vy = self.vy + (1 if dy > 0 else -1 if dy < 0 else 0) * accel * dt
+            sp = math.hypot(vx, vy)
+            if sp > maxs:
+                vx = vx / sp * maxs
+                vy = vy / sp * maxs
+            self.vx = vx = vx * damping
+            self.vy = vy = vy * damping
+            px = self.px + vx * dt
+            py = self.py + vy * dt
+        else:
+            # keys mode: constant forward + left/right turn
+            if inputs.key_left:
+                self.heading -= self.turn_speed * dt
+            if inputs.key_right:
+                self.heading += self.turn_speed * dt
+            px = self.px + math.cos(self.heading) * self.forward_speed * dt
+            py = self.py + math.sin(self.heading) * self.forward_speed * dt
+        if px < 0:
+            px += w
+        elif px > w:
+            px -= w
+        if py < 0:
+            py += h
+        elif py > h:
+            py -= h
+        self.px, self.py = px, py
+
+    # ---- spawners
+    def _spawn_node(self, w, h):
+        rng = self.run.rng
+        x = rng.uniform(40, w - 40)
+        y = rng.uniform(40, h - 40)
+        i = self.nodes.spawn(
+            x=x, y=y, r=rng.uniform(6, 10), t=0.0, hue=rng.uniform(180, 320)
+        )
+        self._node_grid.insert(i, x, y)
+
+    def _spawn_glitch(self, w, h):
+        rng = self.run.rng
+        speed = rng.uniform(28, 60) * (1 + self.phase_val * 0.06)
+        ang = rng.uniform(0, math.tau)
+        self.glitches.spawn(
+            x=rng.uniform(0, w),
+            y=rng.uniform(0, h),
+            vx=math.cos(ang) * speed,
+            vy=math.sin(ang) * speed,
+            r=rng.uniform(9, 12),
+            hue=rng.uniform(0, 20),
+            life=rng.uniform(6, 12),
+        )
+
+    def _spawn_power(self, w, h):
+        rng = self.run.rng
+        t = rng.choice(POWER_TYPES)
+        x = rng.uniform(40, w - 40)
+        y = rng.uniform(40, h - 40)
+        i = self.powers.spawn(x=x, y=y, r=10, kind=POWER_TYPES.index(t), pulse=0.0)
+        self._power_grid.insert(i, x, y)
+
+    def _emit_sparks(self, x, y, hue, n=12, speed=90):
+        self.sparks.burst(x, y, hue, n, speed, spread=0.1)
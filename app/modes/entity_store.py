@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+"""Struct-of-arrays entity storage: one NumPy column per field, `alive`
+mask and a free-list of slots (stable while alive, reused after `kill`)."""
+import numpy as np
+
+BASE_COLUMNS = ("x", "y", "vx", "vy", "r", "hue", "life")
+
+
+class EntityStore:
+    def __init__(self, capacity: int = 64, extra=()):
+        self.columns = BASE_COLUMNS + tuple(c for c in extra if c not in BASE_COLUMNS)
+        self.capacity = max(1, int(capacity))
+        self.alive = np.zeros(self.capacity, dtype=bool)
+        for name in self.columns:
+            setattr(self, name, np.zeros(self.capacity, dtype=np.float64))
+        self._alloc_scratch()
+        # stack of free slots; lowest index is handed out first
+        self._free = list(range(self.capacity - 1, -1, -1))
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def __bool__(self):
+        return self.count > 0
+
+    def spawn(self, **values) -> int:
+        if not self._free:
+            self._grow()
+        i = self._free.pop()
+        for name in self.columns:
+            getattr(self, name)[i] = values.get(name, 0.0)
+        self.alive[i] = True
+        self.count += 1
+        return i
+
+    def kill(self, i: int):
+        if self.alive[i]:
+            self.alive[i] = False
+            self._free.append(int(i))
+            self.count -= 1
+
+    def kill_many(self, idx):
+        """Kill every slot in `idx` (an index array of live slots)."""
+        if not len(idx):
+            return
+        self.alive[idx] = False
+        self._free.extend(idx.tolist())
+        self.count -= len(idx)
+
+    def clear(self):
+        self.alive[:] = False
+        self._free = list(range(self.capacity - 1, -1, -1))
+        self.count = 0
+
+    def indices(self) -> np.ndarray:
+        """Live slot indices in ascending order."""
+        return np.flatnonzero(self.alive)
+
+    def where(self, mask: np.ndarray) -> np.ndarray:
+        """Live slots where `mask` holds (mask is combined in place)."""
+        mask &= self.alive
+        if not mask.any():
+            return _EMPTY
+        return mask.nonzero()[0]
+
+    def within(self, x: float, y: float, r2: float) -> np.ndarray:
+        """Live slots whose (x, y) lies strictly inside radius^2 `r2`."""
+        if self.count == 0:
+            return _EMPTY
+        d, t = self._d2, self._tmp
+        np.subtract(self.x, x, out=d)
+        np.multiply(d, d, out=d)
+        np.subtract(self.y, y, out=t)
+        np.multiply(t, t, out=t)
+        d += t
+        return self.where(np.less(d, r2, out=self._mask))
+
+    def state(self) -> dict:
+        """Live slots, their columns and the free-list order (snapshots)."""
+        idx = np.flatnonzero(self.alive)
+        cols = np.array([getattr(self, c)[idx] for c in self.columns])
+        cols = cols.reshape(len(self.columns), len(idx))
+        return {"cap": self.capacity, "alive": idx, "cols": cols,
+                "free": np.array(self._free, dtype=np.int64)}
+
+    def load_state(self, st: dict):
+        cap = st["cap"]
+        if cap != self.capacity:
+            self.capacity = cap
+            for name in self.columns:
+                setattr(self, name, np.zeros(cap, dtype=np.float64))
+            self._alloc_scratch()
+        idx = st["alive"]
+        self.alive = np.zeros(cap, dtype=bool)
+        self.alive[idx] = True
+        for c, col in zip(self.columns, st["cols"]):
+            getattr(self, c)[idx] = col
+        self._free = st["free"].tolist()
+        self.count = len(idx)
+
+    def _alloc_scratch(self):
+        # reused per-query buffers so hot paths do not allocate
+        self._d2 = np.empty(self.capacity, dtype=np.float64)
+        self._tmp = np.empty(self.capacity, dtype=np.float64)
+        self._mask = np.empty(self.capacity, dtype=bool)
+
+    def _grow(self):
+        old = self.capacity
+        new = old * 2
+        alive = np.zeros(new, dtype=bool)
+        alive[:old] = self.alive
+        self.alive = alive
+        for name in self.columns:
+            col = np.zeros(new, dtype=np.float64)
+            col[:old] = getattr(self, name)
+            setattr(self, name, col)
+        self._free.extend(range(new - 1, old - 1, -1))
+        self.capacity = new
+        self._alloc_scratch()
+
+
+_EMPTY = np.empty(0, dtype=np.intp)
@@ -1,7 +1,27 @@
 # -*- coding: utf-8 -*-
 from PySide6 import QtWidgets, QtGui, QtCore
-import math, random, time
-
+import itertools, math, random, time
+
+import numpy as np
+
+from app.modes.flow_field import FlowField
+from app.modes.player_motion import (
+    flow_blink_target,
+    flow_energy_interval,
+    flow_energy_pos,
+    flow_glitch,
+    flow_glitch_interval,
+    flow_move,
+)
+from app.modes.spatial_hash import SpatialHash
+from app.modes.particles import ParticlePool
+from app.widgets.sparks import SparkPainter
+from app.widgets.glow_atlas import GlowAtlas
+from app.widgets.palette import Palette
+from app.widgets.paint_probe import NULL_PROBE
+from app.frame_scheduler import FrameScheduler
+from app.fixed_step import FixedStepClock, damp, ease, lerp_wrap
+from app.sim_run import SimRun
 from app.settings import (
     THEMES,
     INITIAL_TIME_ENDLESS,
@@ -11,22 +31,11 @@ from app.settings import (
 )
 
 PLAYER_R = 11
-ENERGY_R2 = 16 * 16
-GLITCH_R2 = 24 * 24
-
-
-# ---------- Flow Field (زمینهٔ برداری نرم و بی‌درز)
-def flow_vec(x: float, y: float, t: float) -> tuple[float, float]:
-    """
-    میدان برداری آرام با ترکیب موج‌های سینوسیِ کم‌دامنه.
-    خروجی: (fx, fy) که مقدارهای کوچک سرعت/شتاب محیطی‌اند.
-    """
-    s1 = math.sin((x * 0.005) + t * 0.35)
-    s2 = math.cos((y * 0.004) - t * 0.27)
-    s3 = math.sin((x * 0.003 + y * 0.003) * 0.9 + t * 0.18)
-    fx = 22 * s1 + 14 * s3
-    fy = 18 * s2 - 12 * s3
-    return fx, fy
+ENERGY_R = 16
+GLITCH_R = 24
+GRID_CELL = 64
+ENERGY_CORE = (110, 255, 210, 220)
+ENERGY_GLOW = (110, 255, 210, 90)
 
 
 class FlowWidget(QtWidgets.QWidget):
@@ -38,13 +47,23 @@ class FlowWidget(QtWidgets.QWidget):
     screenshotSaved = QtCore.Signal(str)
     started = QtCore.Signal()
 
+    # وضعیت شبیه‌سازی برای اسنپ‌شات ری‌پلی (app.snapshot)
+    SNAPSHOT_ATTRS = (
+        "px", "py", "_prev_pos", "vx", "vy", "heading", "score", "time_left",
+        "tier", "combo_absorb", "combo_window", "next_tier_need", "blink_charges",
+        "blink_cooldown", "blink_afterglow", "slow_field", "_phase", "_elapsed",
+        "timers", "energies", "glitches", "_energy_grid", "_glitch_grid", "_ids",
+        "sparks", "run",
+    )
+
     def __init__(self, parent=None):
         super().__init__(parent)
         self.setMouseTracking(True)
         self.setFocusPolicy(QtCore.Qt.StrongFocus)
 
         # تنظیمات
-        self._theme = THEMES["Aurora"]
+        self._pal = Palette.for_theme(THEMES["Aurora"])
+        self.paint_probe = NULL_PROBE
         self._lang = "fa"
         self._mode = "endless"  # endless | story
         self._control = "mouse"  # mouse | keys
@@ -59,6 +78,7 @@ class FlowWidget(QtWidgets.QWidget):
         # بازیکن
         self.px = self.width() / 2
         self.py = self.height() / 2
+        self._prev_pos = (self.px, self.py)  # جای بازیکن در تیک قبلی
         self.mx = self.px
         self.my = self.py
         self.vx = 0.0
@@ -69,10 +89,14 @@ class FlowWidget(QtWidgets.QWidget):
         self.key_left = False
         self.key_right = False
 
-        # اشیاء میدان
-        self.energies = []  # {x,y,t}
-        self.glitches = []  # {x,y,vx,vy,life,hue}
-        self.sparks = []  # {x,y,vx,vy,life,hue}
+        # اشیاء میدان (id -> entity) + شبکهٔ فضایی برای برخورد و موج شوک
+        self.energies = {}  # {x,y,t}
+        self.glitches = {}  # {x,y,vx,vy,life,hue}
+        self.sparks = ParticlePool(512)
+        self._ids = itertools.count()
+        self._energy_grid = SpatialHash(GRID_CELL)
+        # گلیچ‌ها مثل بازیکن از لبه‌ها wrap می‌شوند → شبکهٔ چنبره‌ای
+        self._glitch_grid = SpatialHash(GRID_CELL, wrap=True)
 
         # توانایی‌ها / تکامل
         self.tier = 1  # 1..4
@@ -94,22 +118,25 @@ class FlowWidget(QtWidgets.QWidget):
         self.timers = {"energy": 0.25, "glitch": 0.95}
 
         # لوپ
-        self._last = time.perf_counter()
-        self._acc = 0.0
-        self._step = 1 / 60.0
-        self._timer = QtCore.QTimer(self)
-        self._timer.timeout.connect(self._tick)
-        self._timer.start(1000 // 120)
+        self.clock = FixedStepClock()  # sim rate; alpha for interpolation
+        self.run = SimRun()  # rng + ساعت شبیه‌سازی هر ران
+        self.run_seed = None  # None: seed تازه برای هر ران
+        self.recorder = None  # ReplayRecorder هنگام ضبط ران
+        self.ghost = None  # Ghost: بهترین ران قبلی کنار ران زنده
+        self._frames = FrameScheduler.instance()
+        self._frames.register(self)
 
         # برای رندر خطوط جریان
-        self._flow_seeds = []  # هر seed: (x,y,phase)
+        self._flow_seeds = np.zeros((3, 0))  # ردیف‌ها: x, y, phase
+        # میدان جداپذیر؛ جدول‌ها فقط با تغییر اندازه ساخته می‌شوند
+        self._field = FlowField()
 
     # --- API تنظیمات
     def set_lang(self, lang: str):
         self._lang = lang
 
     def set_theme(self, name: str):
-        self._theme = THEMES.get(name, self._theme)
+        self._pal = Palette.for_theme(THEMES.get(name, self._pal.theme))
         self.update()
 
     def set_mode(self, mode: str):
@@ -124,6 +151,9 @@ class FlowWidget(QtWidgets.QWidget):
     def set_sfx(self, on: bool):
         pass
 
+    def set_sim_rate(self, hz: float):
+        self.clock.set_rate(hz)
+
     # --- آماده‌سازی
     def prepare_endless(self, _ignored=INITIAL_TIME_ENDLESS):
         self._reset_world()
@@ -136,6 +166,7 @@ class FlowWidget(QtWidgets.QWidget):
 
     def prepare_story(self, idx: int):
         self._reset_world()
+        self.story_idx = idx  # برای ری‌پلی
         self._mode = "story"
         self.time_left = 80 if idx < 5 else 65
         self.running = False
@@ -149,13 +180,14 @@ class FlowWidget(QtWidgets.QWidget):
             return
         self.running = True
         self.paused = False
-        self._last = time.perf_counter()
+        self._frames.wake(self)
         self.started.emit()
 
     def toggle_pause(self):
         if not self.running:
             return
         self.paused = not self.paused
+        self._frames.wake(self)
 
     def reset(self):
         if self._mode == "endless":
@@ -167,14 +199,21 @@ class FlowWidget(QtWidgets.QWidget):
     def _reset_world(self):
         w = max(1, self.width())
         h = max(1, self.height())
+        self.run.reset(self.run_seed)
         self.px, self.py = w / 2, h / 2
+        self._prev_pos = (self.px, self.py)
         self.vx = self.vy = 0.0
         self.heading = 0.0
         self.key_left = self.key_right = False
 
         self.energies.clear()
         self.glitches.clear()
+        self._ids = itertools.count()  # کلیدهای ران تازه از صفر (ری‌پلی)
         self.sparks.clear()
+        self.sparks.reseed(self.run.spark_seed)
+        self._energy_grid.clear()
+        self._glitch_grid.clear()
+        self._glitch_grid.resize(w, h)
 
         self.tier = 1
         self.combo_absorb = 0
@@ -185,6 +224,7 @@ class FlowWidget(QtWidgets.QWidget):
         self.blink_cooldown = 0.0
         self.blink_afterglow = 0.0
         self.slow_field = 0.0
+        self.ability_queued = False
 
         self._phase = 0.0
         self._elapsed = 0.0
@@ -195,34 +235,33 @@ class FlowWidget(QtWidgets.QWidget):
         self._init_flow_seeds()
 
     def _init_flow_seeds(self):
-        self._flow_seeds.clear()
         w = max(800, self.width())
         h = max(500, self.height())
-        random.seed(12)
-        for _ in range(60):
-            self._flow_seeds.append(
-                [
-                    random.uniform(0, w),
-                    random.uniform(0, h),
-                    random.uniform(0, math.tau),
-                ]
-            )
-
-    def _tick(self):
-        now = time.perf_counter()
-        dt = min(0.05, now - self._last)
-        self._last = now
+        rnd = random.Random(12)  # تزئینی؛ ثابت و جدا از rng ران
+        seeds = [
+            [rnd.uniform(0, w), rnd.uniform(0, h), rnd.uniform(0, math.tau)]
+            for _ in range(60)
+        ]
+        self._flow_seeds = np.array(seeds).T.copy()
+
+    def _tick(self, dt: float):
         if self.running and not self.paused:
-            self._acc += dt
-            while self._acc >= self._step:
-                self._update(self._step)
-                self._acc -= self._step
-            self.update()
-        else:
-            self.update()
+            rec, ghost = self.recorder, self.ghost
+            for step in self.clock.steps(dt):
+                if rec is not None:
+                    rec.capture(self)
+                self._update(step)
+                if not self.running:  # ران تمام شد: قدم‌های باقی فریم پایان را تکرار نکنند
+                    break
+                if ghost is not None:
+                    ghost.follow(self.run.t)
 
     def _update(self, dt: float):
         w, h = self.width(), self.height()
+        self.run.advance(dt)
+        if self.ability_queued:
+            self.ability_queued = False
+            self._blink()
 
         # سختی نرم
         if self._mode == "endless":
@@ -230,7 +269,7 @@ class FlowWidget(QtWidgets.QWidget):
             tnorm = max(0.0, min(1.0, self._elapsed / RAMP_DURATION))
             smooth = tnorm * tnorm * (3 - 2 * tnorm)
             target = smooth * MAX_PHASE
-            self._phase += (target - self._phase) * RAMP_RATE
+            self._phase += (target - self._phase) * ease(RAMP_RATE, dt)
 
         # میدان کند (بعد از پالس تکاملی)
         slowmul = 0.85 if self.slow_field > 0 else 1.0
@@ -238,46 +277,15 @@ class FlowWidget(QtWidgets.QWidget):
             self.slow_field -= dt
 
         # حرکت + تأثیر میدان + wrap
-        fx, fy = flow_vec(self.px, self.py, time.perf_counter())
-        if self._control == "mouse":
-            accel = (700 + 60 * (self.tier - 1)) * slowmul
-            damping = 0.88
-            maxs = 300 + 40 * (self.tier - 1)
-            dx = self.mx - self.px
-            dy = self.my - self.py
-            self.vx += (1 if dx > 0 else -1 if dx < 0 else 0) * accel * dt
-            self.vy += (1 if dy > 0 else -1 if dy < 0 else 0) * accel * dt
-            # اثر میدان (به‌صورت نیروی نرم)
-            self.vx += fx * 0.25 * dt
-            self.vy += fy * 0.25 * dt
-            sp = math.hypot(self.vx, self.vy)
-            if sp > maxs:
-                self.vx = self.vx / sp * maxs
-                self.vy = self.vy / sp * maxs
-            self.vx *= damping
-            self.vy *= damping
-            self.px += self.vx * dt
-            self.py += self.vy * dt
-        else:
-            if self.key_left:
-                self.heading -= self.turn_speed * dt
-            if self.key_right:
-                self.heading += self.turn_speed * dt
-            speed = (self.forward_speed + 30 * (self.tier - 1)) * slowmul
-            # اثر میدان به‌صورت لغزش جانبی
-            self.heading += math.atan2(fy, fx) * 0.0009
-            self.px += math.cos(self.heading) * speed * dt + fx * 0.12 * dt
-            self.py += math.sin(self.heading) * speed * dt + fy * 0.12 * dt
-
-        # wrap
-        if self.px < 0:
-            self.px += w
-        elif self.px > w:
-            self.px -= w
-        if self.py < 0:
-            self.py += h
-        elif self.py > h:
-            self.py -= h
+        field = self._field
+        field.resize(max(w, 800), max(h, 500))
+        field.set_time(self.run.t)  # یک بار در هر تیک، با ساعت شبیه‌سازی
+        fx, fy = field.at(self.px, self.py)
+        self._prev_pos = (self.px, self.py)
+        flow_move(
+            self, self._control == "mouse", self.mx, self.my, self.key_left,
+            self.key_right, fx, fy, slowmul, damp(0.88, dt), dt, w, h,
+        )
 
         # کول‌داون blink
         if self.blink_cooldown > 0:
@@ -291,16 +299,21 @@ class FlowWidget(QtWidgets.QWidget):
 
         if self.timers["energy"] <= 0:
             self._spawn_energy(w, h)
-            base = 0.45 - min(0.25, self._phase * 0.03)
-            self.timers["energy"] = max(0.18, base)
+            self.timers["energy"] = flow_energy_interval(self._phase)
 
         if self.timers["glitch"] <= 0:
             self._spawn_glitch(w, h)
-            self.timers["glitch"] = max(0.6, 1.4 - self._phase * 0.06)
+            self.timers["glitch"] = flow_glitch_interval(self._phase)
 
         # حرکت گلیچ‌ها + اثر میدان + wrap
-        for g in self.glitches:
-            fgx, fgy = flow_vec(g["x"], g["y"], time.perf_counter())
+        grid = self._glitch_grid
+        if grid.width != w or grid.height != h:
+            grid.resize(w, h)
+        dead = []
+        field_at = field.at
+        for k, g in self.glitches.items():
+            fgx, fgy = field_at(g["x"], g["y"])
+            g["x0"], g["y0"] = g["x"], g["y"]
             g["x"] += (g["vx"] + fgx * 0.15) * dt
             g["y"] += (g["vy"] + fgy * 0.15) * dt
             if g["x"] < 0:
@@ -312,41 +325,44 @@ class FlowWidget(QtWidgets.QWidget):
             elif g["y"] > h:
                 g["y"] -= h
             g["life"] -= dt
-        self.glitches = [g for g in self.glitches if g["life"] > 0]
+            if g["life"] > 0:
+                grid.move(k, g["x"], g["y"])
+            else:
+                dead.append(k)
+        for k in dead:
+            del self.glitches[k]
+            grid.remove(k)
 
         # جذب انرژی + زنجیره
         if self.combo_window > 0:
             self.combo_window -= dt
-        i = len(self.energies) - 1
-        while i >= 0:
-            en = self.energies[i]
+        for en in self.energies.values():
             en["t"] += dt
-            if (self.px - en["x"]) ** 2 + (self.py - en["y"]) ** 2 < ENERGY_R2:
-                self.energies.pop(i)
-                self._emit_sparks(en["x"], en["y"], 120, 14, 140)
-                self.score += 12 + 2 * (self.tier - 1)
-                self.scoreChanged.emit(self.score)
-
-                # شارژ blink و زنجیره
-                self.blink_charges = min(self.blink_max, self.blink_charges + 0.5)
-                if self.combo_window > 0:
-                    self.combo_absorb += 1
-                else:
-                    self.combo_absorb = 1
-                self.combo_window = 2.0  # دو ثانیه فرصت زنجیره
-
-                # پالس تکاملی
-                if self.combo_absorb >= 4:
-                    self.combo_absorb = 0
-                    self._evolution_pulse()
-            i -= 1
+        for k in self._energy_grid.query(self.px, self.py, ENERGY_R):
+            self._energy_grid.remove(k)
+            en = self.energies.pop(k)
+            self._emit_sparks(en["x"], en["y"], 120, 14, 140)
+            self.score += 12 + 2 * (self.tier - 1)
+            self.scoreChanged.emit(self.score)
+
+            # شارژ blink و زنجیره
+            self.blink_charges = min(self.blink_max, self.blink_charges + 0.5)
+            if self.combo_window > 0:
+                self.combo_absorb += 1
+            else:
+                self.combo_absorb = 1
+            self.combo_window = 2.0  # دو ثانیه فرصت زنجیره
+
+            # پالس تکاملی
+            if self.combo_absorb >= 4:
+                self.combo_absorb = 0
+                self._evolution_pulse()
 
         # برخورد گلیچ (اگر در افترگلو نبودی)
         if self.blink_afterglow <= 0:
-            for g in self.glitches:
-                if (self.px - g["x"]) ** 2 + (self.py - g["y"]) ** 2 < GLITCH_R2:
-                    self._finish("hit")
-                    return
+            if self._glitch_grid.query(self.px, self.py, GLITCH_R):
+                self._finish("hit")
+                return
 
         # زمان استوری
         if self._mode == "story":
@@ -357,11 +373,7 @@ class FlowWidget(QtWidgets.QWidget):
                 return
 
         # کاهش عمر اسپارک‌ها
-        for s in list(self.sparks):
-            s["x"] += s["vx"] * self._step * 2
-            s["y"] += s["vy"] * self._step * 2
-            s["life"] -= self._step * 2
-        self.sparks = [s for s in self.sparks if s["life"] > 0]
+        self.sparks.step(dt * 2)
 
     # --- رویدادها و توانایی‌ها
     def _blink(self):
@@ -371,44 +383,23 @@ class FlowWidget(QtWidgets.QWidget):
         self.blink_cooldown = self.blink_cd_max
         self.blink_afterglow = 0.45  # تا 0.45ثانیه برخورد بی‌اثر و افکت
 
-        # مقصد دَش
-        dir_angle = (
-            math.atan2(self.vy, self.vx) if self._control == "mouse" else self.heading
+        # مقصد دَش (wrap شده)
+        nx, ny = flow_blink_target(
+            self, self._control == "mouse", self.mx, self.my, self.width(), self.height()
         )
-        if self._control == "mouse":
-            # اگر تقریباً ساکن بودی، جهت به سمت ماوس
-            if math.hypot(self.vx, self.vy) < 20:
-                dir_angle = math.atan2(self.my - self.py, self.mx - self.px)
-
-        dist = 160 + 20 * (self.tier - 1)
-        nx = self.px + math.cos(dir_angle) * dist
-        ny = self.py + math.sin(dir_angle) * dist
-
-        # wrap مقصد
-        w, h = self.width(), self.height()
-        if nx < 0:
-            nx += w
-        elif nx > w:
-            nx -= w
-        if ny < 0:
-            ny += h
-        elif ny > h:
-            ny -= h
 
         # موج شوک: گلیچ‌های نزدیک آسیب ببینند/حذف شوند
-        radius2 = (36 + 10 * (self.tier - 1)) ** 2
-        j = len(self.glitches) - 1
-        while j >= 0:
-            g = self.glitches[j]
-            if (nx - g["x"]) ** 2 + (ny - g["y"]) ** 2 <= radius2:
-                self._emit_sparks(g["x"], g["y"], g["hue"], 18, 160)
-                self.glitches.pop(j)
-                self.score += 10
-            j -= 1
+        radius = 36 + 10 * (self.tier - 1)
+        for k in self._glitch_grid.query(nx, ny, radius, inclusive=True):  # مثل قبل: <=
+            self._glitch_grid.remove(k)
+            g = self.glitches.pop(k)
+            self._emit_sparks(g["x"], g["y"], g["hue"], 18, 160)
+            self.score += 10
         self.scoreChanged.emit(self.score)
 
-        # تلپورت
+        # تلپورت (بدون درون‌یابی)
         self.px, self.py = nx, ny
+        self._prev_pos = (nx, ny)
 
     def _evolution_pulse(self):
         # ارتقاء نرم: Tier + میدان کند + امتیاز + شارژ
@@ -434,7 +425,7 @@ class FlowWidget(QtWidgets.QWidget):
             self.key_right = True
             return
         if k == QtCore.Qt.Key_Space:
-            self._blink()
+            self.ability_queued = True  # روی مرز قدم بعدی اجرا می‌شود (ری‌پلی)
             return
         if k in (QtCore.Qt.Key_Return, QtCore.Qt.Key_Enter):
             if not self.running:
@@ -471,37 +462,21 @@ class FlowWidget(QtWidgets.QWidget):
     # --- اسپاون / افکت
     def _spawn_energy(self, w, h):
         # انرژی‌ها کمی همراه جریان رانده می‌شوند (در رندر فقط pulsing است)
-        self.energies.append(
-            {"x": random.uniform(30, w - 30), "y": random.uniform(30, h - 30), "t": 0.0}
-        )
+        k = next(self._ids)
+        x, y = flow_energy_pos(self.run.rng, w, h)
+        en = {"x": x, "y": y, "t": 0.0}
+        self.energies[k] = en
+        self._energy_grid.insert(k, en["x"], en["y"])
 
     def _spawn_glitch(self, w, h):
-        sp = random.uniform(28, 60) * (1 + self._phase * 0.07)
-        ang = random.uniform(0, math.tau)
-        self.glitches.append(
-            {
-                "x": random.uniform(0, w),
-                "y": random.uniform(0, h),
-                "vx": math.cos(ang) * sp,
-                "vy": math.sin(ang) * sp,
-                "life": random.uniform(7, 12),
-                "hue": random.uniform(0, 20),
-            }
-        )
+        k = next(self._ids)
+        g = flow_glitch(self.run.rng, w, h, self._phase)
+        g["x0"], g["y0"] = g["x"], g["y"]  # قابل رسم حتی پیش از تیک بعد
+        self.glitches[k] = g
+        self._glitch_grid.insert(k, g["x"], g["y"])
 
     def _emit_sparks(self, x, y, hue, n=12, speed=90):
-        for i in range(n):
-            ang = (i / n) * math.tau + random.uniform(-0.2, 0.2)
-            self.sparks.append(
-                {
-                    "x": x,
-                    "y": y,
-                    "vx": math.cos(ang) * (speed + random.uniform(-20, 20)),
-                    "vy": math.sin(ang) * (speed + random.uniform(-20, 20)),
-                    "life": random.uniform(0.4, 0.8),
-                    "hue": hue,
-                }
-            )
+        self.sparks.burst(x, y, hue, n, speed, spread=0.2)
 
     # --- رندر
     def _draw_flow_lines(self, p: QtGui.QPainter, w: int, h: int, t: float):
@@ -511,102 +486,111 @@ class FlowWidget(QtWidgets.QWidget):
         """
         pen = QtGui.QPen(QtGui.QColor(180, 220, 255, 45), 1.0)
         p.setPen(pen)
-        for s in self._flow_seeds:
-            x, y, ph = s
-            path = QtGui.QPainterPath(QtCore.QPointF(x, y))
-            xx, yy = x, y
-            # 12 گام کوتاه روی میدان
-            for _ in range(12):
-                fx, fy = flow_vec(xx, yy, t + ph * 0.2)
-                xx += fx * 0.06
-                yy += fy * 0.06
-                # wrap ملایم
-                if xx < 0:
-                    xx += w
-                elif xx > w:
-                    xx -= w
-                if yy < 0:
-                    yy += h
-                elif yy > h:
-                    yy -= h
-                path.lineTo(xx, yy)
-            p.drawPath(path)
-            # seed را کمی جابجا کن تا زنده بماند
-            s[0], s[1] = xx, yy
-            s[2] += 0.03
+        field = self._field
+        field.resize(max(w, 800), max(h, 500))
+        field.set_time(t)
+        seeds = self._flow_seeds
+        xx, yy = seeds[0].copy(), seeds[1].copy()
+        phases = field.phases(seeds[2] * 0.2)
+        # 12 گام کوتاه روی میدان، همهٔ seedها با هم
+        xs = np.empty((13, len(xx)))
+        ys = np.empty((13, len(xx)))
+        xs[0], ys[0] = xx, yy
+        for i in range(1, 13):
+            fx, fy = field.sample(xx, yy, phases)
+            xx += fx * 0.06
+            yy += fy * 0.06
+            # wrap ملایم
+            np.mod(xx, w, out=xx)
+            np.mod(yy, h, out=yy)
+            xs[i], ys[i] = xx, yy
+        # گام‌هایی که wrap شده‌اند خط تمام‌صفحه نکشند (فقط moveTo)
+        jump = np.abs(np.diff(xs, axis=0)) > w * 0.5
+        jump |= np.abs(np.diff(ys, axis=0)) > h * 0.5
+        # همهٔ خطوط در یک path و یک drawPath
+        path = QtGui.QPainterPath()
+        line_to, move_to = path.lineTo, path.moveTo
+        for xr, yr, jr in zip(xs.T.tolist(), ys.T.tolist(), jump.T.tolist()):
+            move_to(xr[0], yr[0])
+            for i in range(1, 13):
+                (move_to if jr[i - 1] else line_to)(xr[i], yr[i])
+        p.drawPath(path)
+        # seed را کمی جابجا کن تا زنده بماند
+        seeds[0], seeds[1] = xx, yy
+        seeds[2] += 0.03
+
+    def player_pose(self, al: float):
+        """Interpolated player x, y, heading (degrees) and speed trail."""
+        if self._control == "mouse":
+            sp, direction = math.hypot(self.vx, self.vy), math.atan2(self.vy, self.vx)
+        else:
+            sp, direction = self.forward_speed + 30 * (self.tier - 1), self.heading
+        x0, y0 = self._prev_pos
+        x = lerp_wrap(x0, self.px, al, self.width())
+        y = lerp_wrap(y0, self.py, al, self.height())
+        return x, y, math.degrees(direction), min(sp * 0.04, 12)
 
     def paintEvent(self, e: QtGui.QPaintEvent):
         p = QtGui.QPainter(self)
         p.setRenderHint(QtGui.QPainter.Antialiasing)
         w, h = self.width(), self.height()
         t = time.perf_counter()
+        al = self.clock.alpha
+        pal = self._pal
+        probe = self.paint_probe
+        probe.begin()
 
         # بک‌گراند (HSL گرادیان آرام)
         grad = QtGui.QLinearGradient(0, 0, w, h)
-        a = self._theme.bgA + math.sin(t * 0.6) * 18
-        b = self._theme.bgB + math.cos(t * 0.5) * 18
+        a = pal.theme.bgA + math.sin(t * 0.6) * 18
+        b = pal.theme.bgB + math.cos(t * 0.5) * 18
         grad.setColorAt(0, QtGui.QColor.fromHsl(int(a) % 360, 180, 15))
         grad.setColorAt(1, QtGui.QColor.fromHsl(int(b) % 360, 180, 18))
         p.fillRect(self.rect(), grad)
 
         # خطوط جریان
         self._draw_flow_lines(p, w, h, t)
+        probe.lap("background")
 
         # انرژی‌ها
+        atlas = GlowAtlas.shared(self.devicePixelRatioF())
         p.setPen(QtCore.Qt.NoPen)
-        for en in self.energies:
-            en["t"] += self._step
-            pul = 1 + math.sin(en["t"] * 6) * 0.20
-            base = QtGui.QColor(110, 255, 210, 220)
-            glow = QtGui.QColor(110, 255, 210, 90)
-            p.setBrush(glow)
-            p.drawEllipse(QtCore.QPointF(en["x"], en["y"]), 10 * pul + 5, 10 * pul + 5)
-            p.setBrush(base)
-            p.drawEllipse(QtCore.QPointF(en["x"], en["y"]), 10 * pul, 10 * pul)
+        step = al * self.clock.step  # en["t"] را فقط _update جلو می‌برد
+        for en in self.energies.values():
+            pul = 1 + math.sin((en["t"] + step) * 6) * 0.20
+            atlas.draw(
+                p, en["x"], en["y"], ENERGY_CORE, 10 * pul, ENERGY_GLOW, 10 * pul + 5
+            )
 
         # گلیچ‌ها
-        for g in self.glitches:
-            halo = QtGui.QColor.fromHsl(int(g["hue"]) % 360, 240, 130, 110)
-            p.setBrush(halo)
-            p.setPen(QtCore.Qt.NoPen)
-            p.drawEllipse(QtCore.QPointF(g["x"], g["y"]), 14, 14)
-            core = QtGui.QColor.fromHsl(int(g["hue"]) % 360, 240, 180, 230)
-            p.setBrush(core)
-            p.drawEllipse(QtCore.QPointF(g["x"], g["y"]), 10, 10)
+        g_core, g_halo = pal.hsl(240, 180, 230), pal.hsl(240, 130, 110)
+        for g in self.glitches.values():
+            gx = lerp_wrap(g["x0"], g["x"], al, w)
+            gy = lerp_wrap(g["y0"], g["y"], al, h)
+            atlas.draw(p, gx, gy, g_core.rgba(g["hue"]), 10, g_halo.rgba(g["hue"]), 14)
+        probe.lap("entities")
 
         # اسپارک‌ها
-        pen = QtGui.QPen(QtGui.QColor(255, 255, 255, 180), 1.4)
-        p.setPen(pen)
-        for s in self.sparks:
-            p.drawLine(s["x"], s["y"], s["x"] - s["vx"] * 0.03, s["y"] - s["vy"] * 0.03)
+        SparkPainter.draw(p, self.sparks, pal.spark_pen, lag=(1.0 - al) * self.clock.step * 2)
+        probe.lap("sparks")
+
+        # روح بهترین ران (زیر بازیکن)
+        if self.ghost is not None:
+            self.ghost.draw(p, atlas, pal, w, h, al)
 
         # بازیکن (با افکت Blink)
-        sp = (
-            math.hypot(self.vx, self.vy)
-            if self._control == "mouse"
-            else (self.forward_speed + 30 * (self.tier - 1))
-        )
-        direction = (
-            math.atan2(self.vy, self.vx) if self._control == "mouse" else self.heading
-        )
-        trail = min(sp * 0.04, 12)
-        p.save()
-        p.translate(self.px, self.py)
-        p.rotate(math.degrees(direction))
+        ppx, ppy, direction, trail = self.player_pose(al)
         # glow
-        glow = QtGui.QColor(self._theme.playerA)
-        glow.setAlpha(100)
+        glow = pal.player_glow
         if self.blink_afterglow > 0:
-            glow = QtGui.QColor(110, 255, 210, 180)
-        p.setBrush(glow)
+            glow = (110, 255, 210, 180)
+        atlas.draw(p, ppx, ppy, glow, PLAYER_R + trail * 0.6)
+        p.save()
+        p.translate(ppx, ppy)
+        p.rotate(direction)
         p.setPen(QtCore.Qt.NoPen)
-        p.drawEllipse(
-            QtCore.QPointF(0, 0), PLAYER_R + trail * 0.6, PLAYER_R + trail * 0.6
-        )
         # body
-        grad2 = QtGui.QLinearGradient(-trail, -PLAYER_R, PLAYER_R, PLAYER_R)
-        grad2.setColorAt(0, QtGui.QColor(self._theme.playerA))
-        grad2.setColorAt(1, QtGui.QColor(self._theme.playerB))
+        grad2 = pal.player_gradient(-trail, -PLAYER_R, PLAYER_R, PLAYER_R)
         if self.blink_afterglow > 0:
             grad2.setColorAt(0, QtGui.QColor(110, 255, 210))
             grad2.setColorAt(1, QtGui.QColor(120, 230, 255))
@@ -618,13 +602,15 @@ class FlowWidget(QtWidgets.QWidget):
         path.closeSubpath()
         p.drawPath(path)
         p.restore()
+        probe.lap("player")
 
         # HUD
-        p.setPen(QtGui.QPen(QtGui.QColor(255, 255, 255, 150)))
-        p.setFont(QtGui.QFont("Inter", 10, QtGui.QFont.Bold))
+        p.setPen(pal.hud_pen)
+        p.setFont(pal.hud_font)
         mode = "Endless" if self._mode == "endless" else "Story"
         blink_txt = f"Blink: {int(self.blink_charges)}/{self.blink_max}" + (
             "" if self.blink_cooldown <= 0 else f" ({self.blink_cooldown:.1f}s)"
         )
         tier_txt = f"Tier {self.tier}"
         p.drawText(10, h - 28, f"Neural Flow — {mode} | {tier_txt} | {blink_txt}")
+        probe.lap("hud")
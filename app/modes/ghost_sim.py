@@ -0,0 +1,233 @@
+# -*- coding: utf-8 -*-
+"""Qt-free player-only re-simulations for ghost racing (see `app.ghost`).
+
+A ghost only ever shows where the recorded player was, so it does not need
+the whole world. Each sim keeps exactly the state the player's motion reads
+and reproduces the mode's `_update` for that state, bit for bit; the motion
+and spawn draws are the widgets' own code (`ClassicWorld._move_player`,
+`app.modes.player_motion`):
+
+    Classic  the body depends on inputs and size only.
+    Phantom  x only, from inputs and width; rows never push the player.
+    Flow     tier, slow field and blink charges come from energy pickups,
+             so energies (positions from the run's rng) and the spawn timers
+             are kept. Glitches are drawn from the rng to keep the stream in
+             step, then dropped: they change the score, never the player.
+
+Sparks, collisions, the score and story clocks are skipped everywhere -- the
+run ends at the replay's recorded tick count. `step()` takes one tick's
+decoded inputs and advances `t` by `dt`. `segment()` is what the widget's
+`player_pose` interpolates between, `(x0, y0, x1, y1, degrees, w, h)`: x is
+`lerp_wrap(x0, x1, alpha, w + wrap_pad)`, y the same over `h`.
+"""
+import math, random
+
+from app.fixed_step import damp, ease
+from app.settings import MAX_PHASE, RAMP_DURATION, RAMP_RATE
+from app.modes.classic_world import ClassicWorld, ClassicInputs
+from app.modes.flow_field import flow_vec
+from app.modes.player_motion import (
+    flow_blink_target,
+    flow_energy_interval,
+    flow_energy_pos,
+    flow_glitch,
+    flow_glitch_interval,
+    flow_move,
+    phantom_move,
+)
+
+FLOW_ENERGY_R = 16
+FLOW_CELL = 64.0  # > 2 * FLOW_ENERGY_R: دایرهٔ جذب حداکثر ۲×۲ خانه را می‌پوشاند
+
+
+class GhostSim:
+    wrap_pad = 0  # x wraps over width + wrap_pad
+
+    def __init__(self, header: dict):
+        self.width, self.height = header["width"], header["height"]
+        self.mode = header["run_mode"]
+        self.control_mode = header["control"]
+        self.t = 0.0  # مثل SimRun.t: جمع dt قدم‌ها
+        self._dt = None
+
+    def _set_dt(self, dt: float):
+        # ضریب‌های هر قدم فقط با تغییر نرخ شبیه‌سازی دوباره حساب می‌شوند
+        self._dt = dt
+        self._damp = damp(0.88, dt)
+        self._ease = ease(RAMP_RATE, dt)
+
+
+class ClassicGhostSim(GhostSim):
+    _move_player = ClassicWorld._move_player  # همان کد حرکت، روی همین فیلدها
+
+    def __init__(self, header: dict):
+        super().__init__(header)
+        self.turn_speed = math.radians(180)
+        self.forward_speed = 240.0
+        self.px = self.prev_px = max(1, self.width) / 2.0
+        self.py = self.prev_py = max(1, self.height) / 2.0
+        self.vx = self.vy = self.heading = 0.0
+        self.inputs = ClassicInputs()
+
+    def step(self, mx, my, left, right, ability, w, h, dt):
+        inputs = self.inputs
+        inputs.mx, inputs.my, inputs.key_left, inputs.key_right = mx, my, left, right
+        self.width, self.height = w, h
+        self.t += dt
+        self.prev_px, self.prev_py = self.px, self.py
+        self._move_player(dt, inputs, w, h)
+
+    def segment(self):
+        if self.control_mode == "mouse":
+            direction = math.atan2(self.vy, self.vx)
+        else:
+            direction = self.heading
+        return (self.prev_px, self.prev_py, self.px, self.py, math.degrees(direction),
+                self.width, self.height)
+
+
+class PhantomGhostSim(GhostSim):
+    keys_speed = 420.0
+    wrap_pad = 40  # [-20, w + 20]
+
+    def __init__(self, header: dict):
+        super().__init__(header)
+        self.px = self._prev_px = max(1, self.width) / 2
+        self.py = max(1, self.height) * 0.7
+        self.vx = 0.0
+
+    def step(self, mx, my, left, right, ability, w, h, dt):
+        self.width, self.height = w, h
+        self.t += dt
+        self._prev_px = self.px
+        if dt != self._dt:
+            self._set_dt(dt)
+        phantom_move(self, self.control_mode == "mouse", mx, left, right, self._damp, dt, w)
+
+    def segment(self):
+        return self._prev_px, self.py, self.px, self.py, -90.0, self.width, self.height
+
+
+class FlowGhostSim(GhostSim):
+    turn_speed = math.radians(180)
+    forward_speed = 235.0
+    blink_max = 2
+    blink_cd_max = 1.15
+
+    def __init__(self, header: dict):
+        super().__init__(header)
+        self.rng = random.Random(int(header["seed"]))  # همان SimRun.rng
+        w, h = max(1, self.width), max(1, self.height)
+        self.px, self.py = w / 2, h / 2
+        self._prev_pos = (self.px, self.py)
+        self.vx = self.vy = self.heading = 0.0
+        self._energies = {}  # (ix, iy) -> [(x, y)]; فقط تعداد جذب‌ها مهم است
+        self.tier = 1
+        self.combo_absorb = 0
+        self.combo_window = 0.0
+        self.blink_charges = 1
+        self.blink_cooldown = 0.0
+        self.slow_field = 0.0
+        self._phase = 0.0
+        self._elapsed = 0.0
+        self._energy_timer = 0.25
+        self._glitch_timer = 0.95
+
+    def step(self, mx, my, left, right, ability, w, h, dt):
+        self.width, self.height = w, h
+        self.t = t = self.t + dt
+        if dt != self._dt:
+            self._set_dt(dt)
+        if ability:
+            self._blink(mx, my, w, h)
+
+        if self.mode == "endless":
+            self._elapsed += dt
+            tnorm = self._elapsed / RAMP_DURATION
+            if tnorm > 1.0:
+                tnorm = 1.0
+            smooth = tnorm * tnorm * (3 - 2 * tnorm)
+            self._phase += (smooth * MAX_PHASE - self._phase) * self._ease
+
+        slowmul = 1.0
+        if self.slow_field > 0:
+            slowmul = 0.85
+            self.slow_field -= dt
+
+        # حرکت: همان FlowWidget._update (flow_vec == FlowField.at)
+        fx, fy = flow_vec(self.px, self.py, t)
+        self._prev_pos = (self.px, self.py)
+        flow_move(self, self.control_mode == "mouse", mx, my, left, right, fx, fy,
+                  slowmul, self._damp, dt, w, h)
+        px, py = self.px, self.py
+
+        if self.blink_cooldown > 0:
+            self.blink_cooldown -= dt
+
+        # اسپاون‌ها: همان ترتیب و همان برداشت‌ها از rng
+        self._energy_timer -= dt * slowmul
+        self._glitch_timer -= dt
+        if self._energy_timer <= 0:
+            x, y = flow_energy_pos(self.rng, w, h)
+            self._energies.setdefault((int(x // FLOW_CELL), int(y // FLOW_CELL)), []).append((x, y))
+            self._energy_timer = flow_energy_interval(self._phase)
+        if self._glitch_timer <= 0:
+            flow_glitch(self.rng, w, h, self._phase)  # فقط برای هم‌گامی rng
+            self._glitch_timer = flow_glitch_interval(self._phase)
+
+        if self.combo_window > 0:
+            self.combo_window -= dt
+        # جذب انرژی: همان شرط SpatialHash.query(px, py, FLOW_ENERGY_R)
+        cells = self._energies
+        ix, iy = int((px - FLOW_ENERGY_R) // FLOW_CELL), int((py - FLOW_ENERGY_R) // FLOW_CELL)
+        for c in ((ix, iy), (ix + 1, iy), (ix, iy + 1), (ix + 1, iy + 1)):
+            bucket = cells.get(c)
+            if not bucket:
+                continue
+            for x, y in bucket:
+                dx, dy = x - px, y - py
+                if dx * dx + dy * dy < FLOW_ENERGY_R * FLOW_ENERGY_R:
+                    self._absorb(c, px, py)
+                    break
+
+    def _absorb(self, c, px, py):
+        bucket = self._energies[c]
+        keep = []
+        for x, y in bucket:
+            dx, dy = x - px, y - py
+            if dx * dx + dy * dy < FLOW_ENERGY_R * FLOW_ENERGY_R:
+                self._pickup()
+            else:
+                keep.append((x, y))
+        self._energies[c] = keep
+
+    def _pickup(self):
+        self.blink_charges = min(self.blink_max, self.blink_charges + 0.5)
+        self.combo_absorb = self.combo_absorb + 1 if self.combo_window > 0 else 1
+        self.combo_window = 2.0
+        if self.combo_absorb >= 4:  # پالس تکاملی
+            self.combo_absorb = 0
+            if self.tier < 4:
+                self.tier += 1
+            self.slow_field = 2.5
+            self.blink_charges = min(self.blink_max, self.blink_charges + 1)
+
+    def _blink(self, mx, my, w, h):
+        if self.blink_charges < 1 or self.blink_cooldown > 0:
+            return
+        self.blink_charges -= 1
+        self.blink_cooldown = self.blink_cd_max
+        nx, ny = flow_blink_target(self, self.control_mode == "mouse", mx, my, w, h)
+        self.px, self.py = nx, ny
+        self._prev_pos = (nx, ny)
+
+    def segment(self):
+        if self.control_mode == "mouse":
+            direction = math.atan2(self.vy, self.vx)
+        else:
+            direction = self.heading
+        x0, y0 = self._prev_pos
+        return x0, y0, self.px, self.py, math.degrees(direction), self.width, self.height
+
+
+GHOST_SIMS = {"classic": ClassicGhostSim, "flow": FlowGhostSim, "phantom": PhantomGhostSim}
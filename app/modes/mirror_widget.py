@@ -1,11 +1,21 @@
 # -*- coding: utf-8 -*-
 from PySide6 import QtWidgets, QtGui, QtCore
-import math, random, time
+import math, time, itertools
 from app.settings import THEMES, INITIAL_TIME_ENDLESS, RAMP_DURATION, RAMP_RATE, MAX_PHASE
+from app.modes.spatial_hash import SpatialHash
+from app.modes.particles import ParticlePool
+from app.widgets.sparks import SparkPainter
+from app.widgets.glow_atlas import GlowAtlas
+from app.widgets.palette import Palette
+from app.widgets.paint_probe import NULL_PROBE
+from app.frame_scheduler import FrameScheduler
+from app.fixed_step import FixedStepClock, damp, ease, lerp, lerp_wrap
+from app.sim_run import SimRun
 
 PLAYER_R   = 10
-ORB_R2     = 14 * 14
-GLITCH_R2  = 22 * 22
+ORB_R      = 14
+GLITCH_R   = 22
+GRID_CELL  = 64
 
 class MirrorWidget(QtWidgets.QWidget):
     # سازگار با بقیهٔ مودها
@@ -16,13 +26,21 @@ class MirrorWidget(QtWidgets.QWidget):
     screenshotSaved = QtCore.Signal(str)
     started      = QtCore.Signal()
 
+    # وضعیت شبیه‌سازی برای اسنپ‌شات ری‌پلی (app.snapshot)
+    SNAPSHOT_ATTRS = (
+        "px", "py", "_prev_pos", "_mirror_pos", "vx", "vy", "heading", "score",
+        "time_left", "_phase", "_elapsed", "timers", "orbs", "glitches",
+        "_orb_grid", "_glitch_grid", "_ids", "sparks", "run",
+    )
+
     def __init__(self, parent=None):
         super().__init__(parent)
         self.setMouseTracking(True)
         self.setFocusPolicy(QtCore.Qt.StrongFocus)
 
         # تنظیمات
-        self._theme = THEMES["Aurora"]
+        self._pal = Palette.for_theme(THEMES["Aurora"])
+        self.paint_probe = NULL_PROBE
         self._lang  = "fa"
         self._mode  = "endless"       # endless | story
         self._control = "mouse"       # از Settings با set_control_mode تنظیم می‌شود
@@ -39,6 +57,7 @@ class MirrorWidget(QtWidgets.QWidget):
         self.py = (self.height() or 800) * 0.5
         self.vx = 0.0; self.vy = 0.0
         self.mx = self.px; self.my = self.py         # هدف ماوس
+        self._prev_pos = (self.px, self.py)          # جای بازیکن در تیک قبلی
 
         # حالت Keys
         self.heading = 0.0
@@ -47,9 +66,13 @@ class MirrorWidget(QtWidgets.QWidget):
         self.key_left = False; self.key_right = False
 
         # جهان مشترک
-        self.orbs     = []   # (x,y,t)
-        self.glitches = []   # {x,y,vx,vy,life,hue}
-        self.sparks   = []   # افکت
+        self.orbs     = {}   # id -> (x,y,t)
+        self.glitches = {}   # id -> {x,y,vx,vy,life,hue}
+        self._ids = itertools.count()
+        # گرید فضایی برای پرس‌وجوی نزدیکی (هر دو فلش)
+        self._orb_grid    = SpatialHash(GRID_CELL)
+        self._glitch_grid = SpatialHash(GRID_CELL)
+        self.sparks   = ParticlePool(512)   # افکت
 
         # سختی
         self._phase = 0.0
@@ -57,20 +80,21 @@ class MirrorWidget(QtWidgets.QWidget):
         self.timers = {"orb": 0.0, "glitch": 1.0}
 
         # لوپ
-        self._last = time.perf_counter()
-        self._acc = 0.0; self._step = 1/60.0
-        self._timer = QtCore.QTimer(self)
-        self._timer.timeout.connect(self._tick)
-        self._timer.start(1000//120)
+        self.clock = FixedStepClock()  # sim rate; alpha for interpolation
+        self.run = SimRun(); self.run_seed = None  # rng + ساعت هر ران (None: seed تازه)
+        self.recorder = None  # ReplayRecorder هنگام ضبط
+        self._frames = FrameScheduler.instance()
+        self._frames.register(self)
 
     # ---------- API عمومی ----------
     def set_lang(self, lang: str): self._lang = lang
-    def set_theme(self, name: str): self._theme = THEMES.get(name, self._theme); self.update()
+    def set_theme(self, name: str): self._pal = Palette.for_theme(THEMES.get(name, self._pal.theme)); self.update()
     def set_mode(self, mode: str):  self._mode = mode
     def set_control_mode(self, mode: str):
         self._control = "keys" if mode.lower().startswith("k") else "mouse"
     def set_music(self, on: bool): pass
     def set_sfx(self, on: bool):   pass
+    def set_sim_rate(self, hz: float): self.clock.set_rate(hz)
 
     def prepare_endless(self, _ignored=INITIAL_TIME_ENDLESS):
         self._reset_world()
@@ -82,6 +106,7 @@ class MirrorWidget(QtWidgets.QWidget):
 
     def prepare_story(self, idx: int):
         self._reset_world()
+        self.story_idx = idx  # برای ری‌پلی
         self._mode = "story"
         self.time_left = 70 if idx < 5 else 55
         self.running = False
@@ -92,12 +117,13 @@ class MirrorWidget(QtWidgets.QWidget):
     def start(self):
         if self._mode == "story" and self.time_left <= 0: return
         self.running = True; self.paused = False
-        self._last = time.perf_counter()
+        self._frames.wake(self)
         self.started.emit()
 
     def toggle_pause(self):
         if not self.running: return
         self.paused = not self.paused
+        self._frames.wake(self)
 
     def reset(self):
         if self._mode == "endless": self.prepare_endless()
@@ -106,7 +132,9 @@ class MirrorWidget(QtWidgets.QWidget):
     # ---------- داخل بازی ----------
     def _reset_world(self):
         w = max(1, self.width()); h = max(1, self.height())
+        self.run.reset(self.run_seed)
         self.px, self.py = w*0.45, h*0.5
+        self._prev_pos = (self.px, self.py)
         self.vx = self.vy = 0.0
         self.mx, self.my = self.px, self.py
         self.heading = 0.0
@@ -115,28 +143,29 @@ class MirrorWidget(QtWidgets.QWidget):
         self.score = 0
         self.orbs.clear()
         self.glitches.clear()
-        self.sparks.clear()
+        self._orb_grid.clear()
+        self._glitch_grid.clear()
+        self._ids = itertools.count()
+        self.sparks.clear(); self.sparks.reseed(self.run.spark_seed)
 
         self._phase = 0.0; self._elapsed = 0.0
         self.timers = {"orb": 0.0, "glitch": 1.0}
 
         for _ in range(6): self._spawn_orb()
 
-    def _tick(self):
-        now = time.perf_counter()
-        dt = min(0.05, now - self._last)
-        self._last = now
+    def _tick(self, dt: float):
         if self.running and not self.paused:
-            self._acc += dt
-            while self._acc >= self._step:
-                self._update(self._step)
-                self._acc -= self._step
-            self.update()
-        else:
-            self.update()
+            rec = self.recorder
+            for step in self.clock.steps(dt):
+                if rec is not None:
+                    rec.capture(self)
+                self._update(step)
+                if not self.running:  # ران تمام شد: قدم‌های باقی فریم پایان را تکرار نکنند
+                    break
 
     def _update(self, dt: float):
         w, h = self.width(), self.height()
+        self.run.advance(dt)
 
         # سختی نرم
         if self._mode == "endless":
@@ -144,18 +173,19 @@ class MirrorWidget(QtWidgets.QWidget):
             tnorm = max(0.0, min(1.0, self._elapsed / RAMP_DURATION))
             smooth = tnorm * tnorm * (3 - 2 * tnorm)
             target = smooth * MAX_PHASE
-            self._phase += (target - self._phase) * RAMP_RATE
+            self._phase += (target - self._phase) * ease(RAMP_RATE, dt)
 
         # حرکت بازیکن اصلی
+        self._prev_pos = (self.px, self.py)
         if self._control == "mouse":
-            accel, damping, maxs = 720, 0.88, 320
+            accel, damping, maxs = 720, damp(0.88, dt), 320
             dx = self.mx - self.px; dy = self.my - self.py
             self.vx += (1 if dx>0 else -1 if dx<0 else 0) * accel * dt
             self.vy += (1 if dy>0 else -1 if dy<0 else 0) * accel * dt
             sp = math.hypot(self.vx, self.vy)
             if sp>maxs:
                 self.vx = self.vx/sp*maxs; self.vy = self.vy/sp*maxs
-            self.vx *= 0.88; self.vy *= 0.88
+            self.vx *= damping; self.vy *= damping
             self.px += self.vx*dt; self.py += self.vy*dt
         else:
             if self.key_left:  self.heading -= self.turn_speed * dt
@@ -185,30 +215,31 @@ class MirrorWidget(QtWidgets.QWidget):
             self.timers["glitch"] = max(0.7, 1.6 - self._phase*0.06)
 
         # حرکت گلیچ‌ها + برخورد
-        for g in list(self.glitches):
+        grid = self._glitch_grid
+        for k, g in list(self.glitches.items()):
+            g["x0"], g["y0"] = g["x"], g["y"]
             g["x"] += g["vx"]*dt; g["y"] += g["vy"]*dt
             if g["x"] < 0 or g["x"] > w: g["vx"] *= -1
             if g["y"] < 0 or g["y"] > h: g["vy"] *= -1
             g["life"] -= dt
             if g["life"] <= 0:
-                self.glitches.remove(g); continue
-            # برخورد با هر کدام از دو فلش
-            if (self.px - g["x"])**2 + (self.py - g["y"])**2 < GLITCH_R2:
-                self._finish("hit"); return
-            if (mirror_x - g["x"])**2 + (mirror_y - g["y"])**2 < GLITCH_R2:
-                self._finish("hit"); return
+                del self.glitches[k]; grid.remove(k); continue
+            grid.move(k, g["x"], g["y"])
+        # برخورد با هر کدام از دو فلش
+        if grid.query(self.px, self.py, GLITCH_R) or grid.query(mirror_x, mirror_y, GLITCH_R):
+            self._finish("hit"); return
 
         # گرفتن اورب‌ها با «هر کدام» از فلش‌ها
-        i = len(self.orbs)-1
-        while i >= 0:
-            ox, oy, t = self.orbs[i]
-            if ((self.px - ox)**2 + (self.py - oy)**2 < ORB_R2) or \
-               ((mirror_x - ox)**2 + (mirror_y - oy)**2 < ORB_R2):
-                self.orbs.pop(i)
-                self._spark(ox, oy, 130)
-                self.score += 15
-                self.scoreChanged.emit(self.score)
-            i -= 1
+        hits = self._orb_grid.query(self.px, self.py, ORB_R)
+        hits += self._orb_grid.query(mirror_x, mirror_y, ORB_R)
+        for k in hits:
+            if k not in self.orbs:
+                continue  # هر دو فلش یک اورب را گرفته‌اند
+            ox, oy, t = self.orbs.pop(k)
+            self._orb_grid.remove(k)
+            self._spark(ox, oy, 130)
+            self.score += 15
+            self.scoreChanged.emit(self.score)
 
         # تایمر Story
         if self._mode == "story":
@@ -219,10 +250,7 @@ class MirrorWidget(QtWidgets.QWidget):
                 return
 
         # افکت‌ها
-        for s in list(self.sparks):
-            s["x"] += s["vx"]*dt; s["y"] += s["vy"]*dt
-            s["life"] -= dt
-            if s["life"] <= 0: self.sparks.remove(s)
+        self.sparks.step(dt)
 
         # ذخیره برای رندر
         self._mirror_pos = (mirror_x, mirror_y, mirror_heading)
@@ -230,32 +258,29 @@ class MirrorWidget(QtWidgets.QWidget):
     # ---------- اسپاون ----------
     def _spawn_orb(self):
         w, h = max(self.width(), 800), max(self.height(), 600)
-        self.orbs.append((
-            random.uniform(30, w-30),
-            random.uniform(30, h-30),
-            0.0
-        ))
+        rng = self.run.rng
+        x, y = rng.uniform(30, w-30), rng.uniform(30, h-30)
+        k = next(self._ids)
+        self.orbs[k] = (x, y, 0.0)
+        self._orb_grid.insert(k, x, y)
 
     def _spawn_glitch(self, w, h):
-        sp = random.uniform(36, 80) * (1 + self._phase*0.06)
-        ang = random.uniform(0, math.tau)
-        x = random.uniform(40, w-40)
-        y = random.uniform(40, h-40)
-        self.glitches.append({
+        rng = self.run.rng
+        sp = rng.uniform(36, 80) * (1 + self._phase*0.06)
+        ang = rng.uniform(0, math.tau)
+        x = rng.uniform(40, w-40)
+        y = rng.uniform(40, h-40)
+        k = next(self._ids)
+        self.glitches[k] = {
             "x": x, "y": y,
             "vx": math.cos(ang)*sp, "vy": math.sin(ang)*sp,
-            "life": random.uniform(6, 12),
-            "hue": random.uniform(0, 20)
-        })
+            "life": rng.uniform(6, 12),
+            "hue": rng.uniform(0, 20)
+        }
+        self._glitch_grid.insert(k, x, y)
 
     def _spark(self, x, y, hue):
-        for i in range(14):
-            a = (i/14)*math.tau + random.uniform(-0.1, 0.1)
-            self.sparks.append({
-                "x": x, "y": y,
-                "vx": math.cos(a)*160, "vy": math.sin(a)*160,
-                "life": 0.45, "hue": hue
-            })
+        self.sparks.burst(x, y, hue, 14, 160, spread=0.1, speed_jitter=0, life=(0.45, 0.45))
 
     # ---------- ورودی ----------
     def mouseMoveEvent(self, e):
@@ -298,50 +323,50 @@ class MirrorWidget(QtWidgets.QWidget):
         p = QtGui.QPainter(self); p.setRenderHint(QtGui.QPainter.Antialiasing)
         w,h = self.width(), self.height()
         t = time.perf_counter()
+        al = self.clock.alpha
+        pal = self._pal
+        probe = self.paint_probe
+        probe.begin()
 
         # بک‌گراند
         grad = QtGui.QLinearGradient(0,0,w,h)
-        a = self._theme.bgA + math.sin(t*0.7)*18
-        b = self._theme.bgB + math.cos(t*0.6)*18
+        a = pal.theme.bgA + math.sin(t*0.7)*18
+        b = pal.theme.bgB + math.cos(t*0.6)*18
         grad.setColorAt(0, QtGui.QColor.fromHsl(int(a)%360, 180, 15))
         grad.setColorAt(1, QtGui.QColor.fromHsl(int(b)%360, 180, 18))
         p.fillRect(self.rect(), grad)
+        probe.lap("background")
 
         # اورب‌ها
+        atlas = GlowAtlas.shared(self.devicePixelRatioF())
         p.setPen(QtCore.Qt.NoPen)
-        for ox,oy,tt in self.orbs:
+        for ox,oy,tt in self.orbs.values():
             pul = 1 + math.sin((tt + t*0.6)*6)*0.20
-            base = QtGui.QColor(120, 220, 255, 230)
-            glow = QtGui.QColor(base); glow.setAlpha(80)
-            p.setBrush(glow); p.drawEllipse(QtCore.QPointF(ox,oy), 11*pul, 11*pul)
-            p.setBrush(base); p.drawEllipse(QtCore.QPointF(ox,oy), 8*pul, 8*pul)
+            atlas.draw(p, ox, oy, (120, 220, 255, 230), 8*pul, (120, 220, 255, 80), 11*pul)
 
         # گلیچ‌ها
-        for g in self.glitches:
-            halo = QtGui.QColor.fromHsl(int(g["hue"])%360, 240, 130, 110)
-            p.setBrush(halo); p.setPen(QtCore.Qt.NoPen)
-            p.drawEllipse(QtCore.QPointF(g["x"], g["y"]), 13, 13)
-            core = QtGui.QColor.fromHsl(int(g["hue"])%360, 240, 180, 230)
-            p.setBrush(core); p.drawEllipse(QtCore.QPointF(g["x"], g["y"]), 9, 9)
+        g_core, g_halo = pal.hsl(240, 180, 230), pal.hsl(240, 130, 110)
+        for g in self.glitches.values():
+            gx, gy = lerp(g.get("x0", g["x"]), g["x"], al), lerp(g.get("y0", g["y"]), g["y"], al)
+            atlas.draw(p, gx, gy, g_core.rgba(g["hue"]), 9, g_halo.rgba(g["hue"]), 13)
+        probe.lap("entities")
 
         # اسپارک‌ها
         pen2 = QtGui.QPen(QtGui.QColor(255,255,255,170), 1.3)
-        p.setPen(pen2)
-        for s in self.sparks:
-            p.drawLine(s["x"], s["y"], s["x"] - s["vx"]*0.03, s["y"] - s["vy"]*0.03)
+        SparkPainter.draw(p, self.sparks, pen2, lag=(1.0 - al)*self.clock.step)
+        probe.lap("sparks")
 
         # دو فلش: اصلی + آینه‌ای
-        mirror_x, mirror_y, mirror_heading = getattr(self, "_mirror_pos", (w-self.px, self.py, self.heading+math.pi))
+        mirror_heading = getattr(self, "_mirror_pos", (0, 0, self.heading+math.pi))[2]
+        x0, y0 = self._prev_pos
+        px, py = lerp_wrap(x0, self.px, al, w), lerp_wrap(y0, self.py, al, h)
         def draw_player(x,y,dir_angle, vx=None, vy=None):
             sp = math.hypot(vx or 0.0, vy or 0.0) if self._control=="mouse" else self.forward_speed
             trail = min(sp * 0.04, 12)
+            atlas.draw(p, x, y, pal.player_glow, PLAYER_R + trail*0.6)
             p.save(); p.translate(x,y); p.rotate(math.degrees(dir_angle))
-            glowA = QtGui.QColor(self._theme.playerA); glowA.setAlpha(100)
-            p.setBrush(glowA); p.setPen(QtCore.Qt.NoPen)
-            p.drawEllipse(QtCore.QPointF(0,0), PLAYER_R + trail*0.6, PLAYER_R + trail*0.6)
-            grad2 = QtGui.QLinearGradient(-trail, -PLAYER_R, PLAYER_R, PLAYER_R)
-            grad2.setColorAt(0, QtGui.QColor(self._theme.playerA))
-            grad2.setColorAt(1, QtGui.QColor(self._theme.playerB))
+            p.setPen(QtCore.Qt.NoPen)
+            grad2 = pal.player_gradient(-trail, -PLAYER_R, PLAYER_R, PLAYER_R)
             p.setBrush(QtGui.QBrush(grad2))
             path = QtGui.QPainterPath()
             path.moveTo(PLAYER_R + 2, 0)
@@ -353,12 +378,14 @@ class MirrorWidget(QtWidgets.QWidget):
 
         # جهت فلش اصلی
         direction = math.atan2(self.vy, self.vx) if self._control=="mouse" else self.heading
-        draw_player(self.px, self.py, direction, self.vx, self.vy)
-        draw_player(mirror_x, mirror_y, mirror_heading)
+        draw_player(px, py, direction, self.vx, self.vy)
+        draw_player(w - px, py, mirror_heading)
+        probe.lap("player")
 
         # HUD
-        p.setPen(QtGui.QPen(QtGui.QColor(255,255,255,150)))
-        p.setFont(QtGui.QFont("Inter", 10, QtGui.QFont.Bold))
+        p.setPen(pal.hud_pen)
+        p.setFont(pal.hud_font)
         mode = "Endless" if self._mode=="endless" else "Story"
         ctrl = "Mouse" if self._control=="mouse" else "Keys"
         p.drawText(10, h-12, f"Mirror Pulse — {mode} | Ctrl: {ctrl}")
+        probe.lap("hud")
@@ -1,5 +1,5 @@
 from PySide6 import QtWidgets, QtGui, QtCore
-import math, random, time
+import math, time, itertools
 from app.settings import (
     THEMES,
     RAMP_DURATION,
@@ -7,6 +7,15 @@ from app.settings import (
     MAX_PHASE,
     INITIAL_TIME_ENDLESS,
 )
+from app.modes.spatial_hash import SpatialHash
+from app.modes.particles import ParticlePool
+from app.widgets.sparks import SparkPainter
+from app.widgets.glow_atlas import GlowAtlas
+from app.widgets.palette import Palette
+from app.widgets.paint_probe import NULL_PROBE
+from app.frame_scheduler import FrameScheduler
+from app.fixed_step import FixedStepClock, damp, ease, lerp
+from app.sim_run import SimRun
 
 # -------------------------
 #  Neural Collapse — Widget
@@ -19,8 +28,11 @@ from app.settings import (
 # -------------------------
 
 PLAYER_R = 10
-HIT_R2 = 22 * 22  # collision radius^2 vs glitches
-PICK_R2 = 26 * 26  # pick distance^2 for stabilizers
+HIT_R = 22  # collision radius vs glitches
+PICK_R = 26  # pick distance for stabilizers
+GRID_CELL = 64  # spatial hash cell size (px)
+PICK_CORE = (120, 230, 255, 220)
+PICK_GLOW = (120, 230, 255, 90)
 
 
 class NeuralCollapseWidget(QtWidgets.QWidget):
@@ -34,6 +46,14 @@ class NeuralCollapseWidget(QtWidgets.QWidget):
     screenshotSaved = QtCore.Signal(str)
     started = QtCore.Signal()
 
+    # simulation state captured by replay snapshots (app.snapshot)
+    SNAPSHOT_ATTRS = (
+        "px", "py", "_prev_pos", "vx", "vy", "heading", "score", "time_left",
+        "phase_val", "_elapsed_endless", "freeze_timer", "collapse_rate",
+        "safe_center", "safe_r", "safe_r_base", "_prev_safe_r", "timers",
+        "shards", "picks", "_shard_grid", "_pick_grid", "_ids", "sparks", "run",
+    )
+
     def __init__(self, parent=None):
         super().__init__(parent)
         self.setFocusPolicy(QtCore.Qt.StrongFocus)
@@ -41,13 +61,15 @@ class NeuralCollapseWidget(QtWidgets.QWidget):
 
         # options
         self._lang = "fa"
-        self._theme = THEMES.get("Aurora")
+        self._pal = Palette.for_theme(THEMES["Aurora"])
+        self.paint_probe = NULL_PROBE
         self._mode = "endless"  # "endless" | "story"
         self._control_mode = "mouse"  # "mouse" | "keys"
         self._sfx = True
 
         # player state
         self.px = self.py = 0.0
+        self._prev_pos = (0.0, 0.0)  # previous tick, for render interpolation
         self.vx = self.vy = 0.0
         self.mx = self.my = 0.0
         # keys control
@@ -68,14 +90,18 @@ class NeuralCollapseWidget(QtWidgets.QWidget):
         # collapse mechanics
         self.safe_center = (0.0, 0.0)
         self.safe_r = 160.0  # current radius
+        self._prev_safe_r = self.safe_r
         self.safe_r_base = 220.0  # base radius at start
         self.collapse_rate = 8.0  # px / sec, ramps up with phase
         self.freeze_timer = 0.0  # stabilizer effect
 
         # entities
-        self.shards = []  # moving hazards
-        self.picks = []  # stabilizers
-        self.sparks = []  # cosmetic
+        self.shards = {}  # id -> moving hazard
+        self.picks = {}  # id -> stabilizer
+        self._ids = itertools.count()
+        self._shard_grid = SpatialHash(GRID_CELL)
+        self._pick_grid = SpatialHash(GRID_CELL)
+        self.sparks = ParticlePool(512)  # cosmetic
 
         # spawn timers (seconds)
         self.timers = {
@@ -85,14 +111,14 @@ class NeuralCollapseWidget(QtWidgets.QWidget):
         self.base_timers = dict(self.timers)
 
         # loop timing
-        self._last = time.perf_counter()
-        self._acc = 0.0
-        self._step = 1 / 60.0
+        self.clock = FixedStepClock()  # sim rate; alpha for interpolation
         self._ui_acc = 0.0
+        self.run = SimRun()  # per-run rng + sim clock
+        self.run_seed = None  # None: fresh seed every run
+        self.recorder = None  # ReplayRecorder while a run is recorded
 
-        self._timer = QtCore.QTimer(self)
-        self._timer.timeout.connect(self._tick)
-        self._timer.start(1000 // 120)
+        self._frames = FrameScheduler.instance()
+        self._frames.register(self)
 
     # ------------ public config ------------
     def set_lang(self, lang: str):
@@ -100,7 +126,7 @@ class NeuralCollapseWidget(QtWidgets.QWidget):
 
     def set_theme(self, name: str):
         if name in THEMES:
-            self._theme = THEMES[name]
+            self._pal = Palette.for_theme(THEMES[name])
             self.update()
 
     def set_mode(self, mode: str):
@@ -115,6 +141,9 @@ class NeuralCollapseWidget(QtWidgets.QWidget):
     def set_sfx(self, on: bool):
         self._sfx = on
 
+    def set_sim_rate(self, hz: float):
+        self.clock.set_rate(hz)
+
     # ------------ lifecycle ------------
     def prepare_endless(self, _ignored: int = 0):
         self._reset_world()
@@ -127,6 +156,7 @@ class NeuralCollapseWidget(QtWidgets.QWidget):
     def prepare_story(self, idx: int = 0):
         # simple story: survive for fixed time; ramps difficulty smoothly
         self._reset_world()
+        self.story_idx = idx  # برای ری‌پلی
         self._mode = "story"
         self.time_left = 60.0 + idx * 10.0
         self.timeChanged.emit(int(self.time_left))
@@ -139,12 +169,13 @@ class NeuralCollapseWidget(QtWidgets.QWidget):
             return
         self.running = True
         self.paused = False
-        self._last = time.perf_counter()
+        self._frames.wake(self)
         self.started.emit()
 
     def toggle_pause(self):
         if self.running:
             self.paused = not self.paused
+            self._frames.wake(self)
 
     def reset(self):
         if self._mode == "endless":
@@ -156,8 +187,10 @@ class NeuralCollapseWidget(QtWidgets.QWidget):
     def _reset_world(self):
         w = max(1, self.width())
         h = max(1, self.height())
+        self.run.reset(self.run_seed)
         self.px = w / 2
         self.py = h / 2
+        self._prev_pos = (self.px, self.py)
         self.vx = self.vy = 0.0
         self.mx = self.px
         self.my = self.py
@@ -169,33 +202,36 @@ class NeuralCollapseWidget(QtWidgets.QWidget):
         self._elapsed_endless = 0.0
         self.safe_center = (w / 2.0, h / 2.0)
         self.safe_r_base = min(w, h) * 0.35
-        self.safe_r = self.safe_r_base
+        self.safe_r = self._prev_safe_r = self.safe_r_base
         self.freeze_timer = 0.0
 
         self.shards.clear()
         self.picks.clear()
+        self._shard_grid.clear()
+        self._pick_grid.clear()
+        self._ids = itertools.count()
         self.sparks.clear()
+        self.sparks.reseed(self.run.spark_seed)
         self.timers = dict(self.base_timers)
 
-    def _tick(self):
-        now = time.perf_counter()
-        dt = min(0.05, now - self._last)
-        self._last = now
-
+    def _tick(self, dt: float):
         if self.running and not self.paused:
-            self._acc += dt
-            while self._acc >= self._step:
-                self._update(self._step)
-                self._acc -= self._step
-                self._ui_acc += self._step
+            rec = self.recorder
+            for step in self.clock.steps(dt):
+                if rec is not None:
+                    rec.capture(self)
+                self._update(step)
+                if not self.running:  # ران تمام شد: قدم‌های باقی فریم پایان را تکرار نکنند
+                    break
+                self._ui_acc += step
                 if self._mode == "story" and self._ui_acc >= 0.1:
                     self.timeChanged.emit(max(0, int(math.ceil(self.time_left))))
                     self._ui_acc = 0.0
-        self.update()
 
     def _update(self, dt: float):
         w = self.width()
         h = self.height()
+        self.run.advance(dt)
 
         # --- difficulty ramp
         if self._mode == "endless":
@@ -203,7 +239,7 @@ class NeuralCollapseWidget(QtWidgets.QWidget):
             tnorm = max(0.0, min(1.0, (self._elapsed_endless / RAMP_DURATION)))
             smooth = tnorm * tnorm * (3 - 2 * tnorm)
             target = smooth * MAX_PHASE
-            self.phase_val += (target - self.phase_val) * RAMP_RATE
+            self.phase_val += (target - self.phase_val) * ease(RAMP_RATE, dt)
         else:
             # map from (remaining time) to softer phase ramp
             full = max(30.0, self.time_left + 1.0)
@@ -211,9 +247,10 @@ class NeuralCollapseWidget(QtWidgets.QWidget):
             tnorm = max(0.0, min(1.0, elapsed / full))
             smooth = tnorm * tnorm * (3 - 2 * tnorm)
             target = smooth * (MAX_PHASE * 0.6)
-            self.phase_val += (target - self.phase_val) * RAMP_RATE
+            self.phase_val += (target - self.phase_val) * ease(RAMP_RATE, dt)
 
         # --- collapse of safe circle
+        self._prev_safe_r = self.safe_r
         if self.freeze_timer > 0:
             self.freeze_timer -= dt
         else:
@@ -236,13 +273,14 @@ class NeuralCollapseWidget(QtWidgets.QWidget):
         if self.timers["pick"] <= 0:
             self._spawn_pick(w, h)
             self.timers["pick"] = max(
-                3.0, self.base_timers["pick"] + random.uniform(-2, 2)
+                3.0, self.base_timers["pick"] + self.run.rng.uniform(-2, 2)
             )
 
         # --- movement
+        self._prev_pos = (self.px, self.py)
         if self._control_mode == "mouse":
             accel = 700.0
-            damping = 0.88
+            damping = damp(0.88, dt)
             maxs = 300.0
             dx = self.mx - self.px
             dy = self.my - self.py
@@ -270,18 +308,23 @@ class NeuralCollapseWidget(QtWidgets.QWidget):
             )
 
         # --- shards movement & life
-        for s in self.shards:
+        grid = self._shard_grid
+        dead = []
+        for k, s in self.shards.items():
+            s["x0"], s["y0"] = s["x"], s["y"]
             s["x"] += s["vx"] * dt
             s["y"] += s["vy"] * dt
             s["life"] -= dt
-        self.shards = [s for s in self.shards if s["life"] > 0]
+            if s["life"] > 0:
+                grid.move(k, s["x"], s["y"])
+            else:
+                dead.append(k)
+        for k in dead:
+            del self.shards[k]
+            grid.remove(k)
 
         # --- sparks fade
-        for spk in self.sparks:
-            spk["x"] += spk["vx"] * dt
-            spk["y"] += spk["vy"] * dt
-            spk["life"] -= dt
-        self.sparks = [spk for spk in self.sparks if spk["life"] > 0]
+        self.sparks.step(dt)
 
         # --- collisions
         # outside safe?
@@ -293,28 +336,22 @@ class NeuralCollapseWidget(QtWidgets.QWidget):
             return
 
         # shards
-        i = len(self.shards) - 1
-        while i >= 0:
-            s = self.shards[i]
-            if (self.px - s["x"]) ** 2 + (self.py - s["y"]) ** 2 < HIT_R2:
-                self._emit_sparks(s["x"], s["y"], 0, 14, 130)
-                self._end_run("hit")
-                return
-            i -= 1
+        for k in grid.query(self.px, self.py, HIT_R):
+            s = self.shards[k]
+            self._emit_sparks(s["x"], s["y"], 0, 14, 130)
+            self._end_run("hit")
+            return
 
         # picks
-        i = len(self.picks) - 1
-        while i >= 0:
-            p = self.picks[i]
-            if (self.px - p["x"]) ** 2 + (self.py - p["y"]) ** 2 < PICK_R2:
-                self.picks.pop(i)
-                # effect: small expand + freeze collapse briefly
-                self.safe_r = min(self.safe_r_base, self.safe_r + 22.0)
-                self.freeze_timer = 2.0
-                self.score += 10
-                self.scoreChanged.emit(self.score)
-                self._emit_sparks(p["x"], p["y"], 200, 20, 150)
-            i -= 1
+        for k in self._pick_grid.query(self.px, self.py, PICK_R):
+            self._pick_grid.remove(k)
+            p = self.picks.pop(k)
+            # effect: small expand + freeze collapse briefly
+            self.safe_r = min(self.safe_r_base, self.safe_r + 22.0)
+            self.freeze_timer = 2.0
+            self.score += 10
+            self.scoreChanged.emit(self.score)
+            self._emit_sparks(p["x"], p["y"], 200, 20, 150)
 
         # story time
         if self._mode == "story":
@@ -332,51 +369,46 @@ class NeuralCollapseWidget(QtWidgets.QWidget):
     # ------------ spawners ------------
     def _spawn_shard(self, w, h):
         # Spawn a shard at ring border with inward velocity + small tangential drift
+        rng = self.run.rng
         cx, cy = self.safe_center
-        ang = random.uniform(0, math.tau)
+        ang = rng.uniform(0, math.tau)
         r = self.safe_r + 18.0
         x = cx + math.cos(ang) * r
         y = cy + math.sin(ang) * r
 
         speed = 120.0 + self.phase_val * 6.0
-        vx = -math.cos(ang) * speed + math.cos(ang + math.pi / 2.0) * random.uniform(
+        vx = -math.cos(ang) * speed + math.cos(ang + math.pi / 2.0) * rng.uniform(
             -28, 28
         )
-        vy = -math.sin(ang) * speed + math.sin(ang + math.pi / 2.0) * random.uniform(
+        vy = -math.sin(ang) * speed + math.sin(ang + math.pi / 2.0) * rng.uniform(
             -28, 28
         )
-        hue = random.uniform(0, 30)
+        hue = rng.uniform(0, 30)
 
-        self.shards.append(
-            {"x": x, "y": y, "vx": vx, "vy": vy, "r": 8.0, "hue": hue, "life": 4.0}
-        )
+        k = next(self._ids)
+        self.shards[k] = {
+            "x": x, "y": y, "vx": vx, "vy": vy, "r": 8.0, "hue": hue, "life": 4.0
+        }
+        self._shard_grid.insert(k, x, y)
 
     def _spawn_pick(self, w, h):
         # pick appears inside the safe circle
+        rng = self.run.rng
         cx, cy = self.safe_center
         for _ in range(10):
-            ang = random.uniform(0, math.tau)
-            rad = random.uniform(30.0, max(30.0, self.safe_r - 30.0))
+            ang = rng.uniform(0, math.tau)
+            rad = rng.uniform(30.0, max(30.0, self.safe_r - 30.0))
             x = cx + math.cos(ang) * rad
             y = cy + math.sin(ang) * rad
             # ensure inside
             if (x - cx) ** 2 + (y - cy) ** 2 < (self.safe_r - 18.0) ** 2:
                 break
-        self.picks.append({"x": x, "y": y, "pulse": 0.0})
+        k = next(self._ids)
+        self.picks[k] = {"x": x, "y": y, "pulse": 0.0}
+        self._pick_grid.insert(k, x, y)
 
     def _emit_sparks(self, x, y, hue, n=12, speed=120):
-        for i in range(n):
-            ang = (i / n) * math.tau + random.uniform(-0.15, 0.15)
-            self.sparks.append(
-                {
-                    "x": x,
-                    "y": y,
-                    "vx": math.cos(ang) * (speed + random.uniform(-20, 20)),
-                    "vy": math.sin(ang) * (speed + random.uniform(-20, 20)),
-                    "life": random.uniform(0.4, 0.8),
-                    "hue": hue,
-                }
-            )
+        self.sparks.burst(x, y, hue, n, speed, spread=0.15)
 
     # ------------ events ------------
     def mouseMoveEvent(self, e: QtGui.QMouseEvent):
@@ -429,21 +461,27 @@ class NeuralCollapseWidget(QtWidgets.QWidget):
             w = self.width()
             h = self.height()
             t = time.perf_counter()
+            al = self.clock.alpha
+            pal = self._pal
+            probe = self.paint_probe
+            probe.begin()
 
             # background gradient with subtle motion
             g = QtGui.QLinearGradient(0, 0, w, h)
-            a = (self._theme.bgA + math.sin(t * 0.3) * 18) % 360
-            b = (self._theme.bgB + math.cos(t * 0.25) * 18) % 360
+            a = (pal.theme.bgA + math.sin(t * 0.3) * 18) % 360
+            b = (pal.theme.bgB + math.cos(t * 0.25) * 18) % 360
             g.setColorAt(0, QtGui.QColor.fromHsl(int(a), 180, 16))
             g.setColorAt(1, QtGui.QColor.fromHsl(int(b), 180, 20))
             p.fillRect(self.rect(), g)
+            probe.lap("background")
 
             # safe circle (glow)
             cx, cy = self.safe_center
+            safe_r = lerp(self._prev_safe_r, self.safe_r, al)
             # outer halo
             p.setPen(QtCore.Qt.NoPen)
             p.setBrush(QtGui.QColor(120, 200, 255, 45))
-            p.drawEllipse(QtCore.QPointF(cx, cy), self.safe_r + 16, self.safe_r + 16)
+            p.drawEllipse(QtCore.QPointF(cx, cy), safe_r + 16, safe_r + 16)
 
             # ring core
             pen = QtGui.QPen(QtGui.QColor(180, 220, 255, 160))
@@ -451,49 +489,37 @@ class NeuralCollapseWidget(QtWidgets.QWidget):
             pen.setCapStyle(QtCore.Qt.RoundCap)
             p.setPen(pen)
             p.setBrush(QtCore.Qt.NoBrush)
-            p.drawEllipse(QtCore.QPointF(cx, cy), self.safe_r, self.safe_r)
+            p.drawEllipse(QtCore.QPointF(cx, cy), safe_r, safe_r)
 
             # shards (hazards)
-            for s in self.shards:
-                core = QtGui.QColor.fromHsl(int(s["hue"]) % 360, 220, 160, 230)
-                halo = QtGui.QColor.fromHsl(int(s["hue"]) % 360, 220, 120, 90)
-                p.setPen(QtCore.Qt.NoPen)
-                p.setBrush(halo)
-                p.drawEllipse(QtCore.QPointF(s["x"], s["y"]), s["r"] + 5, s["r"] + 5)
-                p.setBrush(core)
-                p.drawEllipse(QtCore.QPointF(s["x"], s["y"]), s["r"], s["r"])
+            atlas = GlowAtlas.shared(self.devicePixelRatioF())
+            s_core, s_halo = pal.hsl(220, 160, 230), pal.hsl(220, 120, 90)
+            for s in self.shards.values():
+                atlas.draw(
+                    p,
+                    lerp(s.get("x0", s["x"]), s["x"], al),
+                    lerp(s.get("y0", s["y"]), s["y"], al),
+                    s_core.rgba(s["hue"]),
+                    s["r"],
+                    s_halo.rgba(s["hue"]),
+                    s["r"] + 5,
+                )
 
             # stabilizer pickups
-            for pk in self.picks:
+            for pk in self.picks.values():
                 pk["pulse"] = pk.get("pulse", 0.0) + 0.016
                 pul = 1 + math.sin(pk["pulse"] * 6.0) * 0.25
-                col = QtGui.QColor(120, 230, 255, 220)
-                glow = QtGui.QColor(120, 230, 255, 90)
-                p.setPen(QtCore.Qt.NoPen)
-                p.setBrush(glow)
-                p.drawEllipse(
-                    QtCore.QPointF(pk["x"], pk["y"]), 12 * pul + 3, 12 * pul + 3
+                atlas.draw(
+                    p, pk["x"], pk["y"], PICK_CORE, 12 * pul, PICK_GLOW, 12 * pul + 3
                 )
-                p.setBrush(col)
-                p.drawEllipse(QtCore.QPointF(pk["x"], pk["y"]), 12 * pul, 12 * pul)
+            probe.lap("entities")
 
             # sparks
             pen = QtGui.QPen(QtGui.QColor(255, 255, 255, 180))
             pen.setWidthF(1.4)
             pen.setCapStyle(QtCore.Qt.RoundCap)
-            p.setPen(pen)
-            for spk in self.sparks:
-                alpha = max(0, min(255, int(spk["life"] * 255)))
-                pen.setColor(
-                    QtGui.QColor.fromHsl(int(spk["hue"]) % 360, 220, 180, alpha)
-                )
-                p.setPen(pen)
-                p.drawLine(
-                    spk["x"],
-                    spk["y"],
-                    spk["x"] - spk["vx"] * 0.03,
-                    spk["y"] - spk["vy"] * 0.03,
-                )
+            SparkPainter.draw_tinted(p, self.sparks, pen, lag=(1.0 - al) * self.clock.step)
+            probe.lap("sparks")
 
             # player
             spd = (
@@ -507,21 +533,15 @@ class NeuralCollapseWidget(QtWidgets.QWidget):
                 else self.heading
             )
             trail = min(spd * 0.04, 12)
+            x0, y0 = self._prev_pos
+            ppx, ppy = lerp(x0, self.px, al), lerp(y0, self.py, al)
+            # glow
+            atlas.draw(p, ppx, ppy, pal.player_glow, PLAYER_R + trail * 0.5)
             p.save()
-            p.translate(self.px, self.py)
+            p.translate(ppx, ppy)
             p.rotate(math.degrees(direction))
-            # glow
-            glowA = QtGui.QColor(self._theme.playerA)
-            glowA.setAlpha(100)
-            p.setBrush(glowA)
-            p.setPen(QtCore.Qt.NoPen)
-            p.drawEllipse(
-                QtCore.QPointF(0, 0), PLAYER_R + trail * 0.5, PLAYER_R + trail * 0.5
-            )
             # body
-            grad2 = QtGui.QLinearGradient(-trail, -PLAYER_R, PLAYER_R, PLAYER_R)
-            grad2.setColorAt(0, QtGui.QColor(self._theme.playerA))
-            grad2.setColorAt(1, QtGui.QColor(self._theme.playerB))
+            grad2 = pal.player_gradient(-trail, -PLAYER_R, PLAYER_R, PLAYER_R)
             p.setBrush(QtGui.QBrush(grad2))
             p.setPen(QtCore.Qt.NoPen)
             path = QtGui.QPainterPath()
@@ -531,17 +551,18 @@ class NeuralCollapseWidget(QtWidgets.QWidget):
             path.closeSubpath()
             p.drawPath(path)
             p.restore()
+            probe.lap("player")
 
             # footer chips (pace + ctrl)
             pace = 1 + self.phase_val * 0.15
-            p.setFont(QtGui.QFont("Inter", 10, QtGui.QFont.Bold))
-            pen = QtGui.QPen(QtGui.QColor(255, 255, 255, 150))
-            p.setPen(pen)
+            p.setFont(pal.hud_font)
+            p.setPen(pal.hud_pen)
             p.drawText(
                 10,
                 h - 10,
                 f"Pace: {pace:.2f}x  |  Ctrl: {self._control_mode.capitalize()}",
             )
+            probe.lap("hud")
 
         finally:
             p.end()
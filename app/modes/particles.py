@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+"""Fixed-capacity particle pool for cosmetic sparks.
+
+Particles live in preallocated NumPy columns used as a ring buffer: spawning
+writes at the head and, once the pool is full, overwrites the oldest
+particle. There is no per-spark dict and no list filtering; `step(dt)`
+integrates the used span in a few whole-array operations and dead particles
+(life <= 0) are simply skipped when drawing. Qt-free, so `ClassicWorld` can
+own one too.
+"""
+import numpy as np
+
+COLUMNS = ("x", "y", "vx", "vy", "life", "hue")
+
+
+class ParticlePool:
+    def __init__(self, capacity: int = 512, seed=None):
+        self.capacity = max(1, int(capacity))
+        for name in COLUMNS:
+            setattr(self, name, np.zeros(self.capacity, dtype=np.float64))
+        # cosmetic jitter has its own generator so sparks never consume the
+        # gameplay `random` stream
+        self.rng = np.random.default_rng(seed)
+        self._head = 0  # next slot to write
+        self._n = 0  # used span [0, _n); == capacity once the ring wrapped
+
+    def __len__(self):
+        return int(np.count_nonzero(self.life[: self._n] > 0.0))
+
+    def __bool__(self):
+        return self._n > 0
+
+    def clear(self):
+        self.life[:] = 0.0
+        self._head = 0
+        self._n = 0
+
+    def reseed(self, seed):
+        """Restart the jitter stream (per-run seed, see `SimRun.spark_seed`)."""
+        self.rng = np.random.default_rng(seed)
+
+    def _claim(self, n: int) -> np.ndarray:
+        """Slots for `n` new particles, evicting the oldest when full."""
+        cap = self.capacity
+        n = min(n, cap)
+        idx = (self._head + np.arange(n)) % cap
+        self._head = (self._head + n) % cap
+        self._n = min(cap, self._n + n)
+        return idx
+
+    def spawn(self, x, y, vx, vy, life, hue=0.0):
+        i = self._head
+        self._claim(1)
+        self.x[i] = x
+        self.y[i] = y
+        self.vx[i] = vx
+        self.vy[i] = vy
+        self.life[i] = life
+        self.hue[i] = hue
+
+    def burst(
+        self,
+        x,
+        y,
+        hue,
+        n=12,
+        speed=90.0,
+        spread=0.1,
+        speed_jitter=20.0,
+        life=(0.4, 0.8),
+    ):
+        """Ring of `n` sparks: angle i/n*tau +- spread, speed +- speed_jitter
+        (drawn per axis, like the old per-mode `_emit_sparks`)."""
+        if n <= 0:
+            return
+        idx = self._claim(n)
+        n = len(idx)
+        rng = self.rng
+        ang = np.arange(n) * (np.pi * 2.0 / n)
+        if spread:
+            ang += rng.uniform(-spread, spread, n)
+        sx = speed + (rng.uniform(-speed_jitter, speed_jitter, n) if speed_jitter else 0.0)
+        sy = speed + (rng.uniform(-speed_jitter, speed_jitter, n) if speed_jitter else 0.0)
+        self.x[idx] = x
+        self.y[idx] = y
+        self.vx[idx] = np.cos(ang) * sx
+        self.vy[idx] = np.sin(ang) * sy
+        lo, hi = life
+        self.life[idx] = rng.uniform(lo, hi, n) if hi > lo else lo
+        self.hue[idx] = hue
+
+    def step(self, dt: float):
+        n = self._n
+        if not n:
+            return
+        life = self.life[:n]
+        life -= dt
+        if life.max() <= 0.0:
+            # everything expired: rewind so an idle pool costs nothing
+            self._head = self._n = 0
+            return
+        self.x[:n] += self.vx[:n] * dt
+        self.y[:n] += self.vy[:n] * dt
+
+    def shift(self, dx: float, dy: float):
+        """Translate every particle (e.g. world scroll)."""
+        n = self._n
+        if n:
+            if dx:
+                self.x[:n] += dx
+            if dy:
+                self.y[:n] += dy
+
+    def state(self) -> dict:
+        n = self._n
+        cols = np.array([getattr(self, c)[:n] for c in COLUMNS]).reshape(len(COLUMNS), n)
+        return {"cap": self.capacity, "head": self._head, "n": n, "cols": cols,
+                "rng": self.rng.bit_generator.state}
+
+    def load_state(self, st: dict):
+        if st["cap"] != self.capacity:
+            self.__init__(st["cap"])
+        n = self._n = st["n"]
+        self._head = st["head"]
+        for c, col in zip(COLUMNS, st["cols"]):
+            getattr(self, c)[:n] = col
+        self.rng.bit_generator.state = st["rng"]
+
+    def live(self):
+        """(x, y, vx, vy, life, hue) arrays of the live particles."""
+        n = self._n
+        m = self.life[:n] > 0.0
+        return tuple(getattr(self, c)[:n][m] for c in COLUMNS)
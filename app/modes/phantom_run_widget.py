@@ -1,6 +1,6 @@
 # -*- coding: utf-8 -*-
 from PySide6 import QtWidgets, QtGui, QtCore
-import math, random, time
+import bisect, collections, math, time
 from app.settings import (
     THEMES,
     RAMP_DURATION,
@@ -8,8 +8,23 @@ from app.settings import (
     MAX_PHASE,
     INITIAL_TIME_ENDLESS,
 )
+from app.modes.particles import ParticlePool
+from app.modes.player_motion import phantom_move
+from app.widgets.sparks import SparkPainter
+from app.widgets.glow_atlas import GlowAtlas
+from app.widgets.palette import Palette
+from app.widgets.paint_probe import NULL_PROBE
+from app.frame_scheduler import FrameScheduler
+from app.fixed_step import FixedStepClock, damp, ease, lerp, lerp_wrap
+from app.sim_run import SimRun
 
 PLAYER_R = 11
+BAR_H_MAX = 24  # ضخامت نوار در سخت‌ترین فاز (18..24)
+ROW_PAD = 2  # حاشیهٔ بالا/پایین اسپرایت ردیف (خط لبه + درخشش شکاف)
+BAR_COL = (220, 235, 255, 48)
+EDGE_COL = (220, 235, 255, 120)
+POWER_CORE = (120, 220, 255, 220)
+POWER_GLOW = (120, 220, 255, 90)
 
 
 def rect_intersects_circle(rx, ry, rw, rh, cx, cy, r):
@@ -20,6 +35,11 @@ def rect_intersects_circle(rx, ry, rw, rh, cx, cy, r):
     return (dx * dx + dy * dy) <= (r * r)
 
 
+def _row_key(r):
+    # rows are kept bottom-first (descending y); bisect needs ascending keys
+    return -r["y"]
+
+
 class PhantomRunWidget(QtWidgets.QWidget):
     scoreChanged = QtCore.Signal(int)
     timeChanged = QtCore.Signal(int)
@@ -28,12 +48,23 @@ class PhantomRunWidget(QtWidgets.QWidget):
     screenshotSaved = QtCore.Signal(str)
     started = QtCore.Signal()
 
+    # simulation state captured by replay snapshots (app.snapshot); row
+    # sprites are a paint cache, rendered on a row's first paint (also after restore)
+    SNAPSHOT_ATTRS = (
+        "px", "py", "_prev_px", "vx", "score", "time_left", "phase_time",
+        "_phase", "_elapsed", "_row_timer", "_pow_timer", "_safe_band",
+        "_pattern", "_pattern_rows_left", "_snake_t", "_squeeze_dir",
+        "rows", "powerups", "sparks", "run",
+    )
+    SNAPSHOT_SKIP = ("sprite",)
+
     def __init__(self, parent=None):
         super().__init__(parent)
         self.setMouseTracking(True)
         self.setFocusPolicy(QtCore.Qt.StrongFocus)
 
-        self._theme = THEMES["Aurora"]
+        self._pal = Palette.for_theme(THEMES["Aurora"])
+        self.paint_probe = NULL_PROBE
         self._lang = "fa"
         self._control = "mouse"  # "mouse" | "keys"
         self._mode = "endless"  # endless | story
@@ -47,14 +78,18 @@ class PhantomRunWidget(QtWidgets.QWidget):
         # player (فقط محور X؛ فلش رو به بالا)
         self.px = (self.width() or 1200) / 2
         self.py = (self.height() or 800) * 0.7
+        self._prev_px = self.px  # previous tick, for render interpolation
         self.vx = 0.0
         self.mx = self.px
         self.key_left = self.key_right = False
         self.keys_speed = 420.0
 
         # world
-        self.rows = []  # {"y","speed","h":bar_h,"gaps":[(x,w)],"scored":bool}
-        self.sparks = []
+        # rows: oldest (lowest on screen) first; all rows fall at nearly the
+        # same speed, so spawn order is also descending y
+        # {"y","speed","h","gaps":[(x,w)],"solids":[(x0,x1)],"starts":[x0],"scored"}
+        self.rows = collections.deque()
+        self.sparks = ParticlePool(600)  # oldest sparks are overwritten
         self.powerups = []
         self.phase_time = 0.0
 
@@ -72,19 +107,20 @@ class PhantomRunWidget(QtWidgets.QWidget):
         self._squeeze_dir = -1  # برای کوچک/بزرگ شدن شکاف
 
         # loop
-        self._last = time.perf_counter()
-        self._acc = 0.0
-        self._step = 1 / 60.0
-        self._timer = QtCore.QTimer(self)
-        self._timer.timeout.connect(self._tick)
-        self._timer.start(1000 // 120)
+        self.clock = FixedStepClock()  # sim rate; alpha for interpolation
+        self.run = SimRun()  # per-run rng + sim clock
+        self.run_seed = None  # None: fresh seed every run
+        self.recorder = None  # ReplayRecorder while a run is recorded
+        self.ghost = None  # Ghost: the best earlier run beside the live one
+        self._frames = FrameScheduler.instance()
+        self._frames.register(self)
 
     # ---- public
     def set_lang(self, lang: str):
         self._lang = lang
 
     def set_theme(self, name: str):
-        self._theme = THEMES.get(name, self._theme)
+        self._pal = Palette.for_theme(THEMES.get(name, self._pal.theme))
         self.update()
 
     def set_mode(self, mode: str):
@@ -99,6 +135,9 @@ class PhantomRunWidget(QtWidgets.QWidget):
     def set_sfx(self, on: bool):
         pass
 
+    def set_sim_rate(self, hz: float):
+        self.clock.set_rate(hz)
+
     def prepare_endless(self, _ignore=INITIAL_TIME_ENDLESS):
         self._reset_world()
         self._mode = "endless"
@@ -110,6 +149,7 @@ class PhantomRunWidget(QtWidgets.QWidget):
 
     def prepare_story(self, idx: int):
         self._reset_world()
+        self.story_idx = idx  # برای ری‌پلی
         self._mode = "story"
         self.time_left = 70 if idx < 5 else 55
         self.running = False
@@ -123,13 +163,14 @@ class PhantomRunWidget(QtWidgets.QWidget):
             return
         self.running = True
         self.paused = False
-        self._last = time.perf_counter()
+        self._frames.wake(self)
         self.started.emit()
 
     def toggle_pause(self):
         if not self.running:
             return
         self.paused = not self.paused
+        self._frames.wake(self)
 
     def reset(self):
         if self._mode == "endless":
@@ -141,7 +182,8 @@ class PhantomRunWidget(QtWidgets.QWidget):
     def _reset_world(self):
         w = max(1, self.width())
         h = max(1, self.height())
-        self.px = w / 2
+        self.run.reset(self.run_seed)
+        self.px = self._prev_px = w / 2
         self.py = h * 0.7
         self.vx = 0.0
         self.mx = self.px
@@ -150,6 +192,7 @@ class PhantomRunWidget(QtWidgets.QWidget):
         self.phase_time = 0.0
         self.rows.clear()
         self.sparks.clear()
+        self.sparks.reseed(self.run.spark_seed)
         self.powerups.clear()
         self._phase = 0.0
         self._elapsed = 0.0
@@ -166,21 +209,21 @@ class PhantomRunWidget(QtWidgets.QWidget):
         for i in range(6):
             self._spawn_row(-i * 120 - 40)
 
-    def _tick(self):
-        now = time.perf_counter()
-        dt = min(0.05, now - self._last)
-        self._last = now
+    def _tick(self, dt: float):
         if self.running and not self.paused:
-            self._acc += dt
-            while self._acc >= self._step:
-                self._update(self._step)
-                self._acc -= self._step
-            self.update()
-        else:
-            self.update()
+            rec, ghost = self.recorder, self.ghost
+            for step in self.clock.steps(dt):
+                if rec is not None:
+                    rec.capture(self)
+                self._update(step)
+                if not self.running:  # ران تمام شد: قدم‌های باقی فریم پایان را تکرار نکنند
+                    break
+                if ghost is not None:
+                    ghost.follow(self.run.t)
 
     # ---- pattern selection
     def _maybe_switch_pattern(self):
+        rng = self.run.rng
         if self._pattern_rows_left > 0:
             self._pattern_rows_left -= 1
             return
@@ -192,9 +235,9 @@ class PhantomRunWidget(QtWidgets.QWidget):
             1 + self._phase * 0.08,
             1 + self._phase * 0.12,
         ]
-        self._pattern = random.choices(choices, weights=weights, k=1)[0]
+        self._pattern = rng.choices(choices, weights=weights, k=1)[0]
         # طول پترن بعدی
-        self._pattern_rows_left = random.randint(8, 14)
+        self._pattern_rows_left = rng.randint(8, 14)
         if self._pattern == "snake":
             self._snake_t = 0.0
         if self._pattern == "squeeze":
@@ -202,6 +245,7 @@ class PhantomRunWidget(QtWidgets.QWidget):
 
     # محاسبه‌ی باند امن بعدی بر اساس پترن
     def _next_safe_band(self, w, prev_left, prev_right):
+        rng = self.run.rng
         cx_prev = (prev_left + prev_right) * 0.5
         gw_prev = prev_right - prev_left
 
@@ -212,16 +256,16 @@ class PhantomRunWidget(QtWidgets.QWidget):
         pad = 60
 
         if self._pattern == "straight":
-            drift = random.uniform(-60, 60) * (0.6 + min(0.8, self._phase * 0.03))
+            drift = rng.uniform(-60, 60) * (0.6 + min(0.8, self._phase * 0.03))
             cx = max(pad, min(w - pad, cx_prev + drift))
-            gw = max(min_gap, min(max_gap, int(gw_prev + random.uniform(-18, 18))))
+            gw = max(min_gap, min(max_gap, int(gw_prev + rng.uniform(-18, 18))))
 
         elif self._pattern == "snake":
             # حرکت سینوسی کنترل‌شده
             self._snake_t += 0.35 + self._phase * 0.015
             amp = min(180, 80 + self._phase * 8)
             cx = max(pad, min(w - pad, cx_prev + math.sin(self._snake_t) * amp))
-            gw = max(min_gap, min(max_gap, int(gw_prev + random.uniform(-10, 10))))
+            gw = max(min_gap, min(max_gap, int(gw_prev + rng.uniform(-10, 10))))
 
         elif self._pattern == "squeeze":
             # باریک و پهن‌شدن آهسته
@@ -233,14 +277,14 @@ class PhantomRunWidget(QtWidgets.QWidget):
             elif gw > max_gap:
                 gw = max_gap
                 self._squeeze_dir = -1
-            drift = random.uniform(-45, 45)
+            drift = rng.uniform(-45, 45)
             cx = max(pad, min(w - pad, cx_prev + drift))
 
         else:  # "jump"
             # پرش ناگهانی سمت چپ/راست، اما همچنان ممکن
-            jump = random.choice([-1, 1]) * (160 + self._phase * 10)
+            jump = rng.choice([-1, 1]) * (160 + self._phase * 10)
             cx = max(pad, min(w - pad, cx_prev + jump))
-            gw = max(min_gap, min(max_gap, int(gw_prev + random.uniform(-14, 14))))
+            gw = max(min_gap, min(max_gap, int(gw_prev + rng.uniform(-14, 14))))
 
         left = int(cx - gw / 2)
         right = int(cx + gw / 2)
@@ -249,6 +293,7 @@ class PhantomRunWidget(QtWidgets.QWidget):
     # ---- spawn row (guaranteed path + decorative gaps)
     def _spawn_row(self, y=None):
         w = self.width()
+        rng = self.run.rng
         if y is None:
             y = -80
 
@@ -273,8 +318,8 @@ class PhantomRunWidget(QtWidgets.QWidget):
             extra_n = 3
         min_gap = 70
         for _ in range(extra_n):
-            gw = random.randint(min_gap, max(90, safe_gap[1] - 10))
-            gx = random.randint(20, w - 20 - gw)
+            gw = rng.randint(min_gap, max(90, safe_gap[1] - 10))
+            gx = rng.randint(20, w - 20 - gw)
             # اگر خیلی به safe نزدیک بود، هل بده
             if abs(gx - safe_gap[0]) < 40:
                 gx += 100 if gx < w / 2 else -100
@@ -282,27 +327,82 @@ class PhantomRunWidget(QtWidgets.QWidget):
             gaps.append((gx, gw))
         gaps.sort(key=lambda g: g[0])
 
+        # بخش‌های جامد نوار (مکمل شکاف‌ها) یک بار همین‌جا؛ شکاف‌های هم‌پوشان
+        # نباید lastx را عقب ببرند (وگرنه دیوار نامرئی داخل شکاف می‌سازد)
+        solids = []
+        lastx = 0
+        for gx, gw in gaps:
+            if gx - lastx > 2:
+                solids.append((lastx, gx))
+            lastx = max(lastx, gx + gw)
+        if w - lastx > 2:
+            solids.append((lastx, w))
+
         # سرعت و ضخامت نوار
         base_speed = 130 + self._phase * 18
         bar_h = int(18 + min(6, self._phase * 0.5))  # 18..24
-        self.rows.append(
-            {"y": y, "speed": base_speed, "h": bar_h, "gaps": gaps, "scored": False}
+        # به ترتیب y (پایین اول) تا bisect در _hits_row درست بماند؛ ردیف
+        # اسپاون‌شده در -80 وسط ردیف‌های prefill می‌نشیند
+        bisect.insort(
+            self.rows,
+            {
+                "y": y,
+                "y0": y,
+                "speed": base_speed,
+                "h": bar_h,
+                "gaps": gaps,
+                "solids": solids,
+                "starts": [s[0] for s in solids],
+                "scored": False,
+            },
+            key=_row_key,
         )
 
         # مسیر امن برای ردیف بعد
         self._safe_band = (safe_gap[0], safe_gap[0] + safe_gap[1])
 
+    def _render_row(self, w, bar_h, gaps, solids) -> QtGui.QPixmap:
+        """The whole bar (solids, edge lines, gap glow) drawn once; a row's
+        geometry never changes after spawn, so paint only blits it."""
+        dpr = self.devicePixelRatioF()
+        sh = bar_h + 2 * ROW_PAD
+        pm = QtGui.QPixmap(int(math.ceil(max(1, w) * dpr)), int(math.ceil(sh * dpr)))
+        pm.setDevicePixelRatio(dpr)
+        pm.fill(QtCore.Qt.transparent)
+        p = QtGui.QPainter(pm)
+        p.setRenderHint(QtGui.QPainter.Antialiasing)
+        p.setPen(QtCore.Qt.NoPen)
+        p.setBrush(QtGui.QColor(*BAR_COL))
+        for x0, x1 in solids:
+            p.drawRect(QtCore.QRectF(x0, ROW_PAD, x1 - x0, bar_h))
+        # درخشش ملایم داخل شکاف‌ها (به‌جای سوراخ CompositionMode_Clear)
+        glow = QtGui.QLinearGradient(0, 0, 0, sh)
+        glow.setColorAt(0.0, QtGui.QColor(220, 235, 255, 0))
+        glow.setColorAt(0.5, QtGui.QColor(220, 235, 255, 22))
+        glow.setColorAt(1.0, QtGui.QColor(220, 235, 255, 0))
+        p.setBrush(QtGui.QBrush(glow))
+        for gx, gw in gaps:
+            p.drawRect(QtCore.QRectF(gx, 0, gw, sh))
+        p.setPen(QtGui.QPen(QtGui.QColor(*EDGE_COL), 1.2))
+        p.drawLine(QtCore.QLineF(0, ROW_PAD, w, ROW_PAD))
+        p.drawLine(QtCore.QLineF(0, ROW_PAD + bar_h, w, ROW_PAD + bar_h))
+        p.end()
+        return pm
+
     def _spawn_power(self):
         w = self.width()
+        rng = self.run.rng
         if self._safe_band:
-            x = random.uniform(self._safe_band[0] + 20, self._safe_band[1] - 20)
+            x = rng.uniform(self._safe_band[0] + 20, self._safe_band[1] - 20)
         else:
-            x = random.uniform(40, w - 40)
+            x = rng.uniform(40, w - 40)
         self.powerups.append({"x": x, "y": -20, "kind": "phase", "life": 10.0})
 
     # ---- update
     def _update(self, dt: float):
         w, h = self.width(), self.height()
+        self.run.advance(dt)
+        rng = self.run.rng
 
         # ramp
         if self._mode == "endless":
@@ -310,31 +410,14 @@ class PhantomRunWidget(QtWidgets.QWidget):
             tnorm = max(0.0, min(1.0, self._elapsed / RAMP_DURATION))
             smooth = tnorm * tnorm * (3 - 2 * tnorm)
             target = smooth * MAX_PHASE
-            self._phase += (target - self._phase) * RAMP_RATE
+            self._phase += (target - self._phase) * ease(RAMP_RATE, dt)
 
         # control (X only)
-        if self._control == "mouse":
-            accel = 900.0
-            damping = 0.88
-            maxs = 520.0
-            dx = self.mx - self.px
-            self.vx += (1 if dx > 0 else -1 if dx < 0 else 0) * accel * dt
-            sp = abs(self.vx)
-            if sp > maxs:
-                self.vx = (self.vx / sp) * maxs
-            self.vx *= damping
-            self.px += self.vx * dt
-        else:
-            if self.key_left:
-                self.px -= self.keys_speed * dt
-            if self.key_right:
-                self.px += self.keys_speed * dt
-
-        # wrap
-        if self.px < -20:
-            self.px += w + 40
-        elif self.px > w + 20:
-            self.px -= w + 40
+        self._prev_px = self.px
+        phantom_move(
+            self, self._control == "mouse", self.mx, self.key_left, self.key_right,
+            damp(0.88, dt), dt, w,
+        )
 
         # phase
         if self.phase_time > 0:
@@ -342,14 +425,17 @@ class PhantomRunWidget(QtWidgets.QWidget):
 
         # rows
         row_speed_mul = 1.0 + self._phase * 0.05
-        for r in list(self.rows):
-            r["y"] += r["speed"] * row_speed_mul * dt
+        rows = self.rows
+        k = row_speed_mul * dt
+        for r in rows:
+            r["y0"] = r["y"]
+            r["y"] += r["speed"] * k
             if not r["scored"] and r["y"] > self.py + 18:
                 self.score += 8
                 self.scoreChanged.emit(self.score)
                 r["scored"] = True
-            if r["y"] > h + 60:
-                self.rows.remove(r)
+        while rows and rows[0]["y"] > h + 60:
+            rows.popleft()
 
         # row spawn cadence (randomized but bounded)
         self._row_timer -= dt
@@ -357,15 +443,16 @@ class PhantomRunWidget(QtWidgets.QWidget):
             self._spawn_row()
             min_iv = max(0.36, 1.15 - self._phase * 0.06)
             max_iv = max(min_iv + 0.08, 1.35 - self._phase * 0.05)
-            self._row_timer = random.uniform(min_iv, max_iv)
+            self._row_timer = rng.uniform(min_iv, max_iv)
 
         # powerups
         self._pow_timer -= dt
         if self._pow_timer <= 0:
             self._spawn_power()
-            self._pow_timer = random.uniform(5.0, 8.0)
+            self._pow_timer = rng.uniform(5.0, 8.0)
 
         for P in list(self.powerups):
+            P["y0"] = P["y"]
             P["y"] += 160 * dt
             if (self.px - P["x"]) ** 2 + (self.py - P["y"]) ** 2 < (PLAYER_R + 8) ** 2:
                 if P["kind"] == "phase":
@@ -377,24 +464,9 @@ class PhantomRunWidget(QtWidgets.QWidget):
                 self.powerups.remove(P)
 
         # collisions (no phase)
-        if self.phase_time <= 0:
-            for r in self.rows:
-                bar_y, bar_h = r["y"] - r["h"] / 2, r["h"]
-                lastx = 0
-                for gx, gw in r["gaps"]:
-                    if gx - lastx > 2:
-                        if rect_intersects_circle(
-                            lastx, bar_y, gx - lastx, bar_h, self.px, self.py, PLAYER_R
-                        ):
-                            self._finish("hit")
-                            return
-                    lastx = gx + gw
-                if w - lastx > 2:
-                    if rect_intersects_circle(
-                        lastx, bar_y, w - lastx, bar_h, self.px, self.py, PLAYER_R
-                    ):
-                        self._finish("hit")
-                        return
+        if self.phase_time <= 0 and self._hits_row():
+            self._finish("hit")
+            return
 
         # story timer
         if self._mode == "story":
@@ -405,24 +477,31 @@ class PhantomRunWidget(QtWidgets.QWidget):
                 return
 
         # sparks
-        if abs(self.vx) > 250 and random.random() < 0.25:
-            self.sparks.append(
-                {
-                    "x": self.px,
-                    "y": self.py + 8,
-                    "vx": random.uniform(-40, 40),
-                    "vy": 50,
-                    "life": 0.35,
-                }
-            )
-        for s in list(self.sparks):
-            s["x"] += s["vx"] * dt
-            s["y"] += s["vy"] * dt
-            s["life"] -= dt
-            if s["life"] <= 0:
-                self.sparks.remove(s)
-        if len(self.sparks) > 600:
-            del self.sparks[: len(self.sparks) - 600]
+        if abs(self.vx) > 250 and rng.random() < 0.25:
+            self.sparks.spawn(self.px, self.py + 8, rng.uniform(-40, 40), 50, 0.35)
+        self.sparks.step(dt)
+
+    def _hits_row(self) -> bool:
+        """Only rows whose band can reach the player (bisect on y), and only
+        the solids around px (bisect on x)."""
+        px, py = self.px, self.py
+        reach = BAR_H_MAX / 2 + PLAYER_R
+        rows = self.rows
+        lo = bisect.bisect_left(rows, -(py + reach), key=_row_key)
+        hi = bisect.bisect_right(rows, -(py - reach), key=_row_key)
+        for i in range(lo, hi):
+            r = rows[i]
+            bar_y, bar_h = r["y"] - r["h"] / 2, r["h"]
+            solids = r["solids"]
+            j = bisect.bisect_right(r["starts"], px + PLAYER_R) - 1
+            while j >= 0:
+                x0, x1 = solids[j]
+                if x1 < px - PLAYER_R:
+                    break
+                if rect_intersects_circle(x0, bar_y, x1 - x0, bar_h, px, py, PLAYER_R):
+                    return True
+                j -= 1
+        return False
 
     # ---- input
     def mouseMoveEvent(self, e):
@@ -469,16 +548,25 @@ class PhantomRunWidget(QtWidgets.QWidget):
         )
 
     # ---- paint
+    def player_pose(self, al: float):
+        """Interpolated player x, y, heading (degrees) and speed trail."""
+        px = lerp_wrap(self._prev_px, self.px, al, self.width() + 40)
+        return px, self.py, -90.0, min(abs(self.vx) * 0.03, 12)
+
     def paintEvent(self, e: QtGui.QPaintEvent):
         p = QtGui.QPainter(self)
         p.setRenderHint(QtGui.QPainter.Antialiasing)
         w, h = self.width(), self.height()
         t = time.perf_counter()
+        al = self.clock.alpha
+        pal = self._pal
+        probe = self.paint_probe
+        probe.begin()
 
         # BG
         grad = QtGui.QLinearGradient(0, 0, w, h)
-        a = self._theme.bgA + math.sin(t * 0.7) * 18
-        b = self._theme.bgB + math.cos(t * 0.6) * 18
+        a = pal.theme.bgA + math.sin(t * 0.7) * 18
+        b = pal.theme.bgB + math.cos(t * 0.6) * 18
         grad.setColorAt(0, QtGui.QColor.fromHsl(int(a) % 360, 180, 15))
         grad.setColorAt(1, QtGui.QColor.fromHsl(int(b) % 360, 180, 18))
         p.fillRect(self.rect(), grad)
@@ -489,51 +577,37 @@ class PhantomRunWidget(QtWidgets.QWidget):
             p.setPen(QtCore.Qt.NoPen)
             p.drawEllipse(QtCore.QPointF(w * 0.5, h * 0.2 + i * 120), rad, rad)
         p.setOpacity(1.0)
+        probe.lap("background")
 
-        # rows
-        bar_col = QtGui.QColor(220, 235, 255, 48)
-        edge_col = QtGui.QColor(220, 235, 255, 120)
-        p.setPen(QtCore.Qt.NoPen)
+        # rows (sprite rendered on a row's first paint, so headless sims never draw)
         for r in self.rows:
-            y = r["y"]
-            hh = r["h"]
-            p.setBrush(bar_col)
-            p.drawRect(0, int(y - hh / 2), w, int(hh))
-            p.setCompositionMode(QtGui.QPainter.CompositionMode_Clear)
-            for gx, gw in r["gaps"]:
-                p.drawRect(int(gx), int(y - hh / 2 - 2), int(gw), int(hh + 4))
-            p.setCompositionMode(QtGui.QPainter.CompositionMode_SourceOver)
-            p.setPen(QtGui.QPen(edge_col, 1.2))
-            p.drawLine(0, int(y - hh / 2), w, int(y - hh / 2))
-            p.drawLine(0, int(y + hh / 2), w, int(y + hh / 2))
-            p.setPen(QtCore.Qt.NoPen)
+            pm = r.get("sprite")
+            if pm is None:
+                pm = r["sprite"] = self._render_row(self.width(), r["h"], r["gaps"], r["solids"])
+            y = lerp(r["y0"], r["y"], al)
+            p.drawPixmap(0, int(y - r["h"] / 2) - ROW_PAD, pm)
+        p.setPen(QtCore.Qt.NoPen)
 
         # powerups
+        atlas = GlowAtlas.shared(self.devicePixelRatioF())
+        pul = 1 + math.sin(t * 8) * 0.2
         for P in self.powerups:
-            pul = 1 + math.sin(t * 8) * 0.2
-            col = QtGui.QColor(120, 220, 255, 220)
-            glow = QtGui.QColor(120, 220, 255, 90)
-            p.setBrush(glow)
-            p.drawEllipse(QtCore.QPointF(P["x"], P["y"]), 12 * pul, 12 * pul)
-            p.setBrush(col)
-            p.drawEllipse(QtCore.QPointF(P["x"], P["y"]), 8 * pul, 8 * pul)
+            py = lerp(P.get("y0", P["y"]), P["y"], al)
+            atlas.draw(p, P["x"], py, POWER_CORE, 8 * pul, POWER_GLOW, 12 * pul)
+        probe.lap("entities")
+
+        # ghost of the best run (under the player)
+        if self.ghost is not None:
+            self.ghost.draw(p, atlas, pal, w, h, al)
 
         # player (always facing up)
-        sp = abs(self.vx)
-        trail = min(sp * 0.03, 12)
+        px, _, direction, trail = self.player_pose(al)
+        atlas.draw(p, px, self.py, pal.player_glow, PLAYER_R + trail * 0.6)
         p.save()
-        p.translate(self.px, self.py)
-        p.rotate(-90)
-        glowA = QtGui.QColor(self._theme.playerA)
-        glowA.setAlpha(100)
-        p.setBrush(glowA)
+        p.translate(px, self.py)
+        p.rotate(direction)
         p.setPen(QtCore.Qt.NoPen)
-        p.drawEllipse(
-            QtCore.QPointF(0, 0), PLAYER_R + trail * 0.6, PLAYER_R + trail * 0.6
-        )
-        grad2 = QtGui.QLinearGradient(-trail, -PLAYER_R, PLAYER_R, PLAYER_R)
-        grad2.setColorAt(0, QtGui.QColor(self._theme.playerA))
-        grad2.setColorAt(1, QtGui.QColor(self._theme.playerB))
+        grad2 = pal.player_gradient(-trail, -PLAYER_R, PLAYER_R, PLAYER_R)
         p.setBrush(QtGui.QBrush(grad2))
         path = QtGui.QPainterPath()
         path.moveTo(PLAYER_R + 2, 0)
@@ -547,15 +621,21 @@ class PhantomRunWidget(QtWidgets.QWidget):
             a = int(160 * (0.5 + 0.5 * math.sin(t * 14)))
             p.setPen(QtGui.QPen(QtGui.QColor(120, 220, 255, a), 2))
             p.setBrush(QtCore.Qt.NoBrush)
-            p.drawEllipse(QtCore.QPointF(self.px, self.py), PLAYER_R + 6, PLAYER_R + 6)
-
-        p.setPen(QtGui.QPen(QtGui.QColor(255, 255, 255, 160), 1.2))
-        for s in self.sparks:
-            p.drawLine(s["x"], s["y"], s["x"] - s["vx"] * 0.03, s["y"] - s["vy"] * 0.03)
+            p.drawEllipse(QtCore.QPointF(px, self.py), PLAYER_R + 6, PLAYER_R + 6)
+        probe.lap("player")
+
+        SparkPainter.draw(
+            p,
+            self.sparks,
+            QtGui.QPen(QtGui.QColor(255, 255, 255, 160), 1.2),
+            lag=(1.0 - al) * self.clock.step,
+        )
+        probe.lap("sparks")
 
-        p.setPen(QtGui.QPen(QtGui.QColor(255, 255, 255, 150)))
-        p.setFont(QtGui.QFont("Inter", 10, QtGui.QFont.Bold))
+        p.setPen(pal.hud_pen)
+        p.setFont(pal.hud_font)
         mode = "Endless" if self._mode == "endless" else "Story"
         ctrl = "Mouse" if self._control == "mouse" else "Keys"
         phase = f" | Phase: {self.phase_time:.1f}s" if self.phase_time > 0 else ""
         p.drawText(10, h - 12, f"Phantom Run — {mode} | Ctrl: {ctrl}{phase}")
+        probe.lap("hud")
@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+"""Qt-free player motion and spawn draws shared by the Flow / Phantom widgets
+and their ghost sims (`app.modes.ghost_sim`), so the two cannot drift apart.
+
+`body` is anything with the fields named in each function (the widget or the
+ghost sim); every function does exactly the float ops of one tick, in order.
+"""
+import math
+
+
+def flow_move(body, mouse, mx, my, left, right, fx, fy, slowmul, damping, dt, w, h):
+    """Move `body` (px, py, vx, vy, heading, tier, turn/forward_speed), wrap in w×h."""
+    px, py = body.px, body.py
+    tier = body.tier
+    if mouse:
+        accel = (700 + 60 * (tier - 1)) * slowmul
+        dx = mx - px
+        dy = my - py
+        vx = body.vx + (1 if dx > 0 else -1 if dx < 0 else 0) * accel * dt
+        vy = body.vy + (1 if dy > 0 else -1 if dy < 0 else 0) * accel * dt
+        # اثر میدان (به‌صورت نیروی نرم)
+        vx += fx * 0.25 * dt
+        vy += fy * 0.25 * dt
+        sp = math.hypot(vx, vy)
+        maxs = 300 + 40 * (tier - 1)
+        if sp > maxs:
+            vx = vx / sp * maxs
+            vy = vy / sp * maxs
+        body.vx = vx = vx * damping
+        body.vy = vy = vy * damping
+        px += vx * dt
+        py += vy * dt
+    else:
+        heading = body.heading
+        if left:
+            heading -= body.turn_speed * dt
+        if right:
+            heading += body.turn_speed * dt
+        speed = (body.forward_speed + 30 * (tier - 1)) * slowmul
+        # اثر میدان به‌صورت لغزش جانبی
+        body.heading = heading = heading + math.atan2(fy, fx) * 0.054 * dt
+        px += math.cos(heading) * speed * dt + fx * 0.12 * dt
+        py += math.sin(heading) * speed * dt + fy * 0.12 * dt
+    if px < 0:
+        px += w
+    elif px > w:
+        px -= w
+    if py < 0:
+        py += h
+    elif py > h:
+        py -= h
+    body.px, body.py = px, py
+
+
+def flow_blink_target(body, mouse, mx, my, w, h):
+    """Where a blink lands: `dist` along the motion (or toward the mouse), wrapped."""
+    if mouse:
+        dir_angle = math.atan2(body.vy, body.vx)
+        # اگر تقریباً ساکن بودی، جهت به سمت ماوس
+        if math.hypot(body.vx, body.vy) < 20:
+            dir_angle = math.atan2(my - body.py, mx - body.px)
+    else:
+        dir_angle = body.heading
+    dist = 160 + 20 * (body.tier - 1)
+    nx = body.px + math.cos(dir_angle) * dist
+    ny = body.py + math.sin(dir_angle) * dist
+    if nx < 0:
+        nx += w
+    elif nx > w:
+        nx -= w
+    if ny < 0:
+        ny += h
+    elif ny > h:
+        ny -= h
+    return nx, ny
+
+
+def flow_energy_pos(rng, w, h):
+    return rng.uniform(30, w - 30), rng.uniform(30, h - 30)
+
+
+def flow_glitch(rng, w, h, phase):
+    """A new glitch dict; the ghost only needs the draws to keep `rng` in step."""
+    sp = rng.uniform(28, 60) * (1 + phase * 0.07)
+    ang = rng.uniform(0, math.tau)
+    return {
+        "x": rng.uniform(0, w),
+        "y": rng.uniform(0, h),
+        "vx": math.cos(ang) * sp,
+        "vy": math.sin(ang) * sp,
+        "life": rng.uniform(7, 12),
+        "hue": rng.uniform(0, 20),
+    }
+
+
+def flow_energy_interval(phase):
+    return max(0.18, 0.45 - min(0.25, phase * 0.03))
+
+
+def flow_glitch_interval(phase):
+    return max(0.6, 1.4 - phase * 0.06)
+
+
+def phantom_move(body, mouse, mx, left, right, damping, dt, w):
+    """x only (px, vx, keys_speed); wraps over [-20, w + 20]."""
+    px = body.px
+    if mouse:
+        dx = mx - px
+        vx = body.vx + (1 if dx > 0 else -1 if dx < 0 else 0) * 900.0 * dt
+        sp = abs(vx)
+        if sp > 520.0:
+            vx = (vx / sp) * 520.0
+        body.vx = vx = vx * damping
+        px += vx * dt
+    else:
+        if left:
+            px -= body.keys_speed * dt
+        if right:
+            px += body.keys_speed * dt
+    if px < -20:
+        px += w + 40
+    elif px > w + 20:
+        px -= w + 40
+    body.px = px
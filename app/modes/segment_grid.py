@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""Uniform grid over line segments (the Weave trail).
+
+Each segment is registered under a key (the trail uses the absolute index of
+the segment's end point) in every cell its bounding box touches; trail
+segments are a few pixels long, so that is one or two cells. Appending and
+evicting a segment is O(1), and `candidates()` returns the handful of
+segments sharing cells with a query for exact tests (`seg_intersect`).
+"""
+import math
+
+import numpy as np
+
+
+def seg_intersect(ax, ay, bx, by, cx, cy, dx, dy):
+    """Parameter t on AB where it meets CD (endpoints included), or None.
+
+    Collinear overlaps do not count; for a trail that only matters on exact
+    retraces.
+    """
+    rx, ry = bx - ax, by - ay
+    sx, sy = dx - cx, dy - cy
+    den = rx * sy - ry * sx
+    if den == 0.0:
+        return None
+    qx, qy = cx - ax, cy - ay
+    t = (qx * sy - qy * sx) / den
+    u = (qx * ry - qy * rx) / den
+    if 0.0 <= t <= 1.0 and 0.0 <= u <= 1.0:
+        return t
+    return None
+
+
+class SegmentGrid:
+    def __init__(self, cell: float = 32.0):
+        self.cell = float(cell)
+        self._cells = {}  # (ix, iy) -> {key: None}
+        self._segs = {}  # key -> (x0, y0, x1, y1)
+
+    def __len__(self):
+        return len(self._segs)
+
+    def __contains__(self, key):
+        return key in self._segs
+
+    def clear(self):
+        self._cells.clear()
+        self._segs.clear()
+
+    def state(self) -> dict:
+        segs = self._segs
+        return {
+            "keys": np.fromiter(segs, dtype=np.int64, count=len(segs)),
+            "segs": np.array(list(segs.values()), dtype=np.float64).reshape(-1, 4),
+        }
+
+    def load_state(self, st: dict):
+        # re-adding in key order rebuilds the same buckets in the same order
+        self.clear()
+        for k, seg in zip(st["keys"].tolist(), st["segs"].tolist()):
+            self.add(k, *seg)
+
+    def segment(self, key):
+        return self._segs[key]
+
+    def _span(self, x0, y0, x1, y1, pad=0.0):
+        cs = self.cell
+        if x0 > x1:
+            x0, x1 = x1, x0
+        if y0 > y1:
+            y0, y1 = y1, y0
+        return (
+            range(int(math.floor((x0 - pad) / cs)), int(math.floor((x1 + pad) / cs)) + 1),
+            range(int(math.floor((y0 - pad) / cs)), int(math.floor((y1 + pad) / cs)) + 1),
+        )
+
+    def add(self, key, x0, y0, x1, y1):
+        if key in self._segs:
+            self.remove(key)
+        self._segs[key] = (x0, y0, x1, y1)
+        cols, rows = self._span(x0, y0, x1, y1)
+        cells = self._cells
+        for ix in cols:
+            for iy in rows:
+                bucket = cells.get((ix, iy))
+                if bucket is None:
+                    bucket = cells[(ix, iy)] = {}
+                bucket[key] = None
+
+    def remove(self, key):
+        seg = self._segs.pop(key, None)
+        if seg is None:
+            return
+        cols, rows = self._span(*seg)
+        cells = self._cells
+        for ix in cols:
+            for iy in rows:
+                bucket = cells.get((ix, iy))
+                if bucket is not None:
+                    bucket.pop(key, None)
+                    if not bucket:
+                        del cells[(ix, iy)]
+
+    def candidates(self, x0, y0, x1, y1, pad=0.0) -> set:
+        """Keys of segments sharing a cell with the padded bbox of a query."""
+        cols, rows = self._span(x0, y0, x1, y1, pad)
+        out = set()
+        cells = self._cells
+        for ix in cols:
+            for iy in rows:
+                bucket = cells.get((ix, iy))
+                if bucket:
+                    out.update(bucket)
+        return out
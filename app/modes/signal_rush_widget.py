@@ -1,12 +1,32 @@
 from PySide6 import QtWidgets, QtGui, QtCore
-import math, random, time
+import collections, math, time
 
 # هماهنگ با بازی‌های دیگر:
 from app.settings import THEMES, MAX_PHASE, RAMP_DURATION, RAMP_RATE
+from app.modes.particles import ParticlePool
+from app.widgets.sparks import SparkPainter
+from app.widgets.glow_atlas import GlowAtlas
+from app.widgets.palette import Palette
+from app.widgets.paint_probe import NULL_PROBE
+from app.frame_scheduler import FrameScheduler
+from app.fixed_step import FixedStepClock, damp, ease, lerp, lerp_wrap
+from app.sim_run import SimRun
 
 PLAYER_R = 11
 NODE_R2 = 22 * 22
 GLITCH_R2 = 18 * 18
+SPAWN_Y = -30  # ارتفاع اسپان روی صفحه (بالای قاب)
+CULL_MARGIN = 50
+NODE_CORE, NODE_GLOW = (120, 200, 255, 210), (120, 200, 255, 60)
+GLITCH_CORE, GLITCH_HALO = (255, 120, 120, 220), (255, 100, 100, 70)
+POWER_CORE, POWER_GLOW = (120, 255, 180, 210), (120, 255, 180, 80)
+
+
+def _cull(objs, y_max):
+    # spawn order == descending world y, so everything past the bottom edge
+    # sits at the left end
+    while objs and objs[0]["y"] >= y_max:
+        objs.popleft()
 
 
 class SignalRushWidget(QtWidgets.QWidget):
@@ -17,13 +37,21 @@ class SignalRushWidget(QtWidgets.QWidget):
     screenshotSaved = QtCore.Signal(str)
     started = QtCore.Signal()
 
+    # وضعیت شبیه‌سازی برای اسنپ‌شات ری‌پلی (app.snapshot)
+    SNAPSHOT_ATTRS = (
+        "px", "py", "_prev_px", "vx", "score", "elapsed", "phase_val", "speed",
+        "scroll_y", "_prev_scroll", "dash_cd", "dash_t", "t_node", "t_glitch",
+        "t_power", "nodes", "glitches", "powers", "sparks", "run",
+    )
+
     def __init__(self, parent=None):
         super().__init__(parent)
         self.setMouseTracking(True)
         self.setFocusPolicy(QtCore.Qt.StrongFocus)
 
         # تم و تنظیمات
-        self._theme = THEMES["Aurora"]
+        self._pal = Palette.for_theme(THEMES["Aurora"])
+        self.paint_probe = NULL_PROBE
         self._mode = "endless"  # یا "story"
         self._control_mode = "mouse"  # "mouse" | "keys"
         self._lang = "fa"
@@ -38,6 +66,7 @@ class SignalRushWidget(QtWidgets.QWidget):
 
         # بازیکن
         self.px = 300.0
+        self._prev_px = self.px  # تیک قبلی، برای درون‌یابی رندر
         self.py = 0.0  # ثابت نگه می‌داریم (نمای اسکرول عمودی)
         self.vx = 0.0
         self.mx = 0.0
@@ -51,16 +80,18 @@ class SignalRushWidget(QtWidgets.QWidget):
         self.DASH_COOLDOWN = 2.6
         self.DASH_DURATION = 0.28
 
-        # جهان: نوارهای موجی که رو به پایین حرکت می‌کنند
-        self.scroll_y = 0.0
+        # جهان: موجودیت‌ها در مختصات جهان می‌مانند و فقط دوربین جابه‌جا می‌شود
+        # (screen_y = world_y + scroll_y)
+        self.scroll_y = self._prev_scroll = 0.0
         self.speed = 180.0  # سرعت پایه‌ی اسکرول
         self.elapsed = 0.0
 
         # موجودیت‌ها
-        self.nodes = []  # امتیاز
-        self.glitches = []  # گلیچ
-        self.powers = []  # پاورآپ (ریست Dash)
-        self.sparks = []
+        # صف‌ها به ترتیب اسپان = نزولی بر اساس y جهان (قدیمی‌ترین = پایین‌ترین)
+        self.nodes = collections.deque()  # امتیاز
+        self.glitches = collections.deque()  # گلیچ
+        self.powers = collections.deque()  # پاورآپ (ریست Dash)
+        self.sparks = ParticlePool(512)  # آن‌ها هم در مختصات جهان
 
         # تایمر اسپان
         self.t_node = 0.8
@@ -68,19 +99,19 @@ class SignalRushWidget(QtWidgets.QWidget):
         self.t_power = 6.5
 
         # حلقه‌ی ثابت
-        self._step = 1.0 / 60.0
-        self._acc = 0.0
-        self._last = time.perf_counter()
-        self._timer = QtCore.QTimer(self)
-        self._timer.timeout.connect(self._tick)
-        self._timer.start(1000 // 120)
+        self.clock = FixedStepClock()  # sim rate; alpha for interpolation
+        self.run = SimRun()  # rng + ساعت شبیه‌سازی هر ران
+        self.run_seed = None  # None: seed تازه برای هر ران
+        self.recorder = None  # ReplayRecorder هنگام ضبط ران
+        self._frames = FrameScheduler.instance()
+        self._frames.register(self)
 
     # ------------- API از MainWindow
     def set_lang(self, lang: str):
         self._lang = lang
 
     def set_theme(self, name: str):
-        self._theme = THEMES.get(name, self._theme)
+        self._pal = Palette.for_theme(THEMES.get(name, self._pal.theme))
         self.update()
 
     def set_mode(self, mode: str):
@@ -95,6 +126,9 @@ class SignalRushWidget(QtWidgets.QWidget):
     def set_sfx(self, on: bool):
         self._sfx = on
 
+    def set_sim_rate(self, hz: float):
+        self.clock.set_rate(hz)
+
     def prepare_endless(self, _ignored: int = 0):
         self._reset_world()
         self.timeChanged.emit(-1)  # ∞
@@ -102,6 +136,7 @@ class SignalRushWidget(QtWidgets.QWidget):
 
     def prepare_story(self, idx: int = 0):
         self._reset_world()
+        self.story_idx = idx  # برای ری‌پلی
         # اگر برای Story زمان/هدف خواستی، اینجا ست کن
         self.timeChanged.emit(60)  # نمایشی
         self.update()
@@ -111,13 +146,14 @@ class SignalRushWidget(QtWidgets.QWidget):
             return
         self.running = True
         self.paused = False
-        self._last = time.perf_counter()
+        self._frames.wake(self)
         self.started.emit()
 
     def toggle_pause(self):
         if not self.running:
             return
         self.paused = not self.paused
+        self._frames.wake(self)
 
     def reset(self):
         if self._mode == "endless":
@@ -128,48 +164,54 @@ class SignalRushWidget(QtWidgets.QWidget):
     # ------------- داخلی
     def _reset_world(self):
         w, h = max(1, self.width()), max(1, self.height())
+        self.run.reset(self.run_seed)
         self.score = 0
         self.scoreChanged.emit(0)
         self.phase_val = 0.0
         self.elapsed = 0.0
-        self.scroll_y = 0.0
+        self.scroll_y = self._prev_scroll = 0.0
         self.speed = 180.0
         self.nodes.clear()
         self.glitches.clear()
         self.powers.clear()
         self.sparks.clear()
+        self.sparks.reseed(self.run.spark_seed)
         self.t_node = 0.3
         self.t_glitch = 0.9
         self.t_power = 3.5
-        self.px = w * 0.5
+        self.px = self._prev_px = w * 0.5
         self.py = h * 0.75
         self.vx = 0.0
         self.mx = self.px
         self.dash_cd = 0.0
         self.dash_t = 0.0
+        self.ability_queued = False
         self.key_left = self.key_right = False
 
     # ------------- حلقه
-    def _tick(self):
-        now = time.perf_counter()
-        dt = min(0.05, now - self._last)
-        self._last = now
+    def _tick(self, dt: float):
         if self.running and not self.paused:
-            self._acc += dt
-            while self._acc >= self._step:
-                self._update(self._step)
-                self._acc -= self._step
-        self.update()
+            rec = self.recorder
+            for step in self.clock.steps(dt):
+                if rec is not None:
+                    rec.capture(self)
+                self._update(step)
+                if not self.running:  # ران تمام شد: قدم‌های باقی فریم پایان را تکرار نکنند
+                    break
 
     def _update(self, dt: float):
         w, h = self.width(), self.height()
+        self.run.advance(dt)
+        if self.ability_queued:
+            self.ability_queued = False
+            self._try_dash()
 
         # افزایش تدریجی سختی
         self.elapsed += dt
         tnorm = max(0.0, min(1.0, self.elapsed / RAMP_DURATION))
         smooth = tnorm * tnorm * (3 - 2 * tnorm)
         target_phase = smooth * MAX_PHASE
-        self.phase_val += (target_phase - self.phase_val) * RAMP_RATE
+        self.phase_val += (target_phase - self.phase_val) * ease(RAMP_RATE, dt)
         self.speed = 180 + 220 * smooth
 
         # اسپان‌ها
@@ -184,31 +226,30 @@ class SignalRushWidget(QtWidgets.QWidget):
             self.t_glitch = max(0.4, 1.2 - self.phase_val * 0.03)
         if self.t_power <= 0:
             self._spawn_power(w)
-            self.t_power = random.uniform(4.5, 7.5)
-
-        # اسکرول پایین
-        sy = self.speed * dt
-        self.scroll_y += sy
-        for arr in (self.nodes, self.glitches, self.powers, self.sparks):
-            for o in arr:
-                o["y"] += sy
+            self.t_power = self.run.rng.uniform(4.5, 7.5)
+
+        # اسکرول پایین: فقط دوربین
+        self._prev_scroll = self.scroll_y
+        self.scroll_y += self.speed * dt
+        self.sparks.step(dt)
         # تمیزکاری خارج قاب
-        self.nodes = [o for o in self.nodes if o["y"] < h + 50]
-        self.glitches = [o for o in self.glitches if o["y"] < h + 50]
-        self.powers = [o for o in self.powers if o["y"] < h + 50]
-        self.sparks = [o for o in self.sparks if o["life"] > 0]
+        y_max = h + CULL_MARGIN - self.scroll_y
+        _cull(self.nodes, y_max)
+        _cull(self.glitches, y_max)
+        _cull(self.powers, y_max)
 
         # کنترل افقی
+        self._prev_px = self.px
         if self._control_mode == "mouse":
             ax = 800.0
-            damp = 0.9
+            damping = damp(0.9, dt)
             maxs = 420
             dx = self.mx - self.px
             self.vx += (1 if dx > 0 else -1 if dx < 0 else 0) * ax * dt
             sp = abs(self.vx)
             if sp > maxs:
                 self.vx = math.copysign(maxs, self.vx)
-            self.vx *= damp
+            self.vx *= damping
             self.px = max(20, min(w - 20, self.px + self.vx * dt))
         else:
             turn = 360.0
@@ -224,13 +265,14 @@ class SignalRushWidget(QtWidgets.QWidget):
         if self.dash_t > 0:
             self.dash_t -= dt
 
-        # برخوردها (اگر Dash فعال نیست)
+        # برخوردها (اگر Dash فعال نیست)؛ در مختصات جهان
         if self.dash_t <= 0:
+            wy = self.py - self.scroll_y
             i = len(self.nodes) - 1
             while i >= 0:
                 n = self.nodes[i]
-                if (self.px - n["x"]) ** 2 + (self.py - n["y"]) ** 2 < NODE_R2:
-                    self.nodes.pop(i)
+                if (self.px - n["x"]) ** 2 + (wy - n["y"]) ** 2 < NODE_R2:
+                    del self.nodes[i]
                     self._emit_sparks(n["x"], n["y"], 200, 12, 120)
                     self.score += 10
                     self.scoreChanged.emit(self.score)
@@ -239,15 +281,15 @@ class SignalRushWidget(QtWidgets.QWidget):
             i = len(self.powers) - 1
             while i >= 0:
                 p = self.powers[i]
-                if (self.px - p["x"]) ** 2 + (self.py - p["y"]) ** 2 < NODE_R2:
-                    self.powers.pop(i)
+                if (self.px - p["x"]) ** 2 + (wy - p["y"]) ** 2 < NODE_R2:
+                    del self.powers[i]
                     # پاور: ریست کول‌داون Dash
                     self.dash_cd = 0.0
                     self._emit_sparks(p["x"], p["y"], 80, 16, 150)
                 i -= 1
 
             for g in self.glitches:
-                if (self.px - g["x"]) ** 2 + (self.py - g["y"]) ** 2 < GLITCH_R2:
+                if (self.px - g["x"]) ** 2 + (wy - g["y"]) ** 2 < GLITCH_R2:
                     self._game_over("hit")
                     return
 
@@ -260,15 +302,16 @@ class SignalRushWidget(QtWidgets.QWidget):
 
     # ------------- اسپانرها
     def _spawn_node(self, w):
-        x = random.uniform(30, w - 30)
-        y = -30
+        x = self.run.rng.uniform(30, w - 30)
+        y = SPAWN_Y - self.scroll_y
         self.nodes.append({"x": x, "y": y, "r": 8, "t": 0.0})
 
     def _spawn_glitch(self, w):
-        x = random.uniform(30, w - 30)
-        y = -30
-        sway = random.uniform(40, 140)
-        freq = random.uniform(0.6, 1.4)
+        rng = self.run.rng
+        x = rng.uniform(30, w - 30)
+        y = SPAWN_Y - self.scroll_y
+        sway = rng.uniform(40, 140)
+        freq = rng.uniform(0.6, 1.4)
         self.glitches.append(
             {"x": x, "y": y, "r": 10, "t": 0.0, "sway": sway, "freq": freq}
         )
@@ -276,23 +319,12 @@ class SignalRushWidget(QtWidgets.QWidget):
         # آپدیت در paint (برای ساده‌سازی) یا اینجا با t…
 
     def _spawn_power(self, w):
-        x = random.uniform(30, w - 30)
-        y = -30
+        x = self.run.rng.uniform(30, w - 30)
+        y = SPAWN_Y - self.scroll_y
         self.powers.append({"x": x, "y": y, "r": 10, "pulse": 0.0})
 
     def _emit_sparks(self, x, y, hue, n=10, speed=120):
-        for i in range(n):
-            ang = (i / n) * math.tau + random.uniform(-0.15, 0.15)
-            self.sparks.append(
-                {
-                    "x": x,
-                    "y": y,
-                    "vx": math.cos(ang) * (speed + random.uniform(-20, 20)),
-                    "vy": math.sin(ang) * (speed + random.uniform(-20, 20)),
-                    "life": random.uniform(0.35, 0.7),
-                    "hue": hue,
-                }
-            )
+        self.sparks.burst(x, y, hue, n, speed, spread=0.15, life=(0.35, 0.7))
 
     # ------------- رخدادها
     def mouseMoveEvent(self, e):
@@ -301,7 +333,7 @@ class SignalRushWidget(QtWidgets.QWidget):
 
     def mousePressEvent(self, e):
         if e.button() == QtCore.Qt.LeftButton:
-            self._try_dash()
+            self.ability_queued = True
 
     def keyPressEvent(self, e):
         k = e.key()
@@ -310,7 +342,7 @@ class SignalRushWidget(QtWidgets.QWidget):
         if k in (QtCore.Qt.Key_Right, QtCore.Qt.Key_D):
             self.key_right = True
         if k in (QtCore.Qt.Key_Space,):
-            self._try_dash()
+            self.ability_queued = True  # قدم بعدی (ری‌پلی)
         if k == QtCore.Qt.Key_P:
             self._save_screenshot()
 
@@ -344,11 +376,15 @@ class SignalRushWidget(QtWidgets.QWidget):
         p.setRenderHint(QtGui.QPainter.Antialiasing)
         w, h = self.width(), self.height()
         t = time.perf_counter()
+        al = self.clock.alpha
+        pal = self._pal
+        probe = self.paint_probe
+        probe.begin()
 
         # پس‌زمینه گرادیانی + شبکه موجی
         grad = QtGui.QLinearGradient(0, 0, w, h)
-        a = self._theme.bgA + math.sin(t * 0.4) * 20
-        b = self._theme.bgB + math.cos(t * 0.3) * 20
+        a = pal.theme.bgA + math.sin(t * 0.4) * 20
+        b = pal.theme.bgB + math.cos(t * 0.3) * 20
         grad.setColorAt(0, QtGui.QColor.fromHsl(int(a) % 360, 180, 16))
         grad.setColorAt(1, QtGui.QColor.fromHsl(int(b) % 360, 180, 19))
         p.fillRect(self.rect(), grad)
@@ -359,33 +395,29 @@ class SignalRushWidget(QtWidgets.QWidget):
         for i in range(8):
             yy = (i * h / 8 + base) % (h + 40) - 20
             p.drawLine(0, yy, w, yy)
+        probe.lap("background")
+
+        # موجودیت‌ها در مختصات جهان، زیر دوربین
+        p.save()
+        p.translate(0, lerp(self._prev_scroll, self.scroll_y, al))
 
         # نودها
+        atlas = GlowAtlas.shared(self.devicePixelRatioF())
         p.setPen(QtCore.Qt.NoPen)
         for n in self.nodes:
             n["t"] += 0.016
             rr = 6 + math.sin(n["t"] * 4) * 2
-            col = QtGui.QColor(*(120, 200, 255, 210))
-            glow = QtGui.QColor(*(120, 200, 255, 60))
-            p.setBrush(glow)
-            p.drawEllipse(QtCore.QPointF(n["x"], n["y"]), rr + 6, rr + 6)
-            p.setBrush(col)
-            p.drawEllipse(QtCore.QPointF(n["x"], n["y"]), rr, rr)
+            atlas.draw(p, n["x"], n["y"], NODE_CORE, rr, NODE_GLOW, rr + 6)
 
         # گلیچ‌ها (حرکت موجی عرضی)
+        cross = QtGui.QPen(QtGui.QColor(*(255, 170, 170, 230)), 2)
+        cross.setCapStyle(QtCore.Qt.RoundCap)
         for g in self.glitches:
             g["t"] += 0.016
             gx = g["x"] + math.sin(g["t"] * g["freq"] * 2.2) * g["sway"]
-            col = QtGui.QColor(*(255, 120, 120, 220))
-            halo = QtGui.QColor(*(255, 100, 100, 70))
-            p.setBrush(halo)
-            p.drawEllipse(QtCore.QPointF(gx, g["y"]), 13, 13)
-            p.setBrush(col)
-            p.drawEllipse(QtCore.QPointF(gx, g["y"]), 9, 9)
+            atlas.draw(p, gx, g["y"], GLITCH_CORE, 9, GLITCH_HALO, 13)
             # یک ضربدر باریک
-            pen = QtGui.QPen(QtGui.QColor(*(255, 170, 170, 230)), 2)
-            pen.setCapStyle(QtCore.Qt.RoundCap)
-            p.setPen(pen)
+            p.setPen(cross)
             p.drawLine(gx - 6, g["y"], gx + 6, g["y"])
             p.drawLine(gx, g["y"] - 6, gx, g["y"] + 6)
             p.setPen(QtCore.Qt.NoPen)
@@ -394,33 +426,25 @@ class SignalRushWidget(QtWidgets.QWidget):
         for pw in self.powers:
             pw["pulse"] += 0.016
             pul = 1 + math.sin(pw["pulse"] * 6) * 0.25
-            col = QtGui.QColor(*(120, 255, 180, 210))
-            glow = QtGui.QColor(*(120, 255, 180, 80))
-            p.setBrush(glow)
-            p.drawEllipse(QtCore.QPointF(pw["x"], pw["y"]), 12, 12)
-            p.setBrush(col)
-            p.drawEllipse(QtCore.QPointF(pw["x"], pw["y"]), 8 * pul, 8 * pul)
+            atlas.draw(p, pw["x"], pw["y"], POWER_CORE, 8 * pul, POWER_GLOW, 12)
+        probe.lap("entities")
 
         # اسپارک‌ها
         pen = QtGui.QPen(QtGui.QColor(255, 255, 255, 180), 1.4)
         pen.setCapStyle(QtCore.Qt.RoundCap)
-        p.setPen(pen)
-        for s in self.sparks:
-            s["x"] += s["vx"] * 0.016
-            s["y"] += s["vy"] * 0.016
-            s["life"] -= 0.016
-            a = max(0, min(255, int(s["life"] * 255)))
-            pen.setColor(QtGui.QColor.fromHsl(int(s["hue"]) % 360, 220, 180, a))
-            p.setPen(pen)
-            p.drawLine(s["x"], s["y"], s["x"] - s["vx"] * 0.02, s["y"] - s["vy"] * 0.02)
+        SparkPainter.draw_tinted(
+            p, self.sparks, pen, tail=0.02, lag=(1.0 - al) * self.clock.step
+        )
+        p.restore()
+        probe.lap("sparks")
 
         # بازیکن (با Dash شفاف)
         p.save()
-        p.translate(self.px, self.py)
+        p.translate(lerp_wrap(self._prev_px, self.px, al, w), self.py)
         trail = 10
         grad2 = QtGui.QLinearGradient(-trail, -PLAYER_R, PLAYER_R, PLAYER_R)
-        grad2.setColorAt(0, QtGui.QColor(self._theme.playerA))
-        colB = QtGui.QColor(self._theme.playerB)
+        grad2.setColorAt(0, pal.player_a)
+        colB = QtGui.QColor(pal.player_b)
         if self.dash_t > 0:
             colB.setAlpha(120)
         grad2.setColorAt(1, colB)
@@ -433,16 +457,18 @@ class SignalRushWidget(QtWidgets.QWidget):
         path.closeSubpath()
         p.drawPath(path)
         p.restore()
+        probe.lap("player")
 
         # HUD پایین
         p.setPen(QtGui.QPen(QtGui.QColor(255, 255, 255, 140)))
-        p.setFont(QtGui.QFont("Inter", 10, QtGui.QFont.Bold))
+        p.setFont(pal.hud_font)
         pace = 1 + self.phase_val * 0.15
         p.drawText(
             10,
             h - 10,
             f"Signal Rush — {'Endless' if self._mode=='endless' else 'Story'}  |  Pace: {pace:.2f}x",
         )
+        probe.lap("hud")
 
     # ------------- اندازه
     def resizeEvent(self, e: QtGui.QResizeEvent):
@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+"""Uniform spatial hash grid for broadphase proximity queries.
+
+Entities are registered under a hashable key (a slot index or an int id) at
+a point; `query(x, y, r)` only visits the cells overlapping the query circle
+and returns the keys whose stored point is strictly inside it (or on it, with
+`inclusive=True`). With
+`wrap=True` the grid is toroidal over (width, height): cells and distances
+wrap at the edges like the player does in most modes.
+"""
+import math
+
+import numpy as np
+
+
+class SpatialHash:
+    def __init__(
+        self, cell: float = 64.0, width: float = 0.0, height: float = 0.0, wrap=False
+    ):
+        self.cell = float(cell)
+        self.wrap = bool(wrap)
+        self._cells = {}  # (ix, iy) -> {key: None}
+        self._pos = {}  # key -> (x, y, (ix, iy))
+        self.resize(width, height)
+
+    def __len__(self):
+        return len(self._pos)
+
+    def __contains__(self, key):
+        return key in self._pos
+
+    def resize(self, width: float, height: float):
+        """Update the wrap extent; stored entries are re-bucketed."""
+        self.width = float(width)
+        self.height = float(height)
+        self._cols = max(1, int(math.ceil(self.width / self.cell)))
+        self._rows = max(1, int(math.ceil(self.height / self.cell)))
+        if self._pos:
+            entries = [(k, x, y) for k, (x, y, _) in self._pos.items()]
+            self.clear()
+            for k, x, y in entries:
+                self.insert(k, x, y)
+
+    def clear(self):
+        self._cells.clear()
+        self._pos.clear()
+
+    def _cell_of(self, x: float, y: float):
+        ix = int(x // self.cell)
+        iy = int(y // self.cell)
+        if self.wrap:
+            ix %= self._cols
+            iy %= self._rows
+        return ix, iy
+
+    def insert(self, key, x: float, y: float):
+        if key in self._pos:
+            self.move(key, x, y)
+            return
+        c = self._cell_of(x, y)
+        bucket = self._cells.get(c)
+        if bucket is None:
+            bucket = self._cells[c] = {}
+        bucket[key] = None
+        self._pos[key] = (x, y, c)
+
+    def move(self, key, x: float, y: float):
+        old = self._pos.get(key)
+        if old is None:
+            self.insert(key, x, y)
+            return
+        c = self._cell_of(x, y)
+        if c != old[2]:
+            bucket = self._cells[old[2]]
+            del bucket[key]
+            if not bucket:
+                del self._cells[old[2]]
+            bucket = self._cells.get(c)
+            if bucket is None:
+                bucket = self._cells[c] = {}
+            bucket[key] = None
+        self._pos[key] = (x, y, c)
+
+    def remove(self, key):
+        old = self._pos.pop(key, None)
+        if old is None:
+            return
+        bucket = self._cells[old[2]]
+        del bucket[key]
+        if not bucket:
+            del self._cells[old[2]]
+
+    def state(self) -> dict:
+        """Int keys with their points, plus every bucket's key order (a
+        query visits a bucket in insertion order, so it is part of the state)."""
+        pos = self._pos
+        flat = []
+        for (ix, iy), bucket in self._cells.items():
+            flat += (ix, iy, len(bucket))
+            flat += bucket
+        return {
+            "w": self.width, "h": self.height,
+            "keys": np.fromiter(pos, dtype=np.int64, count=len(pos)),
+            "xy": np.array([p[:2] for p in pos.values()], dtype=np.float64).reshape(-1, 2),
+            "cells": np.array(flat, dtype=np.int64),
+        }
+
+    def load_state(self, st: dict):
+        self.clear()
+        self.resize(st["w"], st["h"])
+        cell_of = self._cell_of
+        self._pos = {
+            k: (x, y, cell_of(x, y)) for k, (x, y) in zip(st["keys"].tolist(), st["xy"].tolist())
+        }
+        flat = st["cells"].tolist()
+        i = 0
+        while i < len(flat):
+            ix, iy, n = flat[i : i + 3]
+            self._cells[(ix, iy)] = dict.fromkeys(flat[i + 3 : i + 3 + n])
+            i += 3 + n
+
+    def position(self, key):
+        x, y, _ = self._pos[key]
+        return x, y
+
+    def query(self, x: float, y: float, r: float, inclusive: bool = False) -> list:
+        """Keys within distance `r` of (x, y); exclusive unless `inclusive`."""
+        cs = self.cell
+        x0, x1 = int((x - r) // cs), int((x + r) // cs)
+        y0, y1 = int((y - r) // cs), int((y + r) // cs)
+        cols = range(x0, x1 + 1)
+        rows = range(y0, y1 + 1)
+        if self.wrap:
+            # a query wider than the grid must not visit a cell twice
+            cols = sorted({i % self._cols for i in cols})
+            rows = sorted({j % self._rows for j in rows})
+            w, h = self.width, self.height
+            hw, hh = w * 0.5, h * 0.5
+        r2 = r * r
+        if inclusive:
+            r2 = math.nextafter(r2, math.inf)  # d2 < next(r2)  <=>  d2 <= r2
+        out = []
+        cells, pos = self._cells, self._pos
+        for ix in cols:
+            for iy in rows:
+                bucket = cells.get((ix, iy))
+                if not bucket:
+                    continue
+                for key in bucket:
+                    ex, ey, _ = pos[key]
+                    dx = ex - x
+                    dy = ey - y
+                    if self.wrap:
+                        if dx > hw:
+                            dx -= w
+                        elif dx < -hw:
+                            dx += w
+                        if dy > hh:
+                            dy -= h
+                        elif dy < -hh:
+                            dy += h
+                    if dx * dx + dy * dy < r2:
+                        out.append(key)
+        return out
@@ -0,0 +1,222 @@
+# -*- coding: utf-8 -*-
+"""The Weave light trail as an incrementally maintained structure.
+
+Points live in a deque together with their cumulative path distance (a
+running sum that never changes once written), so the trail length is
+`cum[-1] - cum[0]` and trimming the tail to a pixel budget pops exactly the
+evicted points. Every segment is also kept in a `SegmentGrid` for crossing
+queries. Points carry absolute indices: point `i` sits at deque position
+`i - base`, and segment `i` joins point `i - 1` to point `i`.
+A step across a screen edge (wrap) is a break, not a segment, and adds no
+length.
+
+Loop closure is incremental too: each tick only the head segment is tested
+for a crossing against the older segments sharing its grid cells.
+When it crosses, the points between the crossed segment and the head plus
+the crossing point form the loop polygon; area (shoelace) and containment
+(even-odd rule) are evaluated with NumPy only on that closing tick.
+"""
+import bisect, collections, itertools
+from dataclasses import dataclass
+
+import numpy as np
+
+from app.modes.segment_grid import SegmentGrid, seg_intersect
+
+
+def polygon_area(poly: np.ndarray) -> float:
+    """Unsigned area of a closed polygon given as an (N, 2) array."""
+    x, y = poly[:, 0], poly[:, 1]
+    return 0.5 * abs(float(np.dot(x, np.roll(y, -1)) - np.dot(y, np.roll(x, -1))))
+
+
+def points_in_polygon(px, py, poly: np.ndarray) -> np.ndarray:
+    """Even-odd containment of points (px, py arrays) in an (N, 2) polygon."""
+    px = np.asarray(px, dtype=np.float64)[:, None]
+    py = np.asarray(py, dtype=np.float64)[:, None]
+    x0, y0 = poly[:, 0], poly[:, 1]
+    x1, y1 = np.roll(x0, -1), np.roll(y0, -1)
+    straddle = (y0 > py) != (y1 > py)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        xc = x0 + (py - y0) * (x1 - x0) / (y1 - y0)
+    return np.count_nonzero(straddle & (px < xc), axis=1) % 2 == 1
+
+
+@dataclass
+class Loop:
+    polygon: np.ndarray  # (N, 2), crossing point first
+    area: float
+
+    def contains(self, px, py) -> np.ndarray:
+        if not len(px):
+            return np.zeros(0, dtype=bool)
+        return points_in_polygon(px, py, self.polygon)
+
+
+class WeaveTrail:
+    def __init__(self, max_len: float, max_points: int = None, cell: float = 32.0):
+        self.max_len = float(max_len)
+        self.max_points = max_points
+        self.points = collections.deque()  # (x, y)
+        self._cum = collections.deque()  # cumulative distance at each point
+        self.grid = SegmentGrid(cell)
+        self.width = self.height = 0.0
+        self.base = 0  # absolute index of points[0]
+
+    def __len__(self):
+        return len(self.points)
+
+    def __iter__(self):
+        return iter(self.points)
+
+    def __bool__(self):
+        return bool(self.points)
+
+    @property
+    def n(self) -> int:
+        """Absolute index the next pushed point will get."""
+        return self.base + len(self.points)
+
+    @property
+    def head(self):
+        return self.points[-1]
+
+    @property
+    def length(self) -> float:
+        cum = self._cum
+        return cum[-1] - cum[0] if cum else 0.0
+
+    def resize(self, width: float, height: float):
+        """Extent used to tell wrap jumps from segments."""
+        self.width = float(width)
+        self.height = float(height)
+
+    def clear(self):
+        self.points.clear()
+        self._cum.clear()
+        self.grid.clear()
+        self.base = 0
+
+    def state(self) -> dict:
+        # segments are point pairs and cum a running sum: keys + cum[0] suffice
+        segs = self.grid._segs
+        return {
+            "pts": np.array(self.points, dtype=np.float64).reshape(-1, 2),
+            "cum0": self._cum[0] if self._cum else 0.0,
+            "keys": np.fromiter(segs, dtype=np.int64, count=len(segs)),
+            "base": self.base, "max_len": self.max_len, "max_points": self.max_points,
+            "w": self.width, "h": self.height,
+        }
+
+    def load_state(self, st: dict):
+        pts = list(map(tuple, st["pts"].tolist()))
+        base = st["base"]
+        self.points = collections.deque(pts)
+        self.base, self.max_len, self.max_points = base, st["max_len"], st["max_points"]
+        self.resize(st["w"], st["h"])
+        grid = self.grid
+        grid.clear()
+        keys = set(st["keys"].tolist())
+        cum = [st["cum0"]] if pts else []
+        for i in range(1, len(pts)):
+            (x0, y0), (x, y) = pts[i - 1], pts[i]
+            if base + i in keys:
+                grid.add(base + i, x0, y0, x, y)
+                dx, dy = x - x0, y - y0
+                cum.append(cum[-1] + (dx * dx + dy * dy) ** 0.5)
+            else:
+                cum.append(cum[-1])
+        self._cum = collections.deque(cum)
+
+    def push(self, x: float, y: float):
+        """Append a point, then trim the tail to max_points / max_len."""
+        pts, cum = self.points, self._cum
+        if pts:
+            x0, y0 = pts[-1]
+            dx, dy = x - x0, y - y0
+            if abs(dx) <= self.width * 0.5 and abs(dy) <= self.height * 0.5:
+                self.grid.add(self.n, x0, y0, x, y)
+                cum.append(cum[-1] + (dx * dx + dy * dy) ** 0.5)
+            else:
+                cum.append(cum[-1])
+        else:
+            cum.append(0.0)
+        pts.append((x, y))
+        self._prune()
+
+    def _prune(self):
+        pts, cum = self.points, self._cum
+        if self.max_points is not None:
+            while len(pts) > self.max_points:
+                self._pop_tail()
+        # keep at least two points so there is always a segment to draw
+        while len(pts) > 2 and cum[-1] - cum[0] > self.max_len:
+            self._pop_tail()
+
+    def _pop_tail(self):
+        self.points.popleft()
+        self._cum.popleft()
+        self.base += 1
+        # segment `base` joined the evicted point to the new tail
+        self.grid.remove(self.base)
+
+    def cut_before(self, index: int):
+        """Drop every point older than absolute `index`."""
+        while self.points and self.base < index:
+            self._pop_tail()
+
+    # ---- loops
+    def find_crossing(self, min_gap: int):
+        """(index, x, y) of the newest segment at least `min_gap` older than
+        the head segment that the head segment crosses, or None."""
+        head = self.n - 1
+        grid = self.grid
+        if head not in grid:
+            return None
+        ax, ay, bx, by = grid.segment(head)
+        limit = head - min_gap
+        best = None
+        for k in grid.candidates(ax, ay, bx, by):
+            if k > limit or (best is not None and k < best[0]):
+                continue
+            t = seg_intersect(ax, ay, bx, by, *grid.segment(k))
+            if t is not None:
+                best = (k, ax + (bx - ax) * t, ay + (by - ay) * t)
+        return best
+
+    def close_loop(self, min_gap: int):
+        """Loop closed by the latest push, or None. The caller decides what
+        to keep of the trail afterwards (see `cut_before`)."""
+        hit = self.find_crossing(min_gap)
+        if hit is None:
+            return None
+        k, cx, cy = hit
+        head = self.n - 1
+        grid = self.grid
+        # a loop that runs across a wrap is not a closed shape on screen
+        for i in range(k + 1, head):
+            if i not in grid:
+                return None
+        poly = np.empty((head - k + 1, 2))
+        poly[0] = cx, cy
+        poly[1:] = list(itertools.islice(self.since(k), head - k))
+        return Loop(poly, polygon_area(poly))
+
+    # ---- read-only views (no copies)
+    def since(self, index: int):
+        """Points from absolute `index` to the head."""
+        return itertools.islice(self.points, max(0, index - self.base), None)
+
+    def last_pixels(self, pixels: float):
+        """Points covering (at least) the newest `pixels` of trail length."""
+        cum = self._cum
+        if not cum:
+            return iter(())
+        i = bisect.bisect_right(cum, cum[-1] - pixels)
+        return itertools.islice(self.points, max(0, i - 1), None)
+
+    def polyline(self):
+        """(x, y, new_run) triples; new_run marks a moveTo (start or wrap)."""
+        grid = self.grid
+        for i, (x, y) in enumerate(self.points, self.base):
+            yield x, y, i not in grid
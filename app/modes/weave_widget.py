@@ -1,6 +1,6 @@
 # -*- coding: utf-8 -*-
 from PySide6 import QtWidgets, QtGui, QtCore
-import math, random, time, collections
+import math, time
 from app.settings import (
     THEMES,
     INITIAL_TIME_ENDLESS,
@@ -8,14 +8,26 @@ from app.settings import (
     RAMP_RATE,
     MAX_PHASE,
 )
+from app.modes.weave_trail import WeaveTrail
+from app.widgets.glow_atlas import GlowAtlas
+from app.widgets.palette import Palette
+from app.widgets.paint_probe import NULL_PROBE
+from app.frame_scheduler import FrameScheduler
+from app.fixed_step import FixedStepClock, damp, ease, lerp, lerp_wrap
+from app.sim_run import SimRun
 
 NODE_R = 10
 TARGET_R = 11
 GLITCH_R2 = 24 * 24
-SELF_COLLIDE_R2 = 12 * 12
-TRAIL_MAX = 420  # compat
-TRAIL_MAX_LEN = 1200.0  # pixels  # تعداد نقاط رد نور
+SELF_SKIP = 24  # تازه‌ترین سگمنت‌ها (پشت سر بازیکن) حلقه نمی‌بندند
+LOOP_MIN_AREA = 900.0  # px^2؛ حلقهٔ کوچک‌تر = گره خوردن رد نور (باخت)
+LOOP_SCORE_K = 0.25  # امتیاز حلقه = sqrt(مساحت) * K
+TRAIL_MAX = 1200  # سقف تعداد نقاط رد نور؛ معمولاً TRAIL_MAX_LEN زودتر می‌رسد
+TRAIL_MAX_LEN = 1200.0  # سقف طول رد نور (پیکسل)
+TRAIL_DRAW_GAP2 = 3.0 * 3.0  # رسم: رئوس نزدیک‌تر از ۳ پیکسل حذف (قلم 2.6 است)
 PLAYER_R = 10
+TARGET_LIT = ((120, 220, 255, 220), (120, 220, 255, 80))  # (core, glow)
+TARGET_IDLE = ((200, 210, 255, 160), (200, 210, 255, 80))
 
 
 class WeaveWidget(QtWidgets.QWidget):
@@ -27,13 +39,21 @@ class WeaveWidget(QtWidgets.QWidget):
     screenshotSaved = QtCore.Signal(str)
     started = QtCore.Signal()
 
+    # وضعیت شبیه‌سازی برای اسنپ‌شات ری‌پلی (app.snapshot)
+    SNAPSHOT_ATTRS = (
+        "px", "py", "_prev_pos", "vx", "vy", "heading", "score", "time_left",
+        "_phase", "_elapsed", "timers", "power_state", "glitches", "targets",
+        "trail", "run",
+    )
+
     def __init__(self, parent=None):
         super().__init__(parent)
         self.setMouseTracking(True)
         self.setFocusPolicy(QtCore.Qt.StrongFocus)
 
         # تنظیمات و حالت‌ها
-        self._theme = THEMES["Aurora"]
+        self._pal = Palette.for_theme(THEMES["Aurora"])
+        self.paint_probe = NULL_PROBE
         self._lang = "fa"
         self._mode = "endless"  # endless | story
         self._control = "mouse"  # mouse | keys
@@ -45,6 +65,7 @@ class WeaveWidget(QtWidgets.QWidget):
         self._mx = self.px
         self._my = self.height() / 2.0
         self.py = self.height() / 2.0
+        self._prev_pos = (self.px, self.py)  # جای بازیکن در تیک قبلی
         self.mx = self.px
         self.my = self.py
         self.vx = 0.0
@@ -61,19 +82,21 @@ class WeaveWidget(QtWidgets.QWidget):
         self.score = 0
         self.best = 0
         self.time_left = 60
-        self.trail = collections.deque(maxlen=TRAIL_MAX)  # (x,y)
+        # رد نور: نقاط + طول تجمعی + گرید سگمنت‌ها (اندیس مطلق)
+        self.trail = WeaveTrail(TRAIL_MAX_LEN, TRAIL_MAX)
+        self._loop_fx = []  # [polygon (N, 2), life, QPolygonF|None] حلقه‌های بسته‌شده برای افکت
         self.targets = []  # {x,y,lit:bool,t:float}
         self.glitches = []  # {x,y,vx,vy,life,hue}
         self.power_state = {"shield": 0.0, "slowmo": 0.0}
         self.timers = {"glitch": 1.5, "target": 0.0}
 
         # گرافیک
-        self._last = time.perf_counter()
-        self._acc = 0.0
-        self._step = 1 / 60.0
-        self._timer = QtCore.QTimer(self)
-        self._timer.timeout.connect(self._tick)
-        self._timer.start(1000 // 120)
+        self.clock = FixedStepClock()  # sim rate; alpha for interpolation
+        self.run = SimRun()  # rng + ساعت شبیه‌سازی هر ران
+        self.run_seed = None  # None: seed تازه برای هر ران
+        self.recorder = None  # ReplayRecorder هنگام ضبط ران
+        self._frames = FrameScheduler.instance()
+        self._frames.register(self)
 
         # هینت
         self._run_started_ts = None
@@ -83,7 +106,7 @@ class WeaveWidget(QtWidgets.QWidget):
         self._lang = lang
 
     def set_theme(self, name: str):
-        self._theme = THEMES.get(name, self._theme)
+        self._pal = Palette.for_theme(THEMES.get(name, self._pal.theme))
         self.update()
 
     def set_mode(self, mode: str):
@@ -98,6 +121,9 @@ class WeaveWidget(QtWidgets.QWidget):
     def set_sfx(self, on: bool):
         pass
 
+    def set_sim_rate(self, hz: float):
+        self.clock.set_rate(hz)
+
     # ---------- آماده‌سازی
     def prepare_endless(self, _ignored=INITIAL_TIME_ENDLESS):
         self._reset_world()
@@ -110,6 +136,7 @@ class WeaveWidget(QtWidgets.QWidget):
 
     def prepare_story(self, idx: int):
         self._reset_world()
+        self.story_idx = idx  # برای ری‌پلی
         self._mode = "story"
         # زمان مرحله: بر اساس سختی سبک
         self.time_left = 75 if idx < 5 else 60
@@ -124,14 +151,15 @@ class WeaveWidget(QtWidgets.QWidget):
             return
         self.running = True
         self.paused = False
-        self._last = time.perf_counter()
-        self._run_started_ts = self._last
+        self._run_started_ts = time.perf_counter()
+        self._frames.wake(self)
         self.started.emit()
 
     def toggle_pause(self):
         if not self.running:
             return
         self.paused = not self.paused
+        self._frames.wake(self)
 
     def reset(self):
         if self._mode == "endless":
@@ -143,10 +171,14 @@ class WeaveWidget(QtWidgets.QWidget):
     def _reset_world(self):
         w = max(1, self.width())
         h = max(1, self.height())
+        self.run.reset(self.run_seed)
         self.score = 0
         self.trail.clear()
+        self.trail.resize(w, h)
+        self._loop_fx.clear()
         self.px = w / 2
         self.py = h / 2
+        self._prev_pos = (self.px, self.py)
         self.vx = self.vy = 0.0
         self.heading = 0.0
         self.key_left = self.key_right = False
@@ -159,33 +191,32 @@ class WeaveWidget(QtWidgets.QWidget):
         # الگوی اولیه هدف‌ها
         self._spawn_pattern()
 
-    def _tick(self):
-        now = time.perf_counter()
-        dt = min(0.05, now - self._last)
-        self._last = now
+    def _tick(self, dt: float):
         if self.running and not self.paused:
-            self._acc += dt
-            while self._acc >= self._step:
-                self._update(self._step)
-                self._acc -= self._step
-            self.update()
-        else:
-            self.update()
+            rec = self.recorder
+            for step in self.clock.steps(dt):
+                if rec is not None:
+                    rec.capture(self)
+                self._update(step)
+                if not self.running:  # ران تمام شد: قدم‌های باقی فریم پایان را تکرار نکنند
+                    break
 
     def _update(self, dt: float):
         w, h = self.width(), self.height()
+        self.run.advance(dt)
         # فاز سختی (نرم و تدریجی)
         if self._mode == "endless":
             self._elapsed += dt
             tnorm = max(0.0, min(1.0, self._elapsed / RAMP_DURATION))
             smooth = tnorm * tnorm * (3 - 2 * tnorm)
             target = smooth * MAX_PHASE
-            self._phase += (target - self._phase) * RAMP_RATE
+            self._phase += (target - self._phase) * ease(RAMP_RATE, dt)
 
         # حرکت
+        self._prev_pos = (self.px, self.py)
         if self._control == "mouse":
             accel = 720
-            damping = 0.88
+            damping = damp(0.88, dt)
             maxs = 320
             dx = self.mx - self.px
             dy = self.my - self.py
@@ -224,8 +255,9 @@ class WeaveWidget(QtWidgets.QWidget):
             elif self.py > h:
                 self.py -= h
 
-        # ثبت رد نور
-        self.trail.append((self.px, self.py))
+        # ثبت رد نور (هرس تا TRAIL_MAX_LEN داخل push)
+        self.trail.resize(w, h)
+        self.trail.push(self.px, self.py)
 
         # تولید گلیچ + تکان
         spmul = 1 + self._phase * 0.08
@@ -235,6 +267,7 @@ class WeaveWidget(QtWidgets.QWidget):
             self.timers["glitch"] = max(0.6, 1.5 - self._phase * 0.05)
 
         for g in self.glitches:
+            g["x0"], g["y0"] = g["x"], g["y"]
             g["x"] += g["vx"] * dt
             g["y"] += g["vy"] * dt
             if g["x"] < 0 or g["x"] > w:
@@ -254,16 +287,21 @@ class WeaveWidget(QtWidgets.QWidget):
                     self._finish("hit")
                     return
 
-        # خودبرخوردی Tail
-        if len(self.trail) > 24:
-            hx, hy = self.trail[-1]
-            for i in range(0, len(self.trail) - 24, 6):
-                x, y = self.trail[i]
-                if (hx - x) ** 2 + (hy - y) ** 2 < SELF_COLLIDE_R2:
-                    if self.power_state["shield"] <= 0:
-                        self._finish("self")
-                        return
-                    break
+        # بستن حلقه: سگمنت سر از رد نور قدیمی‌تر عبور کرد
+        loop = self.trail.close_loop(SELF_SKIP)
+        if loop is not None:
+            if loop.area < LOOP_MIN_AREA:
+                if self.power_state["shield"] <= 0:
+                    self._finish("self")
+                    return
+            else:
+                self._score_loop(loop)
+            # حلقه مصرف می‌شود؛ رد نور از نقطهٔ برخورد از نو شروع می‌شود
+            self.trail.cut_before(self.trail.n - 2)
+        for fx in self._loop_fx:
+            fx[1] -= dt
+        if self._loop_fx and self._loop_fx[0][1] <= 0:
+            self._loop_fx = [fx for fx in self._loop_fx if fx[1] > 0]
 
         # هدف‌ها؛ نزدیک شدن و روشن‌شدن
         all_lit = True
@@ -298,46 +336,69 @@ class WeaveWidget(QtWidgets.QWidget):
             if self.power_state[k] > 0:
                 self.power_state[k] -= dt
 
-    def _spawn_glitch(self, w, h):
-        sp = random.uniform(28, 60) * (1 + self._phase * 0.06)
-        ang = random.uniform(0, math.tau)
-        self.glitches.append(
-            {
-                "x": random.uniform(0, w),
-                "y": random.uniform(0, h),
-                "vx": math.cos(ang) * sp,
-                "vy": math.sin(ang) * sp,
-                "r": 10,
-                "hue": random.uniform(0, 20),
-                "life": random.uniform(6, 12),
-            }
+    def _score_loop(self, loop):
+        """حلقهٔ بزرگ‌تر = امتیاز بیشتر؛ هدف‌های داخل روشن و گلیچ‌های داخل حذف می‌شوند."""
+        gain = int(math.sqrt(loop.area) * LOOP_SCORE_K)
+        inside = loop.contains(
+            [t["x"] for t in self.targets], [t["y"] for t in self.targets]
+        )
+        for t, hit in zip(self.targets, inside.tolist()):
+            if hit and not t["lit"]:
+                t["lit"] = True
+                gain += 12
+        inside = loop.contains(
+            [g["x"] for g in self.glitches], [g["y"] for g in self.glitches]
         )
+        if inside.any():
+            caught = inside.tolist()
+            gain += 15 * sum(caught)
+            self.glitches = [g for g, c in zip(self.glitches, caught) if not c]
+        self.score += gain
+        self.scoreChanged.emit(self.score)
+        self._loop_fx.append([loop.polygon, 0.6, None])  # QPolygonF را رندر می‌سازد
+
+    def _spawn_glitch(self, w, h):
+        rng = self.run.rng
+        sp = rng.uniform(28, 60) * (1 + self._phase * 0.06)
+        ang = rng.uniform(0, math.tau)
+        g = {
+            "x": rng.uniform(0, w),
+            "y": rng.uniform(0, h),
+            "vx": math.cos(ang) * sp,
+            "vy": math.sin(ang) * sp,
+            "r": 10,
+            "hue": rng.uniform(0, 20),
+            "life": rng.uniform(6, 12),
+        }
+        g["x0"], g["y0"] = g["x"], g["y"]  # قابل رسم حتی پیش از تیک بعد
+        self.glitches.append(g)
 
     def _spawn_pattern(self):
         """چند چینش ساده: خطی، مثلثی، شش‌ضلعی کوچک، موجی"""
         w, h = self.width() or 1200, self.height() or 800
         cx, cy = w * 0.5, h * 0.5
-        typ = random.choice(["line", "tri", "hex", "arc"])
+        rng = self.run.rng
+        typ = rng.choice(["line", "tri", "hex", "arc"])
         pts = []
         if typ == "line":
             L = 6
             x0 = cx - 120
-            y0 = cy + random.uniform(-80, 80)
+            y0 = cy + rng.uniform(-80, 80)
             for i in range(L):
                 pts.append((x0 + i * 48, y0 + math.sin(i * 0.6) * 22))
         elif typ == "tri":
             r = 120
             for i in range(3):
-                a = i * math.tau / 3 + random.uniform(-0.2, 0.2)
+                a = i * math.tau / 3 + rng.uniform(-0.2, 0.2)
                 pts.append((cx + math.cos(a) * r, cy + math.sin(a) * r))
         elif typ == "hex":
             r = 130
             for i in range(6):
-                a = i * math.tau / 6 + random.uniform(-0.1, 0.1)
+                a = i * math.tau / 6 + rng.uniform(-0.1, 0.1)
                 pts.append((cx + math.cos(a) * r, cy + math.sin(a) * r))
         else:  # arc
             R = 150
-            a0 = random.uniform(0, math.tau)
+            a0 = rng.uniform(0, math.tau)
             for i in range(6):
                 a = a0 + i * math.tau / 9
                 pts.append((cx + math.cos(a) * R, cy + math.sin(a) * R * 0.6))
@@ -394,88 +455,68 @@ class WeaveWidget(QtWidgets.QWidget):
 
     # ---------- رسم
 
-    def _prune_trail_by_length(self):
-        import math
-
-        pts = self.trail
-        if not pts or len(pts) < 2:
-            return
-        total = 0.0
-        keep = [pts[-1]]
-        for i in range(len(pts) - 2, -1, -1):
-            x1, y1 = pts[i]
-            x2, y2 = keep[-1]
-            dx, dy = x2 - x1, y2 - y1
-            seg = math.hypot(dx, dy)
-            if total + seg > TRAIL_MAX_LEN and len(keep) > 1:
-                break
-            keep.append((x1, y1))
-            total += seg
-        keep.reverse()
-        self.trail = keep
-
     def paintEvent(self, e: QtGui.QPaintEvent):
         p = QtGui.QPainter(self)
         p.setRenderHint(QtGui.QPainter.Antialiasing)
         w, h = self.width(), self.height()
         t = time.perf_counter()
+        al = self.clock.alpha
+        pal = self._pal
+        probe = self.paint_probe
+        probe.begin()
 
         # پس زمینه
         grad = QtGui.QLinearGradient(0, 0, w, h)
-        a = self._theme.bgA + math.sin(t) * 20
-        b = self._theme.bgB + math.cos(t * 0.7) * 20
+        a = pal.theme.bgA + math.sin(t) * 20
+        b = pal.theme.bgB + math.cos(t * 0.7) * 20
         grad.setColorAt(0, QtGui.QColor.fromHsl(int(a) % 360, 180, 15))
         grad.setColorAt(1, QtGui.QColor.fromHsl(int(b) % 360, 180, 18))
         p.fillRect(self.rect(), grad)
+        probe.lap("background")
 
         # --- Trail (با شکست هنگام wrap) ---
         if len(self.trail) > 1:
-            it = iter(self.trail)
-            x0, y0 = next(it)
-            path = QtGui.QPainterPath(QtCore.QPointF(x0, y0))
-            prevx, prevy = x0, y0
-            for x, y in it:
-                # اگر جهش بزرگ (wrap) بود، مسیر جدید شروع کن
-                if abs(prevx - x) > w * 0.5 or abs(prevy - y) > h * 0.5:
+            path = QtGui.QPainterPath()
+            lx = ly = 0.0
+            for x, y, new_run in self.trail.polyline():
+                # شروع مسیر یا جهش wrap: مسیر جدید
+                if new_run:
                     path.moveTo(x, y)
-                else:
+                    lx, ly = x, y
+                elif (x - lx) * (x - lx) + (y - ly) * (y - ly) >= TRAIL_DRAW_GAP2:
                     path.lineTo(x, y)
-                prevx, prevy = x, y
+                    lx, ly = x, y
+            if (lx, ly) != self.trail.head:
+                path.lineTo(*self.trail.head)  # سر رد نور همیشه به بازیکن برسد
             pen = QtGui.QPen(QtGui.QColor(140, 190, 255, 160), 2.6)
             p.setPen(pen)
             p.drawPath(path)
 
+        # حلقه‌های بسته‌شده (محو شونده)
+        if self._loop_fx:
+            p.setPen(QtCore.Qt.NoPen)
+            for fx in self._loop_fx:
+                if fx[2] is None:
+                    fx[2] = QtGui.QPolygonF([QtCore.QPointF(x, y) for x, y in fx[0].tolist()])
+                p.setBrush(QtGui.QColor(140, 190, 255, int(max(0.0, fx[1]) * 150)))
+                p.drawPolygon(fx[2])
+
         # هدف‌ها
+        atlas = GlowAtlas.shared(self.devicePixelRatioF())
         p.setPen(QtCore.Qt.NoPen)
         for tgd in self.targets:
             pul = 1 + math.sin(tgd["t"] * 6) * 0.18
-            clr = (
-                QtGui.QColor(120, 220, 255, 220)
-                if tgd["lit"]
-                else QtGui.QColor(200, 210, 255, 160)
-            )
-            glow = QtGui.QColor(clr)
-            glow.setAlpha(80)
-            p.setBrush(glow)
-            p.drawEllipse(
-                QtCore.QPointF(tgd["x"], tgd["y"]),
-                TARGET_R * pul + 5,
-                TARGET_R * pul + 5,
-            )
-            p.setBrush(clr)
-            p.drawEllipse(
-                QtCore.QPointF(tgd["x"], tgd["y"]), TARGET_R * pul, TARGET_R * pul
+            core, glow = TARGET_LIT if tgd["lit"] else TARGET_IDLE
+            atlas.draw(
+                p, tgd["x"], tgd["y"], core, TARGET_R * pul, glow, TARGET_R * pul + 5
             )
 
         # گلیچ‌ها
+        g_core, g_halo = pal.hsl(240, 180, 230), pal.hsl(240, 130, 110)
         for g in self.glitches:
-            halo = QtGui.QColor.fromHsl(int(g["hue"]) % 360, 240, 130, 110)
-            p.setBrush(halo)
-            p.setPen(QtCore.Qt.NoPen)
-            p.drawEllipse(QtCore.QPointF(g["x"], g["y"]), 14, 14)
-            core = QtGui.QColor.fromHsl(int(g["hue"]) % 360, 240, 180, 230)
-            p.setBrush(core)
-            p.drawEllipse(QtCore.QPointF(g["x"], g["y"]), 10, 10)
+            gx, gy = lerp(g["x0"], g["x"], al), lerp(g["y0"], g["y"], al)
+            atlas.draw(p, gx, gy, g_core.rgba(g["hue"]), 10, g_halo.rgba(g["hue"]), 14)
+        probe.lap("entities")
 
         # بازیکن
         sp = (
@@ -487,19 +528,14 @@ class WeaveWidget(QtWidgets.QWidget):
             math.atan2(self.vy, self.vx) if self._control == "mouse" else self.heading
         )
         trail = min(sp * 0.04, 12)
+        x0, y0 = self._prev_pos
+        ppx, ppy = lerp_wrap(x0, self.px, al, w), lerp_wrap(y0, self.py, al, h)
+        atlas.draw(p, ppx, ppy, pal.player_glow, PLAYER_R + trail * 0.6)
         p.save()
-        p.translate(self.px, self.py)
+        p.translate(ppx, ppy)
         p.rotate(math.degrees(direction))
-        glowA = QtGui.QColor(self._theme.playerA)
-        glowA.setAlpha(100)
-        p.setBrush(glowA)
         p.setPen(QtCore.Qt.NoPen)
-        p.drawEllipse(
-            QtCore.QPointF(0, 0), PLAYER_R + trail * 0.6, PLAYER_R + trail * 0.6
-        )
-        grad2 = QtGui.QLinearGradient(-trail, -PLAYER_R, PLAYER_R, PLAYER_R)
-        grad2.setColorAt(0, QtGui.QColor(self._theme.playerA))
-        grad2.setColorAt(1, QtGui.QColor(self._theme.playerB))
+        grad2 = pal.player_gradient(-trail, -PLAYER_R, PLAYER_R, PLAYER_R)
         p.setBrush(QtGui.QBrush(grad2))
         path = QtGui.QPainterPath()
         path.moveTo(PLAYER_R + 2, 0)
@@ -508,9 +544,11 @@ class WeaveWidget(QtWidgets.QWidget):
         path.closeSubpath()
         p.drawPath(path)
         p.restore()
+        probe.lap("player")
 
         # HUD ساده
-        p.setPen(QtGui.QPen(QtGui.QColor(255, 255, 255, 150)))
-        p.setFont(QtGui.QFont("Inter", 10, QtGui.QFont.Bold))
+        p.setPen(pal.hud_pen)
+        p.setFont(pal.hud_font)
         mode = "Endless" if self._mode == "endless" else "Story"
         p.drawText(10, h - 12, f"Flux Weave — {mode}")
+        probe.lap("hud")
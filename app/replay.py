@@ -0,0 +1,496 @@
+# -*- coding: utf-8 -*-
+"""Run replays: a compact binary input log and a headless re-simulator.
+
+A run is fully determined by its seed (`SimRun`), its setup (mode widget,
+endless/story + level, control mode, sim rate) and what the player did on
+every fixed step. `ReplayRecorder.capture()` is called by a mode's `_tick`
+right before each `_update` and logs one frame per step:
+
+    mx, my        mouse target, quantized to 1/MOUSE_Q px
+    keys          KEY_LEFT | KEY_RIGHT | KEY_ABILITY (blink/dash this step)
+    w, h          widget size
+    rate          sim rate (Hz)
+
+The quantized mouse position is written back into the widget before the
+step, so the live run simulates exactly what the replay will feed in.
+
+File layout (little endian):
+
+    b"NBR1" | u16 version | u32 header_len | header (UTF-8 JSON)
+    | u32 n | n seek points | u32 body_len | zlib(body) | snapshot blobs
+
+The body is one mask byte per step (which fields changed) followed by the
+changed fields only: for mx/my a zigzag varint of the change in per-step
+velocity, a byte for keys, varints for w/h and a float64 for rate. A step
+with a still or steadily moving mouse costs one byte before zlib; a minute
+of play is a few KB.
+
+Every SNAP_SECONDS of sim time the recorder also stores a world snapshot
+(`app.snapshot`, well under a millisecond to take) together with the body
+offset and decoder state of that step. `ReplayPlayer.seek()` restores the
+nearest snapshot at or before the target and simulates the rest, so any
+point is reachable in O(snapshot interval), in both directions.
+
+`resimulate()` rebuilds the mode widget headless and drives `_update`
+directly from the log -- no timer, no painting -- and reports whether the
+final score matches the recorded one.
+"""
+import bisect, importlib, itertools, json, os, struct, time, zlib
+from dataclasses import dataclass
+from pathlib import Path
+
+from app import snapshot
+
+MAGIC = b"NBR1"
+VERSION = 2  # 1: بدون اسنپ‌شات و ایندکس
+SUFFIX = ".nbr"
+MOUSE_Q = 16  # زیرپیکسل: 1/16 px
+SNAP_SECONDS = 10.0  # فاصلهٔ اسنپ‌شات‌ها به ثانیهٔ شبیه‌سازی
+
+KEY_LEFT, KEY_RIGHT, KEY_ABILITY = 1, 2, 4
+F_MX, F_MY, F_KEYS, F_SIZE, F_RATE = 1, 2, 4, 8, 16
+
+# kind -> "module:Class" (benchmarks share this registry)
+MODE_CLASSES = {
+    "classic": "app.game_widget:GameWidget",
+    "flow": "app.modes.flow_widget:FlowWidget",
+    "weave": "app.modes.weave_widget:WeaveWidget",
+    "phantom": "app.modes.phantom_run_widget:PhantomRunWidget",
+    "mirror": "app.modes.mirror_widget:MirrorWidget",
+    "collapse": "app.modes.neural_collapse_widget:NeuralCollapseWidget",
+    "rush": "app.modes.signal_rush_widget:SignalRushWidget",
+}
+_KIND_OF = {path.split(":")[1]: kind for kind, path in MODE_CLASSES.items()}
+
+
+def kind_of(widget) -> str:
+    for cls in type(widget).__mro__:
+        if cls.__name__ in _KIND_OF:
+            return _KIND_OF[cls.__name__]
+    raise ValueError(f"no replay kind for {type(widget).__name__}")
+
+
+def create_widget(kind: str):
+    mod, cls = MODE_CLASSES[kind].split(":")
+    return getattr(importlib.import_module(mod), cls)()
+
+
+# ---- varints
+def _put_uv(buf: bytearray, n: int):
+    while n >= 0x80:
+        buf.append((n & 0x7F) | 0x80)
+        n >>= 7
+    buf.append(n)
+
+
+def _put_sv(buf: bytearray, n: int):
+    _put_uv(buf, n << 1 if n >= 0 else ((-n) << 1) - 1)
+
+
+def _get_uv(data, i: int):
+    n = shift = 0
+    while True:
+        b = data[i]
+        i += 1
+        n |= (b & 0x7F) << shift
+        if b < 0x80:
+            return n, i
+        shift += 7
+
+
+def _get_sv(data, i: int):
+    n, i = _get_uv(data, i)
+    return (n >> 1) ^ -(n & 1), i
+
+
+_F64 = struct.Struct("<d")
+
+
+class FrameEncoder:
+    """Encodes (mx_q, my_q, keys, w, h, rate) frames into `body`.
+
+    The mouse is predicted to keep its last per-step velocity and only the
+    miss is stored, so steady motion costs as little as a still mouse.
+    """
+
+    def __init__(self):
+        self.body = bytearray()
+        self.count = 0
+        self._x = self._y = self._vx = self._vy = 0
+        self._rest = (0, 0, 0, 0.0)  # keys, w, h, rate
+
+    def push(self, frame: tuple):
+        qx, qy, keys, w, h, rate = frame
+        dx = qx - self._x - self._vx
+        dy = qy - self._y - self._vy
+        self._vx, self._x = qx - self._x, qx
+        self._vy, self._y = qy - self._y, qy
+        pk, pw, ph, pr = self._rest
+        mask = (
+            (F_MX if dx else 0)
+            | (F_MY if dy else 0)
+            | (F_KEYS if keys != pk else 0)
+            | (F_SIZE if w != pw or h != ph else 0)
+            | (F_RATE if rate != pr else 0)
+        )
+        buf = self.body
+        buf.append(mask)
+        if mask:
+            if mask & F_MX:
+                _put_sv(buf, dx)
+            if mask & F_MY:
+                _put_sv(buf, dy)
+            if mask & F_KEYS:
+                buf.append(keys)
+            if mask & F_SIZE:
+                _put_uv(buf, w)
+                _put_uv(buf, h)
+            if mask & F_RATE:
+                buf += _F64.pack(rate)
+            self._rest = (keys, w, h, rate)
+        self.count += 1
+
+    def state(self) -> tuple:
+        """Decoder state before the next frame (see `decode_frames`)."""
+        return (self._x, self._y, self._vx, self._vy) + self._rest
+
+
+def decode_frames(body, offset: int = 0, state: tuple = None):
+    """Yields the (mx_q, my_q, keys, w, h, rate) frame of every step, from
+    `offset` on with the encoder `state` saved there (a seek point)."""
+    qx, qy, vx, vy, keys, w, h, rate = state or (0, 0, 0, 0, 0, 0, 0, 0.0)
+    i, n = offset, len(body)
+    while i < n:
+        mask = body[i]
+        i += 1
+        dx = dy = 0
+        if mask:
+            if mask & F_MX:
+                dx, i = _get_sv(body, i)
+            if mask & F_MY:
+                dy, i = _get_sv(body, i)
+            if mask & F_KEYS:
+                keys = body[i]
+                i += 1
+            if mask & F_SIZE:
+                w, i = _get_uv(body, i)
+                h, i = _get_uv(body, i)
+            if mask & F_RATE:
+                (rate,) = _F64.unpack_from(body, i)
+                i += 8
+        vx += dx
+        vy += dy
+        qx += vx
+        qy += vy
+        yield qx, qy, keys, w, h, rate
+
+
+_POINT = struct.Struct("<IIqqqqBIIdII")  # tick, offset, decoder state, blob offset/len
+
+
+@dataclass
+class SeekPoint:
+    tick: int  # steps simulated before the snapshot
+    offset: int  # body offset of frame `tick`
+    dec: tuple  # decoder state at `offset`
+    data: bytes  # app.snapshot of the world
+
+
+class Replay:
+    """Header dict + the encoded per-step body + seek points."""
+
+    def __init__(self, header: dict, body: bytes, points=()):
+        self.header = header
+        self.body = bytes(body)
+        self.points = list(points)
+
+    @property
+    def ticks(self) -> int:
+        return self.header.get("ticks", 0)
+
+    def frames(self):
+        return decode_frames(self.body)
+
+    def to_bytes(self) -> bytes:
+        head = json.dumps(self.header, separators=(",", ":"), sort_keys=True).encode("utf-8")
+        out = bytearray(MAGIC + struct.pack("<HI", VERSION, len(head)) + head)
+        out += struct.pack("<I", len(self.points))
+        pos = 0
+        for p in self.points:
+            out += _POINT.pack(p.tick, p.offset, *p.dec, pos, len(p.data))
+            pos += len(p.data)
+        body = zlib.compress(self.body, 9)
+        out += struct.pack("<I", len(body)) + body
+        for p in self.points:
+            out += p.data
+        return bytes(out)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "Replay":
+        """Raises ValueError for anything that is not a whole replay file."""
+        try:
+            return cls._parse(data)
+        except (struct.error, zlib.error, UnicodeDecodeError, json.JSONDecodeError) as e:
+            raise ValueError(f"corrupt replay: {e}") from e
+
+    @classmethod
+    def _parse(cls, data: bytes) -> "Replay":
+        if data[:4] != MAGIC:
+            raise ValueError("not a Neural Bloom replay")
+        version, n = struct.unpack_from("<HI", data, 4)
+        if version > VERSION:
+            raise ValueError(f"replay version {version} is newer than {VERSION}")
+        i = 10 + n
+        head = json.loads(data[10:i].decode("utf-8"))
+        if version == 1:
+            return cls(head, zlib.decompress(data[i:]))
+        (count,) = struct.unpack_from("<I", data, i)
+        i += 4
+        index = [_POINT.unpack_from(data, i + k * _POINT.size) for k in range(count)]
+        i += count * _POINT.size
+        (blen,) = struct.unpack_from("<I", data, i)
+        body = zlib.decompress(data[i + 4 : i + 4 + blen])
+        blobs = i + 4 + blen
+        if any(blobs + e[10] + e[11] > len(data) for e in index):
+            raise ValueError("truncated replay snapshots")
+        points = [
+            SeekPoint(e[0], e[1], e[2:10], data[blobs + e[10] : blobs + e[10] + e[11]])
+            for e in index
+        ]
+        return cls(head, body, points)
+
+    def save(self, path) -> Path:
+        path = Path(path)
+        tmp = path.with_name(path.name + ".tmp")
+        tmp.write_bytes(self.to_bytes())
+        os.replace(tmp, path)  # اتمیک: فایل نیمه‌نوشته هیچ‌وقت جای فایل سالم را نمی‌گیرد
+        return path
+
+    @classmethod
+    def load(cls, path) -> "Replay":
+        return cls.from_bytes(Path(path).read_bytes())
+
+
+def _control_of(widget) -> str:
+    return getattr(widget, "_control_mode", None) or getattr(widget, "_control", "mouse")
+
+
+class ReplayRecorder:
+    """Logs one frame per fixed step of a started run.
+
+    Attach as `widget.recorder` after `start()`; the widget's `_tick` calls
+    `capture(widget)` before every `_update`. `finish()` closes the log
+    (later captures are ignored) and returns the `Replay`. A snapshot is
+    stored every `snap_every` sim seconds (None: no seek index).
+    """
+
+    def __init__(self, widget, snap_every: float = SNAP_SECONDS):
+        submode = getattr(widget, "submode", None)
+        self.header = {
+            "kind": kind_of(widget),
+            "submode": submode() if callable(submode) else kind_of(widget),
+            "run_mode": getattr(widget, "_mode", "endless"),
+            "story_idx": int(getattr(widget, "story_idx", 0)),
+            "level_mods": dict(getattr(widget, "level_mods", None) or {}),
+            "control": _control_of(widget),
+            "seed": widget.run.seed,
+            "rate": widget.clock.rate,
+            "width": widget.width(),
+            "height": widget.height(),
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        }
+        self.enc = FrameEncoder()
+        # ورودی‌ها کجا هستند (Classic: ClassicInputs)؛ یک بار، نه هر قدم
+        self._src = getattr(widget, "inputs", widget)
+        self._has_my = hasattr(self._src, "my")
+        self.points = []
+        self._snap_ticks = max(1, round(snap_every * widget.clock.rate)) if snap_every else 0
+        self.closed = False
+
+    def capture(self, widget):
+        if self.closed:
+            return
+        enc = self.enc
+        if self._snap_ticks and enc.count and enc.count % self._snap_ticks == 0:
+            self.points.append(
+                SeekPoint(enc.count, len(enc.body), enc.state(), snapshot.capture(widget))
+            )
+        src = self._src
+        qx = round(src.mx * MOUSE_Q)
+        src.mx = qx / MOUSE_Q
+        qy = 0
+        if self._has_my:
+            qy = round(src.my * MOUSE_Q)
+            src.my = qy / MOUSE_Q
+        keys = (
+            (KEY_LEFT if src.key_left else 0)
+            | (KEY_RIGHT if src.key_right else 0)
+            | (KEY_ABILITY if getattr(widget, "ability_queued", False) else 0)
+        )
+        enc.push((qx, qy, keys, widget.width(), widget.height(), widget.clock.rate))
+
+    def finish(self, score: int, label: str = "", reason: str = "") -> Replay:
+        self.closed = True
+        head = dict(self.header, score=int(score), label=label, reason=reason, ticks=self.enc.count)
+        return Replay(head, self.enc.body, self.points)
+
+
+def _resize(widget, w, h):
+    from PySide6 import QtCore, QtGui
+
+    old = widget.size()
+    widget.resize(w, h)  # ویجت پنهان: رویداد resize را خودمان بفرستیم
+    QtCore.QCoreApplication.sendEvent(widget, QtGui.QResizeEvent(widget.size(), old))
+
+
+def _apply(widget, src, has_my, frame):
+    qx, qy, keys, w, h, rate = frame
+    src.mx = qx / MOUSE_Q
+    if has_my:
+        src.my = qy / MOUSE_Q
+    src.key_left = bool(keys & KEY_LEFT)
+    src.key_right = bool(keys & KEY_RIGHT)
+    if keys & KEY_ABILITY:
+        widget.ability_queued = True
+    if w != widget.width() or h != widget.height():
+        _resize(widget, w, h)
+    if rate != widget.clock.rate:
+        widget.set_sim_rate(rate)
+
+
+def setup_widget(replay: Replay, widget=None):
+    """A mode widget prepared and started exactly like the recorded run."""
+    h = replay.header
+    if widget is None:
+        widget = create_widget(h["kind"])
+        widget._frames.unregister(widget)  # بی‌سر؛ فقط با _update جلو می‌رود
+    widget.resize(h["width"], h["height"])
+    widget.set_mode(h["run_mode"])
+    widget.set_control_mode(h["control"])
+    widget.set_sim_rate(h["rate"])
+    if hasattr(widget, "set_submode"):
+        widget.set_submode(h["submode"])
+    widget.run_seed = h["seed"]
+    if h["run_mode"] == "story":
+        widget.prepare_story(h["story_idx"])
+    else:
+        widget.prepare_endless()
+    widget.start()
+    return widget
+
+
+@dataclass
+class ResimResult:
+    score: int
+    expected: int
+    ticks: int
+    seconds: float
+
+    @property
+    def ok(self) -> bool:
+        return self.score == self.expected
+
+    @property
+    def ticks_per_s(self) -> float:
+        return self.ticks / self.seconds if self.seconds > 0 else 0.0
+
+
+class ReplayPlayer:
+    """Plays a replay on a headless widget: `step()` forward, `seek()` to
+    any tick through the nearest snapshot at or before it."""
+
+    def __init__(self, replay: Replay, widget=None):
+        self.replay = replay
+        self.widget = widget
+        self._ticks = [p.tick for p in replay.points]
+        self._rewind()
+
+    @property
+    def done(self) -> bool:
+        return self.tick >= self.replay.ticks
+
+    def _rewind(self):
+        w = self.widget = setup_widget(self.replay, self.widget)
+        self._src = getattr(w, "inputs", w)
+        self._has_my = hasattr(self._src, "my")
+        self._frames = self.replay.frames()
+        self.tick = 0
+
+    def _load(self, p: SeekPoint):
+        w = self.widget
+        fw, fh, rate = p.dec[5:]
+        if fw != w.width() or fh != w.height():
+            _resize(w, fw, fh)
+        if rate != w.clock.rate:
+            w.set_sim_rate(rate)
+        snapshot.restore(w, p.data)
+        self._frames = decode_frames(self.replay.body, p.offset, p.dec)
+        self.tick = p.tick
+
+    def step(self, n: int = None) -> int:
+        """Simulate the next `n` steps (None: to the end); returns how many ran."""
+        w, src, has_my = self.widget, self._src, self._has_my
+        upd = w._update
+        k = 0
+        for frame in itertools.islice(self._frames, n):
+            _apply(w, src, has_my, frame)
+            upd(w.clock.step)
+            k += 1
+        self.tick += k
+        return k
+
+    def seek(self, tick: int):
+        tick = max(0, min(int(tick), self.replay.ticks))
+        i = bisect.bisect_right(self._ticks, tick) - 1
+        if tick < self.tick or (i >= 0 and self._ticks[i] > self.tick):
+            if i < 0:
+                self._rewind()
+            else:
+                self._load(self.replay.points[i])
+        self.step(tick - self.tick)
+
+
+def resimulate(replay: Replay, widget=None) -> ResimResult:
+    """Re-runs the log headless; the widget is left in its final state."""
+    player = ReplayPlayer(replay, widget)
+    t0 = time.perf_counter()
+    ticks = player.step()
+    secs = time.perf_counter() - t0
+    widget = player.widget
+    widget.running = False
+    return ResimResult(int(widget.score), int(replay.header.get("score", 0)), ticks, secs)
+
+
+def main(argv=None):
+    import argparse, os, sys
+
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PySide6 import QtWidgets
+
+    ap = argparse.ArgumentParser(description="Re-simulate replays and verify their scores.")
+    ap.add_argument("files", nargs="+")
+    ap.add_argument("--seek", type=float, nargs="*", default=[], help="also time seeks to these sim seconds")
+    args = ap.parse_args(argv)
+    app = QtWidgets.QApplication.instance() or QtWidgets.QApplication([])  # noqa: F841
+    bad = 0
+    for f in args.files:
+        rp = Replay.load(f)
+        res = resimulate(rp)
+        bad += not res.ok
+        print(
+            f"{f}: {rp.header['kind']}/{rp.header['run_mode']} score {res.score} "
+            f"(recorded {res.expected}) {'OK' if res.ok else 'MISMATCH'} "
+            f"{res.ticks} ticks @ {res.ticks_per_s:,.0f}/s, {len(rp.points)} snapshots"
+        )
+        if args.seek:
+            player = ReplayPlayer(rp)
+            for sec in args.seek:
+                t0 = time.perf_counter()
+                player.seek(round(sec * rp.header["rate"]))
+                ms = (time.perf_counter() - t0) * 1e3
+                print(f"  seek {sec:7.1f}s -> tick {player.tick:6d} score {player.widget.score} in {ms:.1f} ms")
+    return 1 if bad else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
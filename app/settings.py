@@ -120,5 +120,9 @@ for i in range(1, 51):
     )
 
 API_URL = ""  # e.g. "https://your-worker.example.com" (empty = offline)
-LOCAL_LB_PATH = "leaderboard_local.json"
+LOCAL_LB_PATH = "leaderboard_local.json"  # فرمت قدیمی؛ فقط برای مهاجرت یک‌باره
+LOCAL_LB_DB = str(user_data_path() / "leaderboard.db")  # SQLite (WAL)، همهٔ ران‌ها
 PROGRESS_PATH = "progress.json"  # ذخیره‌ی مرحله‌ی باز/جاری
+REPLAY_DIR = str(user_data_path() / "replays")  # فایل‌های .nbr آخرین ران‌ها
+REPLAY_KEEP = 50
+GHOST_ENABLED = True  # روح بهترین ران (کلاسیک، فلو، فانتوم) کنار ران زنده
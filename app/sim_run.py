@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+"""Per-run randomness and simulation time.
+
+Each mode owns a `SimRun`, reset at the start of every run: `rng` is a
+`random.Random` seeded from the run seed and `t` is a clock advanced only by
+the fixed steps the mode simulates. Spawners draw from `run.rng` and
+time-dependent fields read `run.t` -- never the global `random` module or the
+wall clock -- so the same seed and the same per-tick inputs reproduce a run
+bit for bit (replays, fast-forward, benchmarks). Cosmetic spark jitter gets
+its own stream derived from the same seed (`spark_seed`), so it can neither
+disturb gameplay draws nor differ between two replays.
+"""
+import random, secrets
+from array import array
+
+SPARK_SALT = 0x5EED5
+
+
+def new_seed() -> int:
+    return secrets.randbits(32)
+
+
+class SimRun:
+    def __init__(self, seed: int = None):
+        self.reset(seed)
+
+    def reset(self, seed: int = None):
+        """New run: fresh random seed unless one is given (replays, benches)."""
+        self.seed = new_seed() if seed is None else int(seed)
+        self.rng = random.Random(self.seed)
+        self.t = 0.0  # ثانیه‌های شبیه‌سازی‌شده از شروع ران
+        self.ticks = 0
+
+    def advance(self, dt: float):
+        self.t += dt
+        self.ticks += 1
+
+    @property
+    def spark_seed(self) -> int:
+        return self.seed ^ SPARK_SALT
+
+    # ---- snapshots (see app.snapshot)
+    def state(self) -> dict:
+        version, mt, gauss = self.rng.getstate()
+        return {"seed": self.seed, "t": self.t, "ticks": self.ticks,
+                "mt": array("I", mt).tobytes(), "gauss": gauss}
+
+    def load_state(self, st: dict):
+        self.seed, self.t, self.ticks = st["seed"], st["t"], st["ticks"]
+        self.rng.setstate((3, tuple(array("I", st["mt"])), st["gauss"]))
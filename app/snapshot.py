@@ -0,0 +1,280 @@
+# -*- coding: utf-8 -*-
+"""Compact world snapshots (replay seeking, fast-forward).
+
+A mode lists its simulation state in `SNAPSHOT_ATTRS` (Classic: on
+`ClassicWorld`); `capture(widget)` packs those attributes into bytes and
+`restore(widget, data)` writes them back, after which the mode continues
+bit for bit like the run it was taken from. Inputs, settings, caches and
+Qt objects are not state: a replay re-applies them on every step.
+
+Encoding is a small tagged binary format, zlib'd:
+
+  * numbers, strings, tuples, lists, deques and plain dicts as themselves
+    (ints as zigzag varints, floats as float64);
+  * entity collections -- a list/deque of dicts, or an int-keyed dict of
+    dicts, all with the same keys -- as one packed column per key
+    (float64 / int64 / bool arrays, other values one by one);
+  * NumPy arrays as raw buffers;
+  * helper objects (EntityStore, ParticlePool, SpatialHash, WeaveTrail,
+    SimRun incl. its RNG state) through their `state()` / `load_state()`;
+  * `itertools.count` id sources by their next value.
+
+Dict keys listed in a mode's `SNAPSHOT_SKIP` (e.g. cached row sprites) are
+left out of every dict in the snapshot; the mode rebuilds them when it needs them.
+"""
+import collections, itertools, math, struct, zlib
+from array import array
+
+import numpy as np
+
+_F64 = struct.Struct("<d")
+_DEQUE = collections.deque
+_COUNT = itertools.count
+
+
+def source_of(widget):
+    """Where a mode keeps its simulation state (ClassicWorld for Classic)."""
+    world = getattr(widget, "world", None)
+    return world if world is not None else widget
+
+
+# ---- varints
+def _put_uv(buf, n):
+    while n >= 0x80:
+        buf.append((n & 0x7F) | 0x80)
+        n >>= 7
+    buf.append(n)
+
+
+def _put_sv(buf, n):
+    _put_uv(buf, n << 1 if n >= 0 else ((-n) << 1) - 1)
+
+
+class _Reader:
+    __slots__ = ("d", "i")
+
+    def __init__(self, data):
+        self.d = data
+        self.i = 0
+
+    def uv(self):
+        d, i = self.d, self.i
+        n = shift = 0
+        while True:
+            b = d[i]
+            i += 1
+            n |= (b & 0x7F) << shift
+            if b < 0x80:
+                self.i = i
+                return n
+            shift += 7
+
+    def sv(self):
+        n = self.uv()
+        return (n >> 1) ^ -(n & 1)
+
+    def take(self, n):
+        i = self.i
+        self.i = i + n
+        return self.d[i : i + n]
+
+
+# ---- encoder
+def _is_records(items, skip):
+    """Keys (minus `skip`) shared by every dict in `items`, or None."""
+    if not items or type(items[0]) is not dict:
+        return None
+    keys = [k for k in items[0] if k not in skip]
+    for it in items:
+        if type(it) is not dict or [k for k in it if k not in skip] != keys:
+            return None
+    return keys
+
+
+def _column(buf, vals):
+    t = type(vals[0])
+    if all(type(v) is t for v in vals):
+        if t is float:
+            buf.append(0x64)  # d
+            buf += array("d", vals).tobytes()
+            return
+        if t is int and all(-(1 << 63) <= v < (1 << 63) for v in vals):
+            buf.append(0x71)  # q
+            buf += array("q", vals).tobytes()
+            return
+        if t is bool:
+            buf.append(0x62)  # b
+            buf += bytes(vals)
+            return
+    buf.append(0x67)  # g
+    for v in vals:
+        _enc(buf, v)
+
+
+def _records(buf, kind, keys, items, ids, skip):
+    buf.append(0x52)  # R
+    buf.append(kind)
+    _put_uv(buf, len(items))
+    if ids is not None:
+        buf.append(0x71)
+        buf += array("q", ids).tobytes()
+    _put_uv(buf, len(keys))
+    for k in keys:
+        _enc(buf, k)
+        _column(buf, [it[k] for it in items])
+
+
+def _enc(buf, v, skip=()):
+    t = type(v)
+    if t is float:
+        buf.append(0x64)
+        buf += _F64.pack(v)
+    elif t is int:
+        buf.append(0x69)
+        _put_sv(buf, v)
+    elif t is bool:
+        buf.append(0x54 if v else 0x46)
+    elif v is None:
+        buf.append(0x4E)
+    elif t is str:
+        b = v.encode("utf-8")
+        buf.append(0x73)
+        _put_uv(buf, len(b))
+        buf += b
+    elif t is bytes:
+        buf.append(0x79)
+        _put_uv(buf, len(v))
+        buf += v
+    elif t is list or t is tuple or t is _DEQUE:
+        keys = _is_records(v, skip)
+        kind = 0x6C if t is list else (0x74 if t is tuple else 0x51)
+        if keys is not None:
+            _records(buf, kind, keys, v, None, skip)
+            return
+        buf.append(kind)
+        _put_uv(buf, len(v))
+        for x in v:
+            _enc(buf, x, skip)
+    elif t is dict:
+        vals = list(v.values())
+        keys = _is_records(vals, skip)
+        if keys is not None and all(type(k) is int for k in v):
+            _records(buf, 0x6D, keys, vals, list(v), skip)
+            return
+        items = [(k, x) for k, x in v.items() if k not in skip]
+        buf.append(0x6D)
+        _put_uv(buf, len(items))
+        for k, x in items:
+            _enc(buf, k)
+            _enc(buf, x, skip)
+    elif t is np.ndarray:
+        a = np.ascontiguousarray(v)
+        dt = a.dtype.str.encode("ascii")
+        buf.append(0x61)
+        _put_uv(buf, len(dt))
+        buf += dt
+        _put_uv(buf, a.ndim)
+        for n in a.shape:
+            _put_uv(buf, n)
+        buf += a.tobytes()
+    elif t is _COUNT:
+        buf.append(0x63)
+        _put_uv(buf, int(repr(v)[6:-1]))  # "count(17)"
+    elif hasattr(v, "state"):
+        buf.append(0x6F)
+        _enc(buf, v.state())
+    else:
+        raise TypeError(f"cannot snapshot {t.__name__}")
+
+
+# ---- decoder
+class _State(dict):
+    """Decoded `state()` of a helper object; restored via `load_state`."""
+
+
+def _dec_column(r, n):
+    tag = r.d[r.i]
+    r.i += 1
+    if tag == 0x64:
+        return array("d", bytes(r.take(8 * n))).tolist()
+    if tag == 0x71:
+        return array("q", bytes(r.take(8 * n))).tolist()
+    if tag == 0x62:
+        return [bool(b) for b in r.take(n)]
+    return [_dec(r) for _ in range(n)]
+
+
+def _dec(r):
+    tag = r.d[r.i]
+    r.i += 1
+    if tag == 0x64:
+        return _F64.unpack(r.take(8))[0]
+    if tag == 0x69:
+        return r.sv()
+    if tag == 0x54:
+        return True
+    if tag == 0x46:
+        return False
+    if tag == 0x4E:
+        return None
+    if tag == 0x73:
+        return bytes(r.take(r.uv())).decode("utf-8")
+    if tag == 0x79:
+        return bytes(r.take(r.uv()))
+    if tag in (0x6C, 0x74, 0x51):
+        items = [_dec(r) for _ in range(r.uv())]
+        return items if tag == 0x6C else (tuple(items) if tag == 0x74 else _DEQUE(items))
+    if tag == 0x6D:
+        out = {}
+        for _ in range(r.uv()):
+            k = _dec(r)
+            out[k] = _dec(r)
+        return out
+    if tag == 0x52:
+        kind = r.d[r.i]
+        r.i += 1
+        n = r.uv()
+        ids = _dec_column(r, n) if kind == 0x6D else None
+        keys, cols = [], []
+        for _ in range(r.uv()):
+            keys.append(_dec(r))
+            cols.append(_dec_column(r, n))
+        items = [dict(zip(keys, row)) for row in zip(*cols)] if keys else [{} for _ in range(n)]
+        if kind == 0x6D:
+            return dict(zip(ids, items))
+        return items if kind == 0x6C else (tuple(items) if kind == 0x74 else _DEQUE(items))
+    if tag == 0x61:
+        dt = np.dtype(bytes(r.take(r.uv())).decode("ascii"))
+        shape = tuple(r.uv() for _ in range(r.uv()))
+        n = math.prod(shape) * dt.itemsize
+        return np.frombuffer(r.take(n), dtype=dt).reshape(shape).copy()
+    if tag == 0x63:
+        return _COUNT(r.uv())
+    if tag == 0x6F:
+        return _State(_dec(r))
+    raise ValueError(f"bad snapshot tag {tag:#x}")
+
+
+# ---- public
+def capture(widget) -> bytes:
+    src = source_of(widget)
+    skip = getattr(widget, "SNAPSHOT_SKIP", ())
+    buf = bytearray()
+    attrs = [a for a in src.SNAPSHOT_ATTRS if hasattr(src, a)]
+    _put_uv(buf, len(attrs))
+    for a in attrs:
+        _enc(buf, a)
+        _enc(buf, getattr(src, a), skip)
+    return zlib.compress(buf, 1)
+
+
+def restore(widget, data: bytes):
+    src = source_of(widget)
+    r = _Reader(memoryview(zlib.decompress(data)))
+    for _ in range(r.uv()):
+        name = _dec(r)
+        val = _dec(r)
+        if type(val) is _State:
+            getattr(src, name).load_state(val)
+        else:
+            setattr(src, name, val)
@@ -39,15 +39,15 @@ class HubMenu(QtWidgets.QWidget):
             QtGui.QColor(255, 184, 122, 130),
             QtGui.QColor(216, 136, 255, 140),
         ]
-        random.seed(7)
+        rnd = random.Random(7)  # تزئینی؛ random سراسری را ری‌سید نکن
         for i in range(12):
-            r = random.uniform(120, 260)
-            vx = random.uniform(-8, 8)  # سرعت‌های خیلی کم برای حرکت لطیف
-            vy = random.uniform(-5, 5)
+            r = rnd.uniform(120, 260)
+            vx = rnd.uniform(-8, 8)  # سرعت‌های خیلی کم برای حرکت لطیف
+            vy = rnd.uniform(-5, 5)
             self._blobs.append(
                 {
-                    "x": random.uniform(-300, w + 300),
-                    "y": random.uniform(-300, h + 300),
+                    "x": rnd.uniform(-300, w + 300),
+                    "y": rnd.uniform(-300, h + 300),
                     "r": r,
                     "vx": vx,
                     "vy": vy,
@@ -0,0 +1,45 @@
+import math
+
+from PySide6 import QtGui, QtCore
+
+
+class BackgroundCompositor:
+    """Named background layers cached as QPixmaps.
+
+    `blit(p, name, key, w, h, paint)` draws layer `name`, calling
+    `paint(painter, w, h)` into a fresh transparent pixmap only when `key`,
+    the size or the devicePixelRatio differs from the cached copy; otherwise
+    it is a single drawPixmap. Callers put in `key` exactly what changes the
+    layer's pixels (a quantized hue, a whole-pixel parallax offset), so slow
+    animations re-render a few times a second instead of every frame.
+    """
+
+    def __init__(self):
+        self._layers = {}  # name -> (key, w, h, dpr, QPixmap)
+        self.renders = 0  # تعداد رندر واقعی (برای بنچ/تست)
+
+    def invalidate(self, name: str = None):
+        if name is None:
+            self._layers.clear()
+        else:
+            self._layers.pop(name, None)
+
+    def layer(self, name, key, w, h, dpr, paint) -> QtGui.QPixmap:
+        hit = self._layers.get(name)
+        if hit is not None and hit[:4] == (key, w, h, dpr):
+            return hit[4]
+        pm = QtGui.QPixmap(int(math.ceil(max(1, w) * dpr)), int(math.ceil(max(1, h) * dpr)))
+        pm.setDevicePixelRatio(dpr)
+        pm.fill(QtCore.Qt.transparent)
+        lp = QtGui.QPainter(pm)
+        lp.setRenderHint(QtGui.QPainter.Antialiasing)
+        paint(lp, w, h)
+        lp.end()
+        self.renders += 1
+        self._layers[name] = (key, w, h, dpr, pm)
+        return pm
+
+    def blit(self, p, name, key, w, h, paint, dpr=None):
+        if dpr is None:
+            dpr = p.device().devicePixelRatioF()
+        p.drawPixmap(0, 0, self.layer(name, key, w, h, dpr, paint))
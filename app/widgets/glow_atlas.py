@@ -0,0 +1,103 @@
+import math
+
+from PySide6 import QtGui, QtCore
+
+RADIUS_STEPS = 2  # باکت شعاع: نیم پیکسل (پالس هم همین‌جا کوانتیزه می‌شود)
+ATLAS_W = 512
+ATLAS_MAX_H = 4096  # بیشتر شد: خالی و از نو
+
+
+class GlowAtlas:
+    """Glow + core discs pre-rendered into one shared texture, keyed by
+    (core rgba, halo rgba, radius buckets); one `drawPixmap` per entity."""
+
+    _shared = {}
+
+    @classmethod
+    def shared(cls, dpr: float = 1.0) -> "GlowAtlas":
+        atlas = cls._shared.get(dpr)
+        if atlas is None:
+            atlas = cls._shared[dpr] = cls(dpr)
+        return atlas
+
+    def __init__(self, dpr: float = 1.0):
+        self.dpr = dpr
+        self.clear()
+
+    def clear(self):
+        self._rects = {}  # key -> QRectF (atlas pixels)
+        self._pm = QtGui.QPixmap(ATLAS_W, 128)
+        self._pm.fill(QtCore.Qt.transparent)
+        self._sx = self._sy = self._shelf_h = 0
+
+    def __len__(self):
+        return len(self._rects)
+
+    @property
+    def texture(self) -> QtGui.QPixmap:
+        return self._pm
+
+    def _alloc(self, size: int) -> QtCore.QRect:
+        if self._sx + size > ATLAS_W:
+            self._sx = 0
+            self._sy += self._shelf_h
+            self._shelf_h = 0
+        if self._sy + size > self._pm.height():
+            need = self._sy + size
+            if need > ATLAS_MAX_H:
+                self.clear()
+                return self._alloc(size)
+            h = self._pm.height()
+            while h < need:
+                h *= 2
+            grown = QtGui.QPixmap(ATLAS_W, h)
+            grown.fill(QtCore.Qt.transparent)
+            gp = QtGui.QPainter(grown)
+            gp.drawPixmap(0, 0, self._pm)
+            gp.end()
+            self._pm = grown
+        r = QtCore.QRect(self._sx, self._sy, size, size)
+        self._sx += size
+        self._shelf_h = max(self._shelf_h, size)
+        return r
+
+    def _render(self, key) -> QtCore.QRectF:
+        core, halo, qc, qh = key
+        rc, rh = qc / RADIUS_STEPS, qh / RADIUS_STEPS
+        size = int(math.ceil(2 * max(rc, rh) * self.dpr)) + 2
+        cell = self._alloc(size)
+        c = QtCore.QPointF(cell.x() + size * 0.5, cell.y() + size * 0.5)
+        p = QtGui.QPainter(self._pm)
+        p.setRenderHint(QtGui.QPainter.Antialiasing)
+        p.setCompositionMode(QtGui.QPainter.CompositionMode_Source)
+        p.fillRect(cell, QtCore.Qt.transparent)
+        p.setCompositionMode(QtGui.QPainter.CompositionMode_SourceOver)
+        p.setPen(QtCore.Qt.NoPen)
+        if halo is not None and rh > 0:
+            p.setBrush(QtGui.QColor(*halo))
+            p.drawEllipse(c, rh * self.dpr, rh * self.dpr)
+        if core is not None and rc > 0:
+            p.setBrush(QtGui.QColor(*core))
+            p.drawEllipse(c, rc * self.dpr, rc * self.dpr)
+        p.end()
+        src = QtCore.QRectF(cell)
+        self._rects[key] = src
+        return src
+
+    def draw(self, p, x, y, core, r_core, halo=None, r_halo=0.0):
+        """Disc of radius `r_core` in `core` rgba over a halo of `r_halo`
+        in `halo` rgba (either may be None), centered at (x, y)."""
+        key = (
+            core,
+            halo,
+            int(r_core * RADIUS_STEPS + 0.5),
+            int(r_halo * RADIUS_STEPS + 0.5) if halo is not None else 0,
+        )
+        src = self._rects.get(key)
+        if src is None:
+            src = self._render(key)
+        half = src.width() * 0.5 / self.dpr
+        # drawPixmapFragments در PySide6 فقط تک‌قطعه‌ای است؛ یکی‌یکی از همان بافت
+        p.drawPixmap(
+            QtCore.QRectF(x - half, y - half, 2 * half, 2 * half), self._pm, src
+        )
@@ -0,0 +1,43 @@
+import time
+
+# بخش‌های paintEvent به ترتیب رسم (hud = هر چیزی بعد از بازیکن)
+SECTIONS = ("background", "entities", "sparks", "player", "hud")
+
+
+class PaintProbe:
+    """Per-section paintEvent timer: `begin()`, then `lap(section)` after
+    each section adds the time since the previous mark."""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.ms = dict.fromkeys(SECTIONS, 0.0)  # جمع میلی‌ثانیه‌ها
+        self.frames = 0
+        self._t = 0.0
+
+    def begin(self):
+        self.frames += 1
+        self._t = time.perf_counter()
+
+    def lap(self, section: str):
+        t = time.perf_counter()
+        self.ms[section] += (t - self._t) * 1e3
+        self._t = t
+
+    def per_frame(self) -> dict:
+        n = max(1, self.frames)
+        return {k: v / n for k, v in self.ms.items()}
+
+
+class _NullProbe:
+    __slots__ = ()
+
+    def begin(self):
+        pass
+
+    def lap(self, section: str):
+        pass
+
+
+NULL_PROBE = _NullProbe()  # پیش‌فرض ویجت‌ها؛ بنچمارک پروب واقعی می‌گذارد
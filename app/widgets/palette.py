@@ -0,0 +1,101 @@
+from PySide6 import QtGui
+
+# بازه‌های hue که اسپاونرها می‌سازند: گلیچ/شارد 0..30، نودهای کلاسیک 180..320
+HSL_RANGES = ((0, 31), (180, 321))
+
+
+class HslTable:
+    """Integer-hue HSL -> QColor / rgba lookup for one (s, l, a); the
+    spawner ranges are filled up front, other hues on first use."""
+
+    def __init__(self, s: int, l: int, a: int = 255, ranges=HSL_RANGES):
+        self.s, self.l, self.a = s, l, a
+        self._colors = [None] * 360
+        self._rgba = [None] * 360
+        for lo, hi in ranges:
+            for h in range(lo, hi):
+                self._fill(h)
+
+    def _fill(self, h: int):
+        c = QtGui.QColor.fromHsl(h, self.s, self.l, self.a)
+        self._colors[h] = c
+        self._rgba[h] = (c.red(), c.green(), c.blue(), self.a)
+
+    def color(self, hue) -> QtGui.QColor:  # مشترک است؛ تغییرش نده
+        h = int(hue) % 360
+        c = self._colors[h]
+        if c is None:
+            self._fill(h)
+            c = self._colors[h]
+        return c
+
+    def rgba(self, hue) -> tuple:
+        h = int(hue) % 360
+        c = self._rgba[h]
+        if c is None:
+            self._fill(h)
+            c = self._rgba[h]
+        return c
+
+
+def _rgba(c: QtGui.QColor, a: int) -> tuple:
+    return c.red(), c.green(), c.blue(), a
+
+
+class Palette:
+    """Paint resources compiled once per `Theme` (cached by name); `set_theme`
+    just rebinds the widget's `_pal`."""
+
+    _cache = {}
+    _hsl = {}  # (s, l, a) -> HslTable
+
+    @classmethod
+    def for_theme(cls, theme) -> "Palette":
+        pal = cls._cache.get(theme.name)
+        if pal is None or pal.theme is not theme:
+            pal = cls._cache[theme.name] = cls(theme)
+        return pal
+
+    @classmethod
+    def hsl(cls, s: int, l: int, a: int = 255) -> HslTable:
+        t = cls._hsl.get((s, l, a))
+        if t is None:
+            t = cls._hsl[(s, l, a)] = HslTable(s, l, a)
+        return t
+
+    def __init__(self, theme):
+        self.theme = theme
+        QColor = QtGui.QColor
+        self.player_a = QColor(theme.playerA)
+        self.player_b = QColor(theme.playerB)
+        self.player_glow = _rgba(self.player_a, 100)  # atlas rgba
+        node = QColor(theme.node)
+        self.node_core = _rgba(node, 230)
+        self.node_glow = _rgba(node, 80)
+        # POWER_TYPES -> (core, glow)
+        self.power = {}
+        for kind, hex_color in (
+            ("slowmo", theme.powerSlow),
+            ("shield", theme.powerShield),
+            ("burst", theme.powerBurst),
+        ):
+            c = QColor(hex_color)
+            self.power[kind] = (_rgba(c, 255), _rgba(c, 90))
+        self.spark_pen = QtGui.QPen(QColor(255, 255, 255, 180), 1.4)
+        self.hud_pen = QtGui.QPen(QColor(255, 255, 255, 150))
+        self.hud_font = QtGui.QFont("Inter", 10, QtGui.QFont.Bold)
+        self._pens = {}
+
+    def hsl_pen(self, table: HslTable, hue, width: float) -> QtGui.QPen:
+        """Cached pen in `table`'s color for `hue` (shared, do not mutate)."""
+        key = (id(table), int(hue) % 360, width)
+        pen = self._pens.get(key)
+        if pen is None:
+            pen = self._pens[key] = QtGui.QPen(table.color(hue), width)
+        return pen
+
+    def player_gradient(self, x0, y0, x1, y1) -> QtGui.QLinearGradient:
+        grad = QtGui.QLinearGradient(x0, y0, x1, y1)
+        grad.setColorAt(0, self.player_a)
+        grad.setColorAt(1, self.player_b)
+        return grad
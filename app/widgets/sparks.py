@@ -0,0 +1,100 @@
+import numpy as np
+import shiboken6
+from PySide6 import QtGui, QtCore
+
+
+HUE_STEP = 12  # درجه؛ 30 باکت رنگ
+ALPHA_LEVELS = 8
+_QLINEF_BYTES = 4 * 8  # qreal = double
+
+
+def draw_segments(p, seg: np.ndarray, start: int = 0, stop: int = None):
+    """drawLines over rows [start, stop) of a C-contiguous (N, 4) float64
+    array (x1, y1, x2, y2), which is laid out exactly like a QLineF array:
+    the C++ `drawLines(const QLineF *, int)` overload reads it in place, so
+    no per-line Python object is built."""
+    # C++ بدون بررسی از این اشاره‌گر می‌خواند؛ آرایهٔ نادرست یعنی خواندن حافظهٔ بیرونی
+    if seg.dtype != np.float64 or seg.ndim != 2 or seg.shape[1] != 4 or not seg.flags.c_contiguous:
+        raise ValueError(f"draw_segments needs a C-contiguous (N, 4) float64 array, "
+                         f"got {seg.dtype} {seg.shape}")
+    if stop is None:
+        stop = len(seg)
+    if not 0 <= start <= stop <= len(seg):
+        raise ValueError(f"rows [{start}, {stop}) out of range for {len(seg)}")
+    if stop == start:
+        return
+    first = shiboken6.wrapInstance(seg.ctypes.data + start * _QLINEF_BYTES, QtCore.QLineF)
+    p.drawLines(first, stop - start)
+
+
+class SparkPainter:
+    """Draws a ParticlePool as short motion streaks.
+
+    `lag` (seconds) draws each spark where it was that long before the last
+    step, i.e. `(1 - alpha) * step` for render interpolation.
+
+    `draw_tinted` quantizes hue to HUE_STEP degrees and the life fade to
+    ALPHA_LEVELS steps and sorts the segments by bucket, so a frame is one
+    pen change and one drawLines per bucket however many sparks are alive.
+    """
+
+    _bucket_colors = {}  # (bucket, sat, light) -> QColor
+
+    @staticmethod
+    def _segments(x, y, vx, vy, tail, order=None) -> np.ndarray:
+        seg = np.empty((len(x), 4))
+        seg[:, 0] = x
+        seg[:, 1] = y
+        seg[:, 2] = x - vx * tail
+        seg[:, 3] = y - vy * tail
+        return seg if order is None else seg[order]
+
+    @staticmethod
+    def draw(p, pool, pen, tail=0.03, lag=0.0):
+        # one color for all sparks -> a single drawLines call
+        if not pool:
+            return
+        x, y, vx, vy, _, _ = pool.live()
+        if not len(x):
+            return
+        if lag:
+            x = x - vx * lag
+            y = y - vy * lag
+        p.setPen(pen)
+        draw_segments(p, SparkPainter._segments(x, y, vx, vy, tail))
+
+    @staticmethod
+    def draw_tinted(p, pool, pen, tail=0.03, sat=220, light=180, lag=0.0):
+        # per-spark hue, alpha fading with remaining life
+        if not pool:
+            return
+        x, y, vx, vy, life, hue = pool.live()
+        n = len(x)
+        if not n:
+            return
+        if lag:
+            x = x - vx * lag
+            y = y - vy * lag
+        hq = (hue.astype(np.int32) % 360) // HUE_STEP
+        aq = np.clip((life * ALPHA_LEVELS).astype(np.int32), 0, ALPHA_LEVELS - 1)
+        key = hq * ALPHA_LEVELS + aq
+        order = np.argsort(key, kind="stable")
+        key = key[order]
+        cuts = (np.flatnonzero(key[1:] != key[:-1]) + 1).tolist()
+        seg = SparkPainter._segments(x, y, vx, vy, tail, order)
+        pen = QtGui.QPen(pen)  # قلم ورودی ممکن است مشترک باشد
+        colors = SparkPainter._bucket_colors
+        for a, b in zip([0] + cuts, cuts + [n]):
+            k = (int(key[a]), sat, light)
+            c = colors.get(k)
+            if c is None:
+                h, al = divmod(k[0], ALPHA_LEVELS)
+                c = colors[k] = QtGui.QColor.fromHsl(
+                    h * HUE_STEP + HUE_STEP // 2,
+                    sat,
+                    light,
+                    min(255, (al * 2 + 1) * 255 // (2 * ALPHA_LEVELS)),
+                )
+            pen.setColor(c)
+            p.setPen(pen)
+            draw_segments(p, seg, a, b)
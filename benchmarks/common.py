@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+"""Shared setup for the headless benchmarks: the mode registry, scripted
+inputs and entity counting. Importing this module sets QT_QPA_PLATFORM to
+offscreen (unless already set) and creates the QApplication."""
+import json, math, os, platform, subprocess, sys, time
+from pathlib import Path
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from PySide6 import QtCore, QtWidgets  # noqa: E402
+
+from app.replay import MODE_CLASSES, create_widget  # noqa: E402
+
+app = QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+
+STEP = 1.0 / 60.0
+SEED = 1234
+
+# name -> "module:Class"
+MODES = MODE_CLASSES
+
+# run-ending methods; `survive=True` turns them into a hit counter so a
+# benchmark can reach the later phases with a scripted (bad) pilot
+END_METHODS = ("_game_over", "_finish", "_end_run")
+
+# entity containers worth reporting, by attribute name
+ENTITY_ATTRS = (
+    "nodes", "glitches", "powers", "energies", "targets", "orbs",
+    "shards", "picks", "rows", "powerups", "sparks", "trail",
+)
+
+
+def make_mode(name: str, w: int = 1280, h: int = 800, seed: int = SEED, survive=False):
+    widget = create_widget(name)
+    widget.resize(w, h)
+    widget.set_mode("endless")
+    widget.set_control_mode("Mouse")
+    widget.run_seed = seed  # هر ری‌استارت همان ران را از نو می‌سازد
+    widget.prepare_endless()
+    widget.start()
+    widget.bench_hits = []
+    if survive:
+        for m in END_METHODS:
+            if hasattr(widget, m):
+                setattr(widget, m, widget.bench_hits.append)
+    return widget
+
+
+def drive(widget, i: int):
+    """Scripted input for tick `i`: a slow Lissajous mouse path, a
+    left-key pattern for keyboard steering and an ability every ~1.6 s."""
+    w, h = max(1, widget.width()), max(1, widget.height())
+    mx = w * 0.5 + w * 0.33 * math.sin(i * 0.013)
+    my = h * 0.5 + h * 0.37 * math.cos(i * 0.017)
+    target = getattr(widget, "inputs", widget)
+    target.mx = mx
+    if hasattr(target, "my"):
+        target.my = my
+    if hasattr(target, "key_left"):
+        target.key_left = (i // 90) % 3 == 0
+    if i % 97 == 0 and hasattr(widget, "ability_queued"):
+        widget.ability_queued = True  # blink/dash روی قدم بعدی
+
+
+def restart(widget):
+    widget.prepare_endless()
+    widget.start()
+
+
+def entity_source(widget):
+    """Where a mode keeps its entities (ClassicWorld for classic)."""
+    world = getattr(widget, "world", None)
+    return world if world is not None else widget
+
+
+def entity_counts(widget) -> dict:
+    src = entity_source(widget)
+    out = {}
+    for a in ENTITY_ATTRS:
+        obj = getattr(src, a, None)
+        if obj is not None:
+            try:
+                out[a] = len(obj)
+            except TypeError:
+                pass
+    return out
+
+
+def phase_of(widget) -> int:
+    for a in ("phase_val", "_phase"):
+        v = getattr(widget, a, None)
+        if v is not None:
+            return int(v)
+    return int(getattr(widget, "tier", 0))
+
+
+def percentile(sorted_vals, q: float) -> float:
+    if not sorted_vals:
+        return 0.0
+    k = min(len(sorted_vals) - 1, max(0, int(round(q * (len(sorted_vals) - 1)))))
+    return sorted_vals[k]
+
+
+def meta(**extra) -> dict:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=ROOT, capture_output=True, text=True, timeout=10,
+        ).stdout.strip()
+    except Exception:
+        commit = ""
+    import PySide6, numpy
+
+    return {
+        "commit": commit,
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "pyside6": PySide6.__version__,
+        "numpy": numpy.__version__,
+        "machine": platform.machine(),
+        "platform": platform.platform(),
+        "qpa": os.environ.get("QT_QPA_PLATFORM", ""),
+        **extra,
+    }
+
+
+def write_json(path, data):
+    Path(path).write_text(json.dumps(data, indent=2, sort_keys=True), encoding="utf-8")
+
+
+def compare(
+    old: dict, new: dict, key: str, threshold: float = 0.10, section: str = "modes"
+) -> list[str]:
+    """Lines for entries of `section` whose `key` (lower is better) got
+    worse by more than `threshold` between two result files."""
+    lines = []
+    for name, res in new.get(section, {}).items():
+        prev = old.get(section, {}).get(name)
+        if not prev or not prev.get(key):
+            continue
+        ratio = res[key] / prev[key]
+        flag = "REGRESSION" if ratio > 1 + threshold else ""
+        lines.append(f"{name:9s} {key} {prev[key]:9.2f} -> {res[key]:9.2f} ({ratio:5.2f}x) {flag}")
+    return lines
+
+
+def pump():
+    """Let queued Qt events (deleteLater, singleShots) run."""
+    QtCore.QCoreApplication.processEvents()
@@ -0,0 +1,226 @@
+# -*- coding: utf-8 -*-
+"""Offscreen paint benchmark: every mode's `paintEvent` into a QImage.
+
+    python -m benchmarks.paint_bench --out bench_paint.json
+    python -m benchmarks.paint_bench --save-golden golden.json   # on the baseline
+    python -m benchmarks.paint_bench --golden golden.json        # after a change
+
+Each scene is a fresh mode at 1080p or 4K with one entity axis swept
+(hazards: glitches/shards/rows, sparks, weave trail points) and the rest at
+their start-of-run state. Reported per scene: ms per frame (mean/p50/p99)
+and the split over the paint sections (background, entities, sparks,
+player, hud) from `PaintProbe`.
+
+The paint clock is frozen for the golden frames, so a golden checksum only
+changes when the pixels do. Checksums are only comparable on the same
+machine/fonts, so record them on the baseline commit and check against
+them after an optimization.
+"""
+import argparse, contextlib, hashlib, json, math, random, sys, time, types
+
+from benchmarks.common import (
+    MODES, SEED, compare, entity_source, make_mode, meta, percentile, pump, write_json,
+)
+from PySide6 import QtGui
+
+from app.modes.particles import ParticlePool
+from app.widgets.paint_probe import SECTIONS, PaintProbe
+
+RESOLUTIONS = {"1080p": (1920, 1080), "4k": (3840, 2160)}
+SWEEPS = {
+    "hazards": (10, 100, 500, 2000),
+    "sparks": (10, 100, 500, 2000),
+    "trail": (50, 250, 1000),
+}
+GOLDEN = {"hazards": 100, "sparks": 500, "trail": 250}  # صحنهٔ تصویر مرجع
+PAINT_T = 100.0  # ساعت رسم ثابت برای فریم‌های مرجع
+WARMUP = 3
+
+
+def _rush_glitch(wd, w, h):
+    wd._spawn_glitch(w)
+    wd.glitches[-1]["y"] = wd.run.rng.uniform(0, h) - wd.scroll_y  # داخل کادر
+
+
+# mode -> spawner of one hazard, using the mode's own spawn code
+HAZARDS = {
+    "classic": lambda wd, w, h: wd.world._spawn_glitch(w, h),
+    "flow": lambda wd, w, h: wd._spawn_glitch(w, h),
+    "weave": lambda wd, w, h: wd._spawn_glitch(w, h),
+    "phantom": lambda wd, w, h: wd._spawn_row(wd.run.rng.uniform(0, h)),
+    "mirror": lambda wd, w, h: wd._spawn_glitch(w, h),
+    "collapse": lambda wd, w, h: wd._spawn_shard(w, h),
+    "rush": _rush_glitch,
+}
+
+
+def _add_sparks(wd, n, w, h, rng):
+    src = entity_source(wd)
+    if getattr(src, "sparks", None) is None:
+        return False
+    pool = src.sparks = ParticlePool(max(n, src.sparks.capacity), seed=0)
+    for _ in range(n):
+        pool.spawn(
+            rng.uniform(0, w), rng.uniform(0, h),
+            rng.uniform(-120, 120), rng.uniform(-120, 120),
+            rng.uniform(0.2, 0.8), rng.uniform(0, 30),
+        )
+    return True
+
+
+def _add_trail(wd, n, w, h):
+    trail = getattr(wd, "trail", None)
+    if trail is None:
+        return False
+    trail.clear()
+    trail.max_points = None
+    trail.max_len = float("inf")
+    for i in range(n):  # مارپیچ از مرکز به بیرون
+        a, k = i * 0.02, 0.4 * i / n
+        trail.push(w * (0.5 + k * math.cos(a)), h * (0.5 + k * math.sin(a)))
+    return True
+
+
+def build_scene(mode, res, axis, count, seed=SEED):
+    """Fresh widget with `count` entities on `axis`; None if the mode has
+    nothing on that axis."""
+    w, h = RESOLUTIONS[res]
+    wd = make_mode(mode, w, h, seed=seed)
+    rng = random.Random(seed)
+    if axis == "hazards":
+        for _ in range(count):
+            HAZARDS[mode](wd, w, h)
+    elif axis == "sparks":
+        if not _add_sparks(wd, count, w, h, rng):
+            wd.deleteLater()
+            return None
+    elif axis == "trail":
+        if not _add_trail(wd, count, w, h):
+            wd.deleteLater()
+            return None
+    wd.paint_probe = PaintProbe()
+    return wd
+
+
+@contextlib.contextmanager
+def frozen_paint_clock(widget, t=PAINT_T):
+    """Pin the `time.perf_counter()` a mode's paintEvent animates from."""
+    mod = sys.modules[type(widget).__module__]
+    real = mod.time
+    mod.time = types.SimpleNamespace(perf_counter=lambda: t, strftime=real.strftime)
+    try:
+        yield
+    finally:
+        mod.time = real
+
+
+def _image(widget):
+    img = QtGui.QImage(widget.width(), widget.height(), QtGui.QImage.Format_ARGB32_Premultiplied)
+    img.fill(0)
+    return img
+
+
+def render(widget) -> QtGui.QImage:
+    img = _image(widget)
+    widget.render(img)
+    return img
+
+
+def checksum(img: QtGui.QImage) -> str:
+    return hashlib.sha1(bytes(img.constBits())).hexdigest()
+
+
+def bench_scene(widget, frames: int) -> dict:
+    img = _image(widget)
+    for _ in range(WARMUP):
+        widget.render(img)
+    probe = widget.paint_probe
+    probe.reset()
+    perf = time.perf_counter
+    times = []
+    for _ in range(frames):
+        t0 = perf()
+        widget.render(img)
+        times.append((perf() - t0) * 1e3)
+    s = sorted(times)
+    return {
+        "ms": sum(s) / len(s),
+        "p50_ms": percentile(s, 0.50),
+        "p99_ms": percentile(s, 0.99),
+        "sections_ms": probe.per_frame(),
+    }
+
+
+def golden(modes, resolutions, seed=SEED) -> dict:
+    out = {}
+    for mode in modes:
+        for res in resolutions:
+            wd = build_scene(mode, res, "hazards", GOLDEN["hazards"], seed)
+            _add_sparks(wd, GOLDEN["sparks"], *RESOLUTIONS[res], random.Random(seed))
+            _add_trail(wd, GOLDEN["trail"], *RESOLUTIONS[res])
+            with frozen_paint_clock(wd):
+                out[f"{mode}@{res}"] = checksum(render(wd))
+            wd.deleteLater()
+            pump()
+    return out
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    ap.add_argument("--modes", nargs="*", default=list(MODES), choices=list(MODES))
+    ap.add_argument("--res", nargs="*", default=list(RESOLUTIONS), choices=list(RESOLUTIONS))
+    ap.add_argument("--axes", nargs="*", default=list(SWEEPS), choices=list(SWEEPS))
+    ap.add_argument("--frames", type=int, default=20, help="timed frames per scene")
+    ap.add_argument("--seed", type=int, default=SEED)
+    ap.add_argument("--out", default="bench_paint.json")
+    ap.add_argument("--compare", help="baseline JSON to diff ms/frame against")
+    ap.add_argument("--golden", help="checksum JSON the frames must still match")
+    ap.add_argument("--save-golden", help="write this run's checksums here")
+    args = ap.parse_args(argv)
+
+    data = {
+        "meta": meta(kind="paint", frames=args.frames, seed=args.seed),
+        "scenes": {},
+        "golden": golden(args.modes, args.res, args.seed),
+    }
+    print("scene                          ms/frame   " + "  ".join(f"{s:>10s}" for s in SECTIONS))
+    for mode in args.modes:
+        for res in args.res:
+            for axis in args.axes:
+                for count in SWEEPS[axis]:
+                    wd = build_scene(mode, res, axis, count, args.seed)
+                    if wd is None:
+                        continue
+                    res_ = bench_scene(wd, args.frames)
+                    wd.deleteLater()
+                    pump()
+                    name = f"{mode}@{res}/{axis}={count}"
+                    data["scenes"][name] = res_
+                    secs = "  ".join(f"{res_['sections_ms'][s]:10.2f}" for s in SECTIONS)
+                    print(f"{name:30s} {res_['ms']:9.2f}   {secs}")
+    write_json(args.out, data)
+    print(f"-> {args.out}")
+
+    if args.save_golden:
+        write_json(args.save_golden, data["golden"])
+        print(f"golden -> {args.save_golden}")
+    failed = False
+    if args.golden:
+        with open(args.golden, encoding="utf-8") as f:
+            ref = json.load(f)
+        for key, sha in data["golden"].items():
+            if key in ref and ref[key] != sha:
+                failed = True
+                print(f"GOLDEN MISMATCH {key}: {ref[key][:12]} -> {sha[:12]}")
+        if not failed:
+            print(f"golden OK ({len(ref)} frames)")
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            base = json.load(f)
+        for line in compare(base, data, "ms", section="scenes"):
+            print(line)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+"""Headless simulation benchmark: every mode's `_update` under scripted input.
+
+    python -m benchmarks.sim_bench --minutes 2 --out bench_sim.json
+    python -m benchmarks.sim_bench --compare bench_sim.json   # vs. a baseline
+
+Each mode runs for N simulated minutes of fixed 1/60 s steps from a fixed
+seed (no painting, no timers). Reported per mode and per phase: ticks/sec,
+p50/p99/max tick time (us) and peak entity counts. By default runs do not
+end on hits (`--mortal` restores normal game over) so the later, denser
+phases get measured too.
+"""
+import argparse, json, time
+
+from benchmarks.common import (
+    MODES, SEED, STEP, compare, drive, entity_counts, make_mode, meta,
+    percentile, phase_of, pump, restart, write_json,
+)
+
+
+def _summary(times_us: list, peak: dict) -> dict:
+    s = sorted(times_us)
+    total = sum(s)
+    return {
+        "ticks": len(s),
+        "ticks_per_s": len(s) / (total / 1e6) if total else 0.0,
+        "p50_us": percentile(s, 0.50),
+        "p99_us": percentile(s, 0.99),
+        "max_us": s[-1] if s else 0.0,
+        "peak": dict(peak),
+    }
+
+
+def bench_mode(name: str, minutes: float, seed: int = SEED, survive: bool = True) -> dict:
+    w = make_mode(name, seed=seed, survive=survive)
+    ticks = int(minutes * 60 / STEP)
+    perf = time.perf_counter
+    times = []
+    phases = {}  # phase -> (times, peak)
+    peak = {}
+    restarts = 0
+    for i in range(ticks):
+        drive(w, i)
+        t0 = perf()
+        w._update(STEP)
+        us = (perf() - t0) * 1e6
+        times.append(us)
+        ph = phases.setdefault(phase_of(w), ([], {}))
+        ph[0].append(us)
+        for k, n in entity_counts(w).items():
+            if n > peak.get(k, 0):
+                peak[k] = n
+            if n > ph[1].get(k, 0):
+                ph[1][k] = n
+        if not w.running:
+            restarts += 1
+            restart(w)
+    res = _summary(times, peak)
+    res["restarts"] = restarts
+    res["hits"] = len(w.bench_hits)
+    res["phases"] = {str(k): _summary(*v) for k, v in sorted(phases.items())}
+    w.deleteLater()
+    pump()
+    return res
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    ap.add_argument("--minutes", type=float, default=2.0, help="simulated minutes per mode")
+    ap.add_argument("--modes", nargs="*", default=list(MODES), choices=list(MODES))
+    ap.add_argument("--seed", type=int, default=SEED)
+    ap.add_argument("--mortal", action="store_true", help="end runs on hits (restart)")
+    ap.add_argument("--out", default="bench_sim.json")
+    ap.add_argument("--compare", help="baseline JSON to diff p99 against")
+    args = ap.parse_args(argv)
+
+    data = {
+        "meta": meta(kind="sim", minutes=args.minutes, seed=args.seed, survive=not args.mortal),
+        "modes": {},
+    }
+    for name in args.modes:
+        res = bench_mode(name, args.minutes, args.seed, survive=not args.mortal)
+        data["modes"][name] = res
+        pk = ", ".join(f"{k}={v}" for k, v in res["peak"].items())
+        print(
+            f"{name:9s} {res['ticks_per_s']:9.0f} t/s  p50 {res['p50_us']:7.1f} us  "
+            f"p99 {res['p99_us']:7.1f} us  max {res['max_us']:8.1f} us  [{pk}]"
+        )
+    write_json(args.out, data)
+    print(f"-> {args.out}")
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            base = json.load(f)
+        for line in compare(base, data, "p99_us"):
+            print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,27 @@
+import os
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PySide6 import QtGui, QtWidgets
+
+from app.widgets.background import BackgroundCompositor
+
+app = QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+
+
+def test_layer_rerenders_only_on_key_or_size_change():
+    bg = BackgroundCompositor()
+    img = QtGui.QImage(64, 48, QtGui.QImage.Format_ARGB32_Premultiplied)
+    paint = lambda p, w, h: p.fillRect(0, 0, w, h, QtGui.QColor(10, 20, 30))
+    p = QtGui.QPainter(img)
+    for _ in range(3):
+        bg.blit(p, "base", (1, 2), 64, 48, paint)
+    assert bg.renders == 1
+    bg.blit(p, "base", (1, 3), 64, 48, paint)
+    bg.blit(p, "base", (1, 3), 32, 48, paint)
+    assert bg.renders == 3
+    bg.invalidate()
+    bg.blit(p, "base", (1, 3), 32, 48, paint)
+    p.end()
+    assert bg.renders == 4
+    assert img.pixelColor(10, 10) == QtGui.QColor(10, 20, 30)
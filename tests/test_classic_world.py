@@ -0,0 +1,32 @@
+from app.modes.classic_world import ClassicWorld, ClassicInputs
+
+
+def test_world_steps_without_qt():
+    world = ClassicWorld(800, 600)
+    world.reset(seed=7)
+    inputs = ClassicInputs(mx=700, my=100)
+    for _ in range(600):
+        world.step(1 / 60, inputs)
+    assert world.phase_val > 0
+    assert 0 <= world.px <= 800 and 0 <= world.py <= 600
+
+
+def test_glitch_hit_ends_run():
+    world = ClassicWorld(800, 600)
+    world.glitches.spawn(x=world.px, y=world.py, r=10, life=5)
+    inputs = ClassicInputs(mx=world.px, my=world.py)
+    events = world.step(1 / 60, inputs)
+    assert (ClassicWorld.EV_HIT,) in events
+
+
+def test_entity_store_reuses_slots_and_grows():
+    from app.modes.entity_store import EntityStore
+
+    store = EntityStore(2)
+    a = store.spawn(x=1.0)
+    store.spawn(x=2.0)
+    store.kill(a)
+    assert store.spawn(x=3.0) == a
+    store.spawn(x=4.0)  # forces a grow
+    assert store.capacity == 4 and len(store) == 3
+    assert sorted(store.x[store.indices()].tolist()) == [2.0, 3.0, 4.0]
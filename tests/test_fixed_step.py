@@ -0,0 +1,27 @@
+from app.fixed_step import FixedStepClock, damp, ease, lerp_wrap
+
+
+def test_clock_steps_and_alpha():
+    c = FixedStepClock(60)
+    assert list(c.steps(0.025)) == [c.step]
+    assert abs(c.alpha - (0.025 - c.step) / c.step) < 1e-9
+    c.set_rate(30)
+    assert len(list(c.steps(0.1))) == 3
+
+
+def test_rescale_is_identity_at_60hz():
+    assert abs(damp(0.9, 1 / 60) - 0.9) < 1e-12
+    assert abs(ease(0.02, 1 / 60) - 0.02) < 1e-12
+    # دو قدم 60 هرتز == یک قدم 30 هرتز
+    assert abs(damp(0.9, 1 / 30) - 0.81) < 1e-12
+
+
+def test_lerp_wrap_snaps_on_edge_jump():
+    assert lerp_wrap(10, 20, 0.5, 800) == 15
+    assert lerp_wrap(790, 5, 0.5, 800) == 5
+
+
+def test_clock_drops_backlog_instead_of_spiralling():
+    c = FixedStepClock(60, max_steps=5)
+    assert len(list(c.steps(1.0))) == 5
+    assert c.spirals == 1 and c.alpha < 1.0
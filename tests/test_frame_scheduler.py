@@ -0,0 +1,132 @@
+import gc
+import os
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PySide6 import QtWidgets
+
+from app.frame_scheduler import FrameScheduler
+from app.replay import MODE_CLASSES, ReplayRecorder, create_widget, resimulate
+
+app = QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+
+
+class Dummy(QtWidgets.QWidget):
+    def __init__(self):
+        super().__init__()
+        self.running = False
+        self.paused = False
+        self.ticks = 0
+
+    def _tick(self, dt):
+        self.ticks += 1
+
+
+def test_scheduler_drives_only_visible_running_widgets():
+    fs = FrameScheduler()
+    a, b = Dummy(), Dummy()
+    fs.register(a)
+    fs.register(b)
+    a.show()
+    fs.wake()
+    assert not fs.active  # visible but idle
+    a.running = b.running = True
+    fs.wake(a)
+    assert fs.active
+    fs._frame()
+    assert (a.ticks, b.ticks) == (1, 0)  # b is hidden
+    assert fs.stats[a].ticks == 1
+    a.paused = True
+    fs._frame()
+    assert not fs.active and a.ticks == 1
+    a.hide()
+    a.paused = False
+    fs.wake()
+    assert not fs.active
+
+
+def test_precise_pacing_counts_late_frames():
+    fs = FrameScheduler()
+    a = Dummy()
+    fs.register(a)
+    a.show()
+    a.running = True
+    fs.wake(a)
+    fs._deadline -= 0.1  # یک گیر ۱۰۰ میلی‌ثانیه‌ای
+    fs._frame()
+    assert fs.pacing.dropped >= 10 and fs.active
+    fs._last -= 1.0
+    fs._frame()
+    assert fs.pacing.hitches == 1
+    a.hide()
+
+
+def test_resync_drops_time_spent_in_a_slot():
+    fs = FrameScheduler()
+    a = Dummy()
+    fs.register(a)
+    a.show()
+    a.running = True
+    fs.wake(a)
+    fs._last -= 0.2  # مثلاً ساخت مسیر روح در اسلات started
+    fs._deadline -= 0.2
+    fs.resync()
+    fs._frame()
+    assert fs.pacing.dropped == 0 and fs.pacing.hitches == 0
+    a.hide()
+
+
+def test_dropped_widgets_leave_the_registry():
+    fs = FrameScheduler.instance()
+    n = len(fs.stats)
+    for _ in range(5):
+        w = create_widget("flow")
+        del w
+    gc.collect()
+    assert len(fs.stats) == n
+    parent = QtWidgets.QWidget()
+    child = create_widget("flow")
+    child.setParent(parent)
+    del parent
+    gc.collect()
+    assert child not in fs.stats  # ++C رفته، پوستهٔ پایتونی هنوز هست
+    g = create_widget("phantom")
+    g.resize(800, 600)
+    g.prepare_endless()
+    g.start()
+    rec = ReplayRecorder(g, None)
+    for _ in range(30):
+        g._tick(g.clock.step)
+    res = resimulate(rec.finish(g.score))
+    assert res.ok and len(fs.stats) == n + 1  # فقط g؛ ویجت بازپخش ثبت نمی‌شود
+
+
+def test_run_ends_once_on_a_slow_frame():
+    g = create_widget("classic")
+    g.resize(800, 600)
+    g.prepare_endless()
+    g.start()
+    ended = []
+    g.runEnded.connect(lambda *a: ended.append(a))
+    wd = g.world
+    wd.glitches.spawn(x=wd.px, y=wd.py, vx=0.0, vy=0.0, r=10.0, hue=0.0, life=9.0)
+    g._tick(5 * g.clock.step)  # یک فریم کند: ۵ قدم
+    assert len(ended) == 1 and not g.running
+
+
+def test_tick_stops_stepping_when_the_run_ends():
+    for kind in MODE_CLASSES:
+        w = create_widget(kind)
+        w.resize(800, 600)
+        w.prepare_endless()
+        w.start()
+        calls = []
+
+        def end_run(dt, w=w):
+            calls.append(dt)
+            w.running = False
+
+        w._update = end_run
+        w._tick(5 * w.clock.step)
+        assert len(calls) == 1, kind
+
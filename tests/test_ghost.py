@@ -0,0 +1,106 @@
+import math
+import os
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PySide6 import QtWidgets
+
+from app.ghost import GHOST_KINDS, Ghost, best_path, keep_if_best, load_ghost
+from app.modes.ghost_sim import FlowGhostSim
+from app.replay import (
+    KEY_ABILITY, KEY_LEFT, KEY_RIGHT, MOUSE_Q, Replay, ReplayPlayer, ReplayRecorder, create_widget,
+)
+
+app = QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+
+
+def _mode(kind, seed, control="mouse"):
+    w = create_widget(kind)
+    w.resize(800, 500)
+    w.set_control_mode(control)
+    w.run_seed = seed
+    w.prepare_endless()
+    w.start()
+    w.clock.steps = lambda dt: [w.clock.step] if w.running else []  # یک قدم در هر فریم
+    return w
+
+
+def _drive(w, i):
+    src = getattr(w, "inputs", w)
+    src.mx = 400 + 300 * math.sin(i * 0.011)
+    src.my = 250 + 200 * math.cos(i * 0.017)
+    src.key_left = i % 90 < 30
+    src.key_right = i % 150 < 20
+    w.ability_queued = i % 97 == 0
+
+
+def _recorded(kind="flow", seed=13, ticks=600, control="mouse"):
+    w = _mode(kind, seed, control)
+    for m in ("_game_over", "_finish"):  # تا آخر زنده بماند (مسیر طولانی‌تر)
+        if hasattr(w, m):
+            setattr(w, m, lambda reason: None)
+    w.recorder = rec = ReplayRecorder(w, None)
+    for i in range(ticks):
+        _drive(w, i)
+        w._tick(1 / 60)
+    return Replay.from_bytes(rec.finish(w.score).to_bytes())
+
+
+def test_ghost_runs_in_lockstep_with_the_live_run():
+    rp = _recorded()
+    live = _mode("flow", 5)
+    live.ghost = ghost = Ghost(rp)
+    for i in range(300):
+        _drive(live, 299 - i)
+        live._tick(1 / 60)
+        assert ghost.tick == live.run.ticks == i + 1
+
+
+def test_ghost_sim_matches_the_full_replay():
+    for kind in GHOST_KINDS:
+        for control in ("mouse", "keys"):
+            rp = _recorded(kind, ticks=1500, control=control)
+            ghost, ref = Ghost(rp), ReplayPlayer(rp)  # ref: کل دنیا
+            while not ref.done:
+                ref.step(1)
+                ghost.follow(ref.widget.run.t)
+                assert ghost.tick == ref.tick
+                pose = ref.widget.player_pose(0.5)[:3]
+                assert ghost.pose(0.5)[:3] == pose, (kind, control, ref.tick)
+
+
+def test_flow_ghost_draws_the_same_rng_stream():
+    # هر برداشت اضافه/کم از rng (اسپاون انرژی یا گلیچ) اینجا همان تیک دیده می‌شود
+    rp = _recorded("flow", ticks=1500)
+    sim, ref = FlowGhostSim(rp.header), ReplayPlayer(rp)
+    dt = 1.0 / rp.header["rate"]
+    for qx, qy, keys, w, h, _ in rp.frames():
+        ref.step(1)
+        sim.step(qx / MOUSE_Q, qy / MOUSE_Q, bool(keys & KEY_LEFT), bool(keys & KEY_RIGHT),
+                 bool(keys & KEY_ABILITY), w, h, dt)
+        assert sim.rng.getstate() == ref.widget.run.rng.getstate(), ref.tick
+    assert ref.widget.run.rng.getstate() != FlowGhostSim(rp.header).rng.getstate()
+
+
+def test_only_a_better_run_replaces_the_ghost(tmp_path):
+    rp = _recorded(ticks=120)
+    assert keep_if_best(rp, tmp_path)
+    assert not keep_if_best(rp, tmp_path)
+    worse = Replay(dict(rp.header, score=rp.header["score"] - 1), rp.body)
+    assert not keep_if_best(worse, tmp_path)
+    assert Replay.load(best_path(tmp_path, rp.header)).header == rp.header
+    assert load_ghost(tmp_path, dict(rp.header, run_mode="story", story_idx=3)) is None
+    ghost = load_ghost(tmp_path, rp.header)
+    ghost.follow(math.inf)
+    assert ghost.done and ghost.tick == rp.ticks
+
+
+def test_a_corrupt_best_file_is_replaced(tmp_path):
+    rp = _recorded(ticks=120)
+    path = best_path(tmp_path, rp.header)
+    path.parent.mkdir(parents=True)
+    path.write_bytes(rp.to_bytes()[:-8])  # نیمه‌نوشته
+    assert load_ghost(tmp_path, rp.header) is None
+    assert keep_if_best(rp, tmp_path)
+    assert load_ghost(tmp_path, rp.header).ticks == rp.ticks
+
@@ -0,0 +1,39 @@
+import os
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PySide6 import QtGui, QtWidgets
+
+from app.widgets.glow_atlas import GlowAtlas
+from app.widgets.palette import Palette
+
+app = QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+
+
+def test_atlas_reuses_quantized_sprites():
+    atlas = GlowAtlas()
+    img = QtGui.QImage(200, 200, QtGui.QImage.Format_ARGB32_Premultiplied)
+    img.fill(0)
+    p = QtGui.QPainter(img)
+    core, halo = (255, 0, 0, 255), (0, 0, 255, 255)
+    for x in range(10, 190, 20):
+        atlas.draw(p, x, 100, core, 6.1, halo, 10.0)
+        atlas.draw(p, x, 40, core, 6.2, halo, 10.1)  # همان باکت نیم‌پیکسلی
+    glitch = Palette.hsl(240, 180, 230)
+    for hue in range(0, 21):
+        atlas.draw(p, 100, 160, glitch.rgba(hue), 9)
+    p.end()
+    assert len(atlas) == 1 + 21
+    assert img.pixelColor(50, 100).red() == 255  # هسته
+    assert img.pixelColor(50, 108).blue() == 255  # هاله
+
+
+def test_palette_is_compiled_once_per_theme():
+    from app.settings import THEMES
+
+    pal = Palette.for_theme(THEMES["Ember"])
+    assert Palette.for_theme(THEMES["Ember"]) is pal
+    assert pal.player_a == QtGui.QColor(THEMES["Ember"].playerA)
+    t = Palette.hsl(240, 130, 110)
+    assert t.color(365) is t.color(5)  # hue به 0..359 برمی‌گردد
+    assert t.rgba(5)[3] == 110
@@ -0,0 +1,53 @@
+import json
+
+from app.leaderboard import LocalLeaderboard
+
+
+def test_modes_rank_separately(tmp_path):
+    lb = LocalLeaderboard(str(tmp_path / "lb.db"), None)
+    for i in range(30):
+        lb.add(f"p{i}", i * 10, "endless")
+    lb.add("s", 5, "story-3")
+    lb.add("late", 290, "endless")  # هم‌امتیاز با p29؛ بعد از او
+    top = lb.top("endless", 3)
+    assert [(e["name"], e["score"]) for e in top] == [("p29", 290), ("late", 290), ("p28", 280)]
+    assert [e["name"] for e in lb.top("story-3")] == ["s"]  # بقیهٔ مودها بیرونش نمی‌کنند
+    assert lb.count("endless") == 31
+    assert lb.rank("endless", 290) == 1 and lb.rank("endless", 285) == 3
+    assert lb.player_rank("p0", "endless") == 31 and lb.player_rank("nobody", "endless") is None
+    assert lb.percentile("endless", 0) == 100 / 31
+    assert lb.percentile("endless", 290) == 100.0
+    assert lb.percentile("flow-endless", 7) == 100.0
+    lb.close()
+
+
+def test_json_is_migrated_once(tmp_path):
+    legacy = tmp_path / "leaderboard_local.json"
+    legacy.write_text(json.dumps([
+        {"name": "a", "score": 50, "mode": "endless"},
+        {"name": "b", "score": 40, "mode": "story-2"},
+    ]), encoding="utf-8")
+    db = str(tmp_path / "lb.db")
+    lb = LocalLeaderboard(db, str(legacy))
+    assert lb.modes() == ["endless", "story-2"]
+    assert lb._db.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    lb.close()
+    lb = LocalLeaderboard(db, str(legacy))  # اجرای دوم: دوباره وارد نمی‌شود
+    assert lb.count("endless") == 1 and lb.top("endless")[0]["name"] == "a"
+    lb.close()
+
+
+def test_bad_legacy_rows_are_skipped(tmp_path):
+    legacy = tmp_path / "leaderboard_local.json"
+    legacy.write_text(json.dumps([
+        {"name": "a", "score": None},
+        {"name": "b", "score": "lots"},
+        {"name": "c", "score": 7, "ts": [1]},
+        "junk",
+        {"name": "d", "score": 30},
+    ]), encoding="utf-8")
+    lb = LocalLeaderboard(str(tmp_path / "lb.db"), str(legacy))
+    assert [(e["name"], e["score"]) for e in lb.top("endless")] == [("d", 30)]
+    lb.close()
+    legacy.write_text('{"name": "x"}', encoding="utf-8")  # اصلاً لیست نیست
+    LocalLeaderboard(str(tmp_path / "lb2.db"), str(legacy)).close()
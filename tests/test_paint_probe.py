@@ -0,0 +1,27 @@
+import os
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PySide6 import QtGui, QtWidgets
+
+from app.modes.weave_widget import WeaveWidget
+from app.widgets.paint_probe import NULL_PROBE, SECTIONS, PaintProbe
+
+app = QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+
+
+def test_probe_times_each_paint_section():
+    w = WeaveWidget()
+    assert w.paint_probe is NULL_PROBE
+    w.resize(320, 200)
+    w.prepare_endless()
+    w._spawn_glitch(320, 200)  # spawned glitches are drawable before a tick
+    w.paint_probe = probe = PaintProbe()
+    img = QtGui.QImage(320, 200, QtGui.QImage.Format_ARGB32_Premultiplied)
+    w.render(img)
+    w.render(img)
+    assert probe.frames == 2
+    assert set(probe.ms) == set(SECTIONS)
+    for s in ("background", "entities", "player", "hud"):
+        assert probe.ms[s] > 0.0
+    assert probe.per_frame()["background"] == probe.ms["background"] / 2
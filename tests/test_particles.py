@@ -0,0 +1,15 @@
+from app.modes.particles import ParticlePool
+
+
+def test_pool_evicts_oldest_and_expires():
+    pool = ParticlePool(8, seed=1)
+    pool.burst(0, 0, 10, n=6, life=(1.0, 1.0))
+    pool.burst(100, 100, 20, n=4, life=(0.5, 0.5))
+    assert len(pool) == 8
+    # the two oldest sparks of the first burst were overwritten
+    x, y, vx, vy, life, hue = pool.live()
+    assert sorted(hue.tolist()) == [10] * 4 + [20] * 4
+    pool.step(0.6)
+    assert len(pool) == 4
+    pool.step(0.6)
+    assert len(pool) == 0 and not pool
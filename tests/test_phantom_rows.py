@@ -0,0 +1,37 @@
+import math
+import os
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PySide6 import QtWidgets
+
+from app.modes import phantom_run_widget as P
+
+app = QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+
+
+def _full_scan(w):
+    return any(
+        P.rect_intersects_circle(x0, r["y"] - r["h"] / 2, x1 - x0, r["h"], w.px, w.py, P.PLAYER_R)
+        for r in w.rows
+        for x0, x1 in r["solids"]
+    )
+
+
+def test_hits_row_matches_full_scan():
+    w = P.PhantomRunWidget()
+    w.resize(900, 700)
+    w.run_seed = 7
+    w.prepare_endless()
+    w.start()
+    w._finish = lambda reason: None  # برخوردها را بشمار، ران را تمام نکن
+    hits = 0
+    for i in range(1500):
+        w.mx = 450 + 380 * math.sin(i * 0.013)
+        w._update(w.clock.step)
+        ys = [r["y"] for r in w.rows]
+        assert ys == sorted(ys, reverse=True)
+        full = _full_scan(w)
+        assert w._hits_row() == full
+        hits += full
+    assert hits > 0
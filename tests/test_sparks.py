@@ -0,0 +1,58 @@
+import os
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import numpy as np
+import pytest
+from PySide6 import QtGui, QtWidgets
+
+from app.modes.particles import ParticlePool
+from app.widgets.sparks import SparkPainter, draw_segments
+
+app = QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+
+
+def _canvas():
+    img = QtGui.QImage(100, 100, QtGui.QImage.Format_ARGB32_Premultiplied)
+    img.fill(0)
+    return img
+
+
+def test_draw_segments_reads_array_in_place():
+    img = _canvas()
+    seg = np.array([[0, 10, 99, 10], [10, 0, 10, 99], [0, 80, 99, 80]], dtype=np.float64)
+    p = QtGui.QPainter(img)
+    p.setPen(QtGui.QPen(QtGui.QColor(255, 0, 0), 1))
+    draw_segments(p, seg, 1, 3)  # سطر اول رسم نمی‌شود
+    p.end()
+    assert img.pixelColor(50, 10).alpha() == 0
+    assert img.pixelColor(10, 50).red() == 255
+    assert img.pixelColor(50, 80).red() == 255
+
+
+def test_draw_segments_rejects_what_it_cannot_read_in_place():
+    img = _canvas()
+    seg = np.zeros((4, 4))
+    p = QtGui.QPainter(img)
+    for bad in (seg.astype(np.float32), seg[:, :2], seg.T.copy()[:, :3], seg[::2], seg.ravel()):
+        with pytest.raises(ValueError):
+            draw_segments(p, bad)
+    for start, stop in ((-1, 2), (3, 2), (0, 5)):
+        with pytest.raises(ValueError):
+            draw_segments(p, seg, start, stop)
+    draw_segments(p, seg, 4, 4)
+    p.end()
+
+
+def test_tinted_sparks_draw_every_bucket():
+    pool = ParticlePool(256, seed=2)
+    pool.burst(30, 50, 5.0, 40, 200)
+    pool.burst(70, 50, 200.0, 40, 200)
+    img = _canvas()
+    p = QtGui.QPainter(img)
+    SparkPainter.draw_tinted(p, pool, QtGui.QPen(QtGui.QColor(255, 255, 255), 2))
+    p.end()
+    left = QtGui.QColor(img.pixelColor(30, 50))
+    right = QtGui.QColor(img.pixelColor(70, 50))
+    assert left.alpha() > 0 and right.alpha() > 0
+    assert left.red() > left.blue() and right.blue() > right.red()
@@ -0,0 +1,27 @@
+from app.modes.spatial_hash import SpatialHash
+
+
+def test_query_moves_and_removes():
+    grid = SpatialHash(32)
+    grid.insert(1, 10, 10)
+    grid.insert(2, 200, 200)
+    assert grid.query(0, 0, 20) == [1]
+    grid.move(1, 190, 205)
+    assert sorted(grid.query(200, 200, 20)) == [1, 2]
+    grid.remove(2)
+    assert grid.query(200, 200, 20) == [1] and len(grid) == 1
+
+
+def test_wrap_finds_entities_across_edges():
+    grid = SpatialHash(64, 640, 480, wrap=True)
+    grid.insert("a", 635, 475)
+    assert grid.query(4, 4, 16) == ["a"]
+    assert SpatialHash(64, 640, 480).query(4, 4, 16) == []
+
+
+def test_inclusive_query_keeps_points_on_the_circle():
+    grid = SpatialHash(32)
+    grid.insert(1, 36.0, 0.0)  # دقیقاً روی دایرهٔ شعاع ۳۶
+    grid.insert(2, 36.0 + 1e-9, 0.0)
+    assert grid.query(0, 0, 36) == []
+    assert grid.query(0, 0, 36, inclusive=True) == [1]
@@ -0,0 +1,54 @@
+def test_trail_prunes_by_length_and_breaks_on_wrap():
+    from app.modes.weave_trail import WeaveTrail
+
+    trail = WeaveTrail(max_len=100.0)
+    trail.resize(800, 600)
+    for i in range(30):
+        trail.push(10.0 * i, 50.0)
+    assert trail.length == 100.0 and len(trail) == 11
+    assert trail.base == 19 and len(trail.grid) == 10
+    assert list(trail.last_pixels(25))[0] == (260.0, 50.0)
+    trail.push(790.0, 50.0)  # wrapped to the other edge: a break, no length
+    assert trail.length == 100.0 and len(trail) == 12
+    assert [r for _, _, r in trail.polyline()] == [True] + [False] * 10 + [True]
+
+
+def test_crossing_closes_a_loop_with_area_and_contents():
+    from app.modes.weave_trail import WeaveTrail
+
+    trail = WeaveTrail(max_len=10_000.0)
+    trail.resize(800, 600)
+    # walk right, down, left, then up through the first edge
+    path = [(100 + i * 10, 100) for i in range(11)]
+    path += [(200, 100 + i * 10) for i in range(1, 11)]
+    path += [(200 - i * 10, 200) for i in range(1, 11)]
+    path += [(105, 200 - i * 10) for i in range(1, 12)]
+    loop = None
+    for x, y in path:
+        trail.push(x, y)
+        loop = loop or trail.close_loop(min_gap=4)
+    assert loop is not None
+    assert abs(loop.area - 9525.0) < 1e-6  # 95x100 box plus a 5x10 corner wedge
+    assert loop.contains([150, 300], [150, 150]).tolist() == [True, False]
+
+
+def test_loop_effect_builds_its_polygon_at_paint_time():
+    import os
+
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    import numpy as np
+    from PySide6 import QtGui, QtWidgets
+
+    from app.modes.weave_trail import Loop
+    from app.modes.weave_widget import WeaveWidget
+
+    app = QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+    w = WeaveWidget()
+    w.resize(400, 300)
+    w.prepare_endless()
+    poly = np.array([[50.0, 50.0], [150.0, 50.0], [150.0, 150.0], [50.0, 150.0]])
+    w._score_loop(Loop(poly, 10_000.0))
+    fx = w._loop_fx[-1]
+    assert fx[0] is poly and fx[2] is None  # قدم شبیه‌سازی شیء Qt نمی‌سازد
+    w.grab()
+    assert isinstance(fx[2], QtGui.QPolygonF) and fx[2].size() == 4